@@ -1,22 +1,47 @@
 # -*- coding: utf-8 -*-
 import pygame
-import cv2
 import mediapipe as mp
-import random
 import math
 import os
 import subprocess
 import sys
+import time
+
+import fonts
+import game_core
+from camera import RECONNECT_FPS
+from camera_sources import open_camera
+from compositor import Compositor
+from display import Display
+from frame_timing import FrameTimer
+from governor import QualityGovernor
+from perf_profile import load_profile
+from sound_bank import SoundBank, init_mixer
+from preview import CameraPreview, inference_frame
+import metrics_server
+import tracing
+import landmark_log
+import exercise_stats
+import video_recorder
+from profiling import StateProfiler
+
+tracing.start("GAME")  # MOTION_TRACE=1 records a Chrome trace of the game loop
+landmark_log.start("GAME")  # MOTION_RECORD=1 records the landmarks fed to the core
 
 # --- Pygame and Game Constants ---
+init_mixer()  # Small mixer buffer; must be opened before pygame.init()
 pygame.init()
-pygame.mixer.init()  # Initialize the mixer for sound
 
-# Screen dimensions
-SCREEN_WIDTH = 1200
-SCREEN_HEIGHT = 800
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("体感射击游戏")
+# Frame rate, capture size and starting quality measured for this machine (calibrate.py)
+profile = load_profile()
+
+# Screen dimensions (the simulation in game_core.py uses the same logical canvas)
+SCREEN_WIDTH = game_core.SCREEN_WIDTH
+SCREEN_HEIGHT = game_core.SCREEN_HEIGHT
+# Everything is drawn on a fixed logical canvas that Display scales to the screen
+display = Display((SCREEN_WIDTH, SCREEN_HEIGHT), "体感射击游戏")
+screen = display.surface
+compositor = Compositor(screen, present=display.present)
 
 try:
     background_image = pygame.image.load("背景图1.png").convert()
@@ -35,88 +60,38 @@ RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 ORANGE = (255, 165, 0)
 
-# Fonts
-try:
-    font_title = pygame.font.Font("SanJiHuaChaoTi-Cu-2.ttf", 130)
-    font_title.bold = True
-    font_large = pygame.font.Font("SanJiHuaChaoTi-Cu-2.ttf", 48)
-    font_large.bold = True
-    font_medium = pygame.font.Font("dinglieciweifont.ttf", 36)
-    font_small = pygame.font.Font("dinglieciweifont.ttf", 36)
-    font_score = pygame.font.Font("dinglieciweifont.ttf", 40)
-except FileNotFoundError:
-     font_title = pygame.font.SysFont("SimHei", 130, bold=True)
-     font_large = pygame.font.SysFont("SimHei", 48, bold=True)
-     font_medium = pygame.font.SysFont("SimHei", 36)
-     font_small = pygame.font.SysFont("SimHei", 36)
-     font_score = pygame.font.SysFont("SimHei", 40)
+# Fonts (shared registry: custom font files first, then the machine's CJK font)
+TITLE_FONT_FILE = "SanJiHuaChaoTi-Cu-2.ttf"
+BODY_FONT_FILE = "dinglieciweifont.ttf"
+font_title = fonts.get_font(130, TITLE_FONT_FILE, bold=True)
+font_large = fonts.get_font(48, TITLE_FONT_FILE, bold=True)
+font_medium = fonts.get_font(36, BODY_FONT_FILE)
+font_small = fonts.get_font(36, BODY_FONT_FILE)
+font_score = fonts.get_font(40, BODY_FONT_FILE)
 
 # --- Sound Setup ---
-try:
-    sound_explosion = pygame.mixer.Sound("fire.mp3")
-except pygame.error:
-    print("Warning: fire.mp3 not found. Please place an explosion sound file in the game directory.")
-    sound_explosion = None
+sounds = SoundBank()
+SOUND_EXPLOSION = "fire.mp3"
+sounds.preload([SOUND_EXPLOSION])
 
 # --- Game Objects ---
-class Ball:
-    """A single target object for the player to shoot."""
-    def __init__(self, image_path, balls=[]):
-        self.radius = 80  # Object size
-        self.image_path = image_path
-        
-        if os.path.exists(self.image_path):
-            self.image = pygame.image.load(self.image_path).convert_alpha()
-            self.image = pygame.transform.scale(self.image, (self.radius * 2, self.radius * 2))
-        else:
-            print(f"Warning: Image not found at {self.image_path}. Using a placeholder circle.")
-            self.image = None
-
-        self.color = random.choice([BLUE, ACCENT_GREEN, RED, YELLOW, ORANGE])
-        self.pos = self.get_random_pos(balls)
-        self.velocity = self.get_random_velocity()
-
-    def get_random_pos(self, balls):
-        while True:
-            new_pos = [random.randint(self.radius, SCREEN_WIDTH - self.radius),
-                       random.randint(self.radius, SCREEN_HEIGHT - self.radius)]
-            overlap = False
-            for ball in balls:
-                dist_to_ball = math.sqrt((new_pos[0] - ball.pos[0])**2 + (new_pos[1] - ball.pos[1])**2)
-                if dist_to_ball < self.radius + ball.radius:
-                    overlap = True
-                    break
-            if not overlap:
-                return new_pos
-
-    def get_random_velocity(self):
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(3, 6)
-        return [speed * math.cos(angle), speed * math.sin(angle)]
-
-    def update(self):
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
-        
-        if self.pos[0] <= self.radius:
-            self.pos[0] = self.radius
-            self.velocity[0] *= -1
-        elif self.pos[0] >= SCREEN_WIDTH - self.radius:
-            self.pos[0] = SCREEN_WIDTH - self.radius
-            self.velocity[0] *= -1
-        
-        if self.pos[1] <= self.radius:
-            self.pos[1] = self.radius
-            self.velocity[1] *= -1
-        elif self.pos[1] >= SCREEN_HEIGHT - self.radius:
-            self.pos[1] = SCREEN_HEIGHT - self.radius
-            self.velocity[1] *= -1
+# Targets, particles and scores live in game_core.py; this file only draws them.
+# Each target image is loaded once per kind.
+TARGET_RADIUS = 80
+target_images = {}
+for kind in game_core.TARGET_KINDS:
+    if os.path.exists(kind):
+        with tracing.span("load ball image", "asset", path=kind):
+            image = pygame.image.load(kind).convert_alpha()
+            target_images[kind] = pygame.transform.scale(image, (TARGET_RADIUS * 2, TARGET_RADIUS * 2))
+    else:
+        print(f"Warning: Image not found at {kind}. Using a placeholder circle.")
 
-    def draw(self, surface):
-        if self.image:
-            surface.blit(self.image, (self.pos[0] - self.radius, self.pos[1] - self.radius))
-        else:
-            pygame.draw.circle(surface, self.color, (int(self.pos[0]), int(self.pos[1])), self.radius)
+def draw_ball(surface, ball):
+    image = target_images.get(ball.kind)
+    if image:
+        return surface.blit(image, (ball.pos[0] - ball.radius, ball.pos[1] - ball.radius))
+    return pygame.draw.circle(surface, ball.color, (int(ball.pos[0]), int(ball.pos[1])), ball.radius)
 
 class Crosshair:
     """The player's aiming cursor controlled by hand gestures."""
@@ -163,236 +138,184 @@ class Crosshair:
         if self.image:
             # Center the current image on the hand position and draw it
             self.rect.center = (int(self.pos[0]), int(self.pos[1]))
-            surface.blit(self.image, self.rect)
+            return surface.blit(self.image, self.rect)
         else:
             # Draw the original circle if images failed to load
-            pygame.draw.circle(surface, self.color, (int(self.pos[0]), int(self.pos[1])), self.radius, 3)
-
-class Particle:
-    """A single particle for the explosion effect."""
-    def __init__(self, x, y, color):
-        self.pos = [x, y]
-        self.velocity = [random.uniform(-3, 3), random.uniform(-3, 3)]
-        self.radius = random.randint(3, 8)
-        self.color = color
-        self.lifetime = 60
-
-    def update(self):
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
-        self.radius -= 0.1
-        self.lifetime -= 1
+            return pygame.draw.circle(surface, self.color, (int(self.pos[0]), int(self.pos[1])), self.radius, 3)
 
-    def draw(self, surface):
-        if self.radius > 0:
-            pygame.draw.circle(surface, self.color, (int(self.pos[0]), int(self.pos[1])), int(self.radius))
+def draw_particle(surface, particle):
+    if particle.radius > 0:
+        return pygame.draw.circle(surface, particle.color, (int(particle.pos[0]), int(particle.pos[1])), int(particle.radius))
 
 # --- OpenCV and MediaPipe Setup ---
-cap = cv2.VideoCapture(0)
+# Reopens the camera with backoff when it is unplugged or stops delivering frames;
+# MOTION_CAMERA selects a video file, image sequence or synthetic source instead (camera_sources.py)
+camera = open_camera(0, profile["capture_size"], name="GAME camera")
 mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(static_image_mode=False, max_num_hands=1, min_detection_confidence=0.7, min_tracking_confidence=0.5)
 mp_drawing = mp.solutions.drawing_utils
 
-# --- Game State ---
-game_state = "loading"  # "loading", "transition", "playing"
-pingpong_score = 0
-fishing_score = 0
-healing_score = 0
-loading_start_time = 0
-transition_start_time = 0
+def create_hands(model_complexity):
+    return mp_hands.Hands(static_image_mode=False, max_num_hands=1, model_complexity=model_complexity,
+                          min_detection_confidence=0.7, min_tracking_confidence=profile["tracking_confidence"])
+
+# Lowers particles, preview rate and tracking cost when frames run over budget
+governor = QualityGovernor(profile["fps"], start_level=profile["quality_level"], name="GAME governor")
+hands_complexity = governor["model_complexity"]
+hands = create_hands(hands_complexity)
+camera_preview = CameraPreview((200, 150), interval=governor["preview_interval"])
+
 game_to_switch_to = None
 
 # --- Loading Screen Elements ---
 start_ball = {
-    'pos': [SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 150],
-    'radius': 80,
+    'pos': list(game_core.START_BALL_POS),
+    'radius': game_core.START_BALL_RADIUS,
     'color': ACCENT_GREEN,
     'text_color': WHITE
 }
 
+# --- Static Screen Layers ---
+# These are drawn once into cached layers by the compositor instead of every frame
+def draw_background(surface):
+    if background_image:
+        surface.blit(background_image, (0, 0))
+    else:
+        surface.fill(LIGHT_GRAY)
+
+def draw_start_screen(surface, title_color, start_hint):
+    draw_background(surface)
+
+    title_text = font_title.render("银动﹒乐享", True, title_color)
+    title_rect = title_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 150))
+    surface.blit(title_text, title_rect)
+
+    instruction_text = font_small.render("游戏玩法：通过手势移动准星，并用捏合手势射击目标！", True, DARK_GRAY)
+    instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 50))
+    surface.blit(instruction_text, instruction_rect)
+
+    start_instruction = font_medium.render(start_hint, True, DARK_GRAY)
+    start_rect = start_instruction.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 20))
+    surface.blit(start_instruction, start_rect)
+
+    pygame.draw.circle(surface, start_ball['color'], (int(start_ball['pos'][0]), int(start_ball['pos'][1])), start_ball['radius'])
+    start_text = font_large.render("开始", True, start_ball['text_color'])
+    start_text_rect = start_text.get_rect(center=(start_ball['pos'][0], start_ball['pos'][1]))
+    surface.blit(start_text, start_text_rect)
+
+def draw_loading_layer(surface):
+    draw_start_screen(surface, WHITE, "请移动准星到绿色的'开始'球上, 开始游戏")
+
+def draw_transition_layer(surface):
+    # Keep the loading screen visible in the background
+    draw_start_screen(surface, DARK_GRAY, "请移动准星到绿色的'开始'球上, 以开始游戏")
+
+    # Semi-transparent overlay (black with 180/255 alpha), reused between builds
+    surface.blit(compositor.overlay((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0, 0, 180)), (0, 0))
+
+    # Display the "Loading..." text
+    loading_text = font_large.render("抓乒乓球拍或草药！分数大于5即可进入对应游戏！", True, WHITE)
+    loading_rect = loading_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2))
+    surface.blit(loading_text, loading_rect)
+
+def draw_reconnecting_layer(surface):
+    draw_background(surface)
+    surface.blit(compositor.overlay((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0, 0, 180)), (0, 0))
+    title = font_large.render("摄像头重新连接中...", True, WHITE)
+    surface.blit(title, title.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 30)))
+    hint = font_small.render("请检查摄像头连接", True, LIGHT_GRAY)
+    surface.blit(hint, hint.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 40)))
+
 # --- Game Elements ---
-balls = []
-image_files = ["钓鱼竿.png", "乒乓球拍.png", "中草药.png"]
 crosshair = Crosshair()
-last_shoot_time = 0
-particles = []
+# Game state ("loading", "transition", "playing"), targets and scores, stepped once per frame
+core = game_core.ShootingCore(crosshair_radius=crosshair.radius, particle_cap=governor["particle_cap"])
 
 # Game loop variables
 running = True
 clock = pygame.time.Clock()
+# Per-stage timings; F3 shows the HUD
+frame_timer = FrameTimer("GAME", profile["fps"])
+# Localhost Prometheus endpoint when MOTION_METRICS_PORT is set; the gauges are read only when scraped
+metrics = metrics_server.start("GAME")
+metrics.watch_game(clock, lambda: core.state, camera, compositor, sounds, governor)
+hand_metrics = metrics.tracker("hands")
+# Movement, reach and repetition statistics, computed on a background thread
+exercise_stats.start("GAME", metrics)
+# MOTION_VIDEO=1 records a clip of the screen; encoded in a separate process
+video_recorder.start("GAME", screen, metrics)
+# F4 (or SIGUSR1) samples the loop for a few seconds, split by core.state
+profiler = StateProfiler("GAME", lambda: core.state)
+profiler.install_signal()
 
 # Main Game Loop
 while running:
+    frame_timer.begin()
+    tracing.scene(core.state)
     # --- Event Handling ---
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
+        elif frame_timer.handle_event(event):
+            compositor.invalidate()
+        elif profiler.handle_event(event):
+            continue
+    frame_timer.lap("events")
 
     # --- OpenCV Hand Tracking Logic ---
-    ret, frame = cap.read()
-    if not ret:
-        print("Error: Could not read frame from camera.")
+    read_start = time.perf_counter()
+    frame = camera.read()
+    camera_wait_ms = (time.perf_counter() - read_start) * 1000
+    if frame is None:
+        # Camera away: keep the window responsive at a low rate until the supervisor
+        # reconnects. Still connected (no frame yet): just skip this frame.
+        if not camera.connected:
+            compositor.begin(compositor.layer("reconnecting", None, draw_reconnecting_layer))
+            compositor.present()
+        frame_timer.skip()
+        clock.tick(profile["fps"] if camera.connected else RECONNECT_FPS)
         continue
+    frame_timer.lap("camera")
 
-    frame = cv2.flip(frame, 1)
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    # Mirrored, downscaled RGB frame shared by the tracker and the preview
+    rgb_frame = inference_frame(frame, governor["inference_width"], mirror=True)
+    frame_timer.lap("convert")
+    inference_start = time.perf_counter()
     results = hands.process(rgb_frame)
+    hand_metrics.observe(time.perf_counter() - inference_start, bool(results.multi_hand_landmarks))
+    frame_timer.lap("inference")
 
+    landmarks = None
     if results.multi_hand_landmarks:
-        for hand_landmarks in results.multi_hand_landmarks:
-            index_finger_tip = hand_landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP]
-            thumb_tip = hand_landmarks.landmark[mp_hands.HandLandmark.THUMB_TIP]
-            hand_x = int(index_finger_tip.x * SCREEN_WIDTH)
-            hand_y = int(index_finger_tip.y * SCREEN_HEIGHT)
-            crosshair.update(hand_x, hand_y)
-
-            # Check for pinch gesture to change cursor image
-            distance = math.sqrt((thumb_tip.x - index_finger_tip.x)**2 + (thumb_tip.y - index_finger_tip.y)**2)
-            if distance < 0.05:
-                crosshair.set_state(is_closed=True)
-            else:
-                crosshair.set_state(is_closed=False)
-
-            # --- State-Specific Logic ---
-            if game_state == "loading":
-                dist_to_ball = math.sqrt((crosshair.pos[0] - start_ball['pos'][0])**2 + (crosshair.pos[1] - start_ball['pos'][1])**2)
-                
-                if dist_to_ball < start_ball['radius'] + crosshair.radius:
-                    if loading_start_time == 0:
-                        loading_start_time = pygame.time.get_ticks()
-                    
-                    elapsed_time = pygame.time.get_ticks() - loading_start_time
-                    if elapsed_time >= 1000:
-                        game_state = "transition"
-                        transition_start_time = pygame.time.get_ticks()
-                        loading_start_time = 0  # Reset the loading timer
-                else:
-                    loading_start_time = 0
-            elif game_state == "playing":
-                # The distance is already calculated, just use it for shooting logic
-                if distance < 0.05 and pygame.time.get_ticks() - last_shoot_time > 500:
-                    for i, ball in enumerate(balls):
-                        dist_to_ball = math.sqrt((crosshair.pos[0] - ball.pos[0])**2 + (crosshair.pos[1] - ball.pos[1])**2)
-                        if dist_to_ball <= ball.radius + crosshair.radius:
-                            if ball.image_path == "乒乓球拍.png":
-                                pingpong_score += 1
-                            elif ball.image_path == "钓鱼竿.png":
-                                fishing_score += 1
-                            elif ball.image_path == "中草药.png":
-                                healing_score += 1
-
-                            if sound_explosion:
-                                sound_explosion.play()
-                            for _ in range(30):
-                                particles.append(Particle(ball.pos[0], ball.pos[1], ball.color))
-                            
-                            shot_ball_type = ball.image_path
-                            other_balls = [b for b in balls if b is not ball]
-                            
-                            is_last_of_type = not any(b.image_path == shot_ball_type for b in other_balls)
-                            
-                            if is_last_of_type:
-                                new_image_path = shot_ball_type
-                            else:
-                                new_image_path = random.choice(image_files)
-                            
-                            balls[i] = Ball(image_path=new_image_path, balls=other_balls)
-                            last_shoot_time = pygame.time.get_ticks()
-                            
-                            if pingpong_score > 5:
-                                game_to_switch_to = "pingpong.py"
-                                running = False
-                            elif healing_score > 5:
-                                game_to_switch_to = "medicine.py"
-                                running = False
-                            break
-
-    # --- Game Logic ---
-    if game_state == "transition":
-        if pygame.time.get_ticks() - transition_start_time > 2000:  # Show loading for 2 seconds
-            game_state = "playing"
-            pingpong_score = 0
-            fishing_score = 0
-            healing_score = 0
-            particles = []
-            last_shoot_time = 0
-            balls = []
-
-            # Ensure at least one of each ball type
-            for image_path in image_files:
-                balls.append(Ball(image_path=image_path, balls=balls))
-
-            # Fill the rest with random balls up to 8
-            remaining_balls_count = 8 - len(image_files)
-            for _ in range(remaining_balls_count):
-                image_path = random.choice(image_files)
-                balls.append(Ball(image_path=image_path, balls=balls))
-
-            try:
-                pygame.mixer.music.load("spring.mp3")
-                pygame.mixer.music.play(loops=-1)
-            except pygame.error:
-                pass
-    if game_state == "playing":
-        for ball in balls:
-            ball.update()
-
-        for i in range(len(balls)):
-            for j in range(i + 1, len(balls)):
-                ball1, ball2 = balls[i], balls[j]
-                dist_vec = [ball1.pos[0] - ball2.pos[0], ball1.pos[1] - ball2.pos[1]]
-                dist = math.sqrt(dist_vec[0]**2 + dist_vec[1]**2)
-                if dist < ball1.radius + ball2.radius:
-                    overlap = (ball1.radius + ball2.radius) - dist
-                    if dist == 0: dist = 1
-                    normal_vec = [dist_vec[0] / dist, dist_vec[1] / dist]
-                    ball1.pos[0] += normal_vec[0] * overlap / 2
-                    ball1.pos[1] += normal_vec[1] * overlap / 2
-                    ball2.pos[0] -= normal_vec[0] * overlap / 2
-                    ball2.pos[1] -= normal_vec[1] * overlap / 2
-                    v1, v2 = ball1.velocity, ball2.velocity
-                    x1_minus_x2 = [ball1.pos[0] - ball2.pos[0], ball1.pos[1] - ball2.pos[1]]
-                    dist_squared = x1_minus_x2[0]**2 + x1_minus_x2[1]**2
-                    if dist_squared == 0: continue
-                    dot_product = (v1[0] - v2[0]) * x1_minus_x2[0] + (v1[1] - v2[1]) * x1_minus_x2[1]
-                    factor = dot_product / dist_squared
-                    change_vx, change_vy = factor * x1_minus_x2[0], factor * x1_minus_x2[1]
-                    ball1.velocity[0] -= change_vx
-                    ball1.velocity[1] -= change_vy
-                    ball2.velocity[0] += change_vx
-                    ball2.velocity[1] += change_vy
-
-        for particle in particles:
-            particle.update()
-        particles = [p for p in particles if p.lifetime > 0]
+        landmarks = [(lm.x, lm.y) for lm in results.multi_hand_landmarks[0].landmark]
+    if camera_preview.due():
+        camera_preview.update(rgb_frame, landmarks, mp_hands.HAND_CONNECTIONS)
+    frame_timer.lap("preview")
+
+    # --- Game Logic (game_core.py) ---
+    dt = clock.get_time() / 1000
+    tracked = {"hands": (landmarks, landmark_log.hand_confidence(results))}
+    landmark_log.record(core.state, dt, tracked)
+    exercise_stats.observe(dt, tracked)
+    core.step(dt, landmarks)
+    crosshair.update(*core.crosshair)
+    crosshair.set_state(is_closed=core.pinching)
+    for effect in core.effects:
+        if effect == "explosion":
+            sounds.play(SOUND_EXPLOSION)
+        elif effect == "round_started":
+            sounds.play_music("spring.mp3")
+    if core.switch_to:
+        game_to_switch_to = core.switch_to
+        running = False
+    frame_timer.lap("logic")
 
     # --- Drawing ---
-    if background_image:
-        screen.blit(background_image, (0, 0))
-    else:
-        screen.fill(LIGHT_GRAY)
-
-    if game_state == "loading":
-        title_text = font_title.render("银动﹒乐享", True, WHITE)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 150))
-        screen.blit(title_text, title_rect)
-        
-        instruction_text = font_small.render("游戏玩法：通过手势移动准星，并用捏合手势射击目标！", True, DARK_GRAY)
-        instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 50))
-        screen.blit(instruction_text, instruction_rect)
-        
-        start_instruction = font_medium.render("请移动准星到绿色的'开始'球上, 开始游戏", True, DARK_GRAY)
-        start_rect = start_instruction.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 20))
-        screen.blit(start_instruction, start_rect)
-
-        pygame.draw.circle(screen, start_ball['color'], (int(start_ball['pos'][0]), int(start_ball['pos'][1])), start_ball['radius'])
-        start_text = font_large.render("开始", True, start_ball['text_color'])
-        start_text_rect = start_text.get_rect(center=(start_ball['pos'][0], start_ball['pos'][1]))
-        screen.blit(start_text, start_text_rect)
-
-        if loading_start_time != 0:
-            elapsed_time = pygame.time.get_ticks() - loading_start_time
-            progress = min(elapsed_time / 1000.0, 1.0)
+    # Static screens come from cached layers; only the moving parts are redrawn and presented
+    if core.state == "loading":
+        compositor.begin(compositor.layer("loading", None, draw_loading_layer))
+
+        progress = core.hold_progress
+        if progress is not None:
             end_angle_rad = progress * 2 * math.pi
 
             if end_angle_rad > 0:
@@ -400,72 +323,63 @@ while running:
                                        start_ball['pos'][1] - start_ball['radius'],
                                        start_ball['radius'] * 2,
                                        start_ball['radius'] * 2)
-                pygame.draw.arc(screen, BLUE, arc_rect, -math.pi / 2, -math.pi / 2 + end_angle_rad, 10)
-    elif game_state == "transition":
-        # Keep the loading screen visible in the background
-        title_text = font_title.render("银动﹒乐享", True, DARK_GRAY)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 150))
-        screen.blit(title_text, title_rect)
-        
-        instruction_text = font_small.render("游戏玩法：通过手势移动准星，并用捏合手势射击目标！", True, DARK_GRAY)
-        instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 50))
-        screen.blit(instruction_text, instruction_rect)
-        
-        start_instruction = font_medium.render("请移动准星到绿色的'开始'球上, 以开始游戏", True, DARK_GRAY)
-        start_rect = start_instruction.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 20))
-        screen.blit(start_instruction, start_rect)
-
-        pygame.draw.circle(screen, start_ball['color'], (int(start_ball['pos'][0]), int(start_ball['pos'][1])), start_ball['radius'])
-        start_text = font_large.render("开始", True, start_ball['text_color'])
-        start_text_rect = start_text.get_rect(center=(start_ball['pos'][0], start_ball['pos'][1]))
-        screen.blit(start_text, start_text_rect)
-
-        # Create a semi-transparent overlay
-        popup_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        popup_surface.fill((0, 0, 0, 180))  # Black with 180/255 alpha
-        screen.blit(popup_surface, (0, 0))
-
-        # Display the "Loading..." text
-        loading_text = font_large.render("抓乒乓球拍或草药！分数大于5即可进入对应游戏！", True, WHITE)
-        loading_rect = loading_text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2))
-        screen.blit(loading_text, loading_rect)
-    elif game_state == "playing":
-        for ball in balls:
-            ball.draw(screen)
-        for particle in particles:
-            particle.draw(screen)
-        pingpong_score_text = font_score.render(f"乒乓球分数: {pingpong_score}", True, WHITE)
-        screen.blit(pingpong_score_text, (20, 20))
-        
-        fishing_score_text = font_score.render(f"钓鱼分数: {fishing_score}", True, WHITE)
-        screen.blit(fishing_score_text, (20, 60))
-
-        healing_score_text = font_score.render(f"治疗分数: {healing_score}", True, WHITE)
-        screen.blit(healing_score_text, (20, 100))
-
-    crosshair.draw(screen)
-    frame_scaled = cv2.resize(frame, (200, 150))
-    frame_rgb = cv2.cvtColor(frame_scaled, cv2.COLOR_BGR2RGB)
-    frame_pygame = pygame.image.frombuffer(frame_rgb.tobytes(), frame_rgb.shape[1::-1], "RGB")
-    screen.blit(frame_pygame, (SCREEN_WIDTH - 220, 20))
-
-    pygame.display.flip()
-    clock.tick(60)
+                compositor.mark(pygame.draw.arc(screen, BLUE, arc_rect, -math.pi / 2, -math.pi / 2 + end_angle_rad, 10))
+    elif core.state == "transition":
+        compositor.begin(compositor.layer("transition", None, draw_transition_layer))
+    elif core.state == "playing":
+        compositor.begin(compositor.layer("background", None, draw_background))
+        for ball in core.balls:
+            compositor.mark(draw_ball(screen, ball))
+        for particle in core.particles:
+            compositor.mark(draw_particle(screen, particle))
+        scores = core.scores
+        compositor.blit(compositor.text(font_score, f"乒乓球分数: {scores[game_core.PINGPONG]}", WHITE), (20, 20))
+        compositor.blit(compositor.text(font_score, f"钓鱼分数: {scores[game_core.FISHING]}", WHITE), (20, 60))
+        compositor.blit(compositor.text(font_score, f"治疗分数: {scores[game_core.HEALING]}", WHITE), (20, 100))
+
+    compositor.mark(crosshair.draw(screen))
+    compositor.blit(camera_preview.surface, (SCREEN_WIDTH - 220, 20))
+    frame_timer.draw(compositor, (10, SCREEN_HEIGHT - 10))
+    frame_timer.lap("render")
+
+    compositor.present()
+    video_recorder.capture(screen)
+    frame_timer.lap("present")
+    clock.tick(profile["fps"])
+
+    # get_rawtime() is the frame's work time, without the tick() sleep; the wait for the
+    # camera's next frame is left out too, or a 30 fps camera alone would fill the
+    # budget and push the quality down
+    if governor.frame(max(clock.get_rawtime() - camera_wait_ms, 0)):
+        camera_preview.interval = governor["preview_interval"]
+        core.particle_cap = governor["particle_cap"]
+        if governor["model_complexity"] != hands_complexity:
+            hands.close()
+            hands_complexity = governor["model_complexity"]
+            hands = create_hands(hands_complexity)
 
 # Clean up
-cap.release()
-cv2.destroyAllWindows()
+frame_timer.dump()
+camera.release()
 pygame.quit()
+metrics.stop()  # free the port for the game launched next
+landmark_log.stop()
+exercise_stats.stop()
+video_recorder.stop()
 
 if game_to_switch_to:
     print(f"正在切换到 {game_to_switch_to}...")
     try:
         # Use sys.executable to ensure the same python interpreter is used
         script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), game_to_switch_to)
-        subprocess.run([sys.executable, script_path], check=True)
+        # The launched game inherits MOTION_TRACE and writes its own trace file
+        with tracing.span("switch game", "scene", script=game_to_switch_to):
+            subprocess.run([sys.executable, script_path], check=True)
     except FileNotFoundError:
         print(f"错误: '{script_path}' 未找到。无法启动下一个游戏。")
     except subprocess.CalledProcessError as e:
         print(f"执行 '{game_to_switch_to}' 时出错: {e}")
     except Exception as e:
-        print(f"发生未知错误: {e}")
\ No newline at end of file
+        print(f"发生未知错误: {e}")
+
+tracing.stop()
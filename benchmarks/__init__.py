@@ -0,0 +1,3 @@
+"""Micro-benchmarks for the games' hot paths. Run from the repository root, e.g.
+``python -m benchmarks.bench_pil_conversion``; ``python -m benchmarks.suite`` runs
+the regression suite against a stored baseline."""
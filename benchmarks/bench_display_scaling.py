@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Frame time at 1080p and 4K: rendering at display resolution vs a logical canvas plus one scaling stage.
+
+Runs on the SDL dummy driver, so the numbers are the CPU side only: the GPU
+stretch done by SCALED mode is not included (it is the reason that mode costs
+the same as the logical size). Usage: python -m benchmarks.bench_display_scaling
+"""
+import argparse
+import os
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from display import Display
+
+LOGICAL_SIZE = (1200, 800)
+TARGETS = [("1080p", (1920, 1080)), ("4K", (3840, 2160))]
+SPRITES = 12  # roughly GAME.py's balls, crosshair and preview
+
+
+def make_scene(size, scale):
+    background = pygame.Surface(size).convert()
+    background.fill((90, 140, 200))
+    sprite = pygame.Surface((int(160 * scale), int(160 * scale)), pygame.SRCALPHA)
+    pygame.draw.circle(sprite, (255, 200, 0, 255), sprite.get_rect().center, sprite.get_width() // 2)
+    positions = [(int((80 + 90 * i) * scale), int((100 + 40 * i) * scale)) for i in range(SPRITES)]
+    return background, sprite, positions
+
+
+def draw_scene(surface, scene):
+    background, sprite, positions = scene
+    surface.blit(background, (0, 0))
+    return [surface.blit(sprite, pos) for pos in positions]
+
+
+def time_frame(func, repeat):
+    return min(timeit.repeat(func, number=repeat, repeat=3)) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=60)
+    args = parser.parse_args()
+    pygame.init()
+
+    print(f"{'target':<7} {'native render':>14} {'canvas+full scale':>18} {'canvas+dirty rects':>19}")
+    for label, target in TARGETS:
+        # Old approach: draw everything at the display resolution
+        native = pygame.display.set_mode(target)
+        scale = min(target[0] / LOGICAL_SIZE[0], target[1] / LOGICAL_SIZE[1])
+        native_scene = make_scene(target, scale)
+        native_ms = time_frame(lambda: draw_scene(native, native_scene), args.repeat)
+
+        # New approach: draw on the logical canvas, scale once when presenting
+        display = Display(LOGICAL_SIZE, "bench", mode="software", target_size=target)
+        canvas_scene = make_scene(LOGICAL_SIZE, 1.0)
+
+        def full_frame():
+            draw_scene(display.surface, canvas_scene)
+            display.present()
+
+        def dirty_frame():
+            background, sprite, positions = canvas_scene
+            rects = [display.surface.blit(sprite, pos) for pos in positions]
+            display.present(rects)
+
+        full_ms = time_frame(full_frame, args.repeat)
+        dirty_ms = time_frame(dirty_frame, args.repeat)
+        print(f"{label:<7} {native_ms:11.2f} ms {full_ms:15.2f} ms {dirty_ms:16.2f} ms")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
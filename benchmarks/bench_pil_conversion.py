@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Compare the old PNG round-trip PIL->pygame conversion with the direct buffer path.
+
+Usage: python -m benchmarks.bench_pil_conversion [--repeat N]
+"""
+import argparse
+import io
+import os
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from PIL import Image, ImageDraw, ImageFont
+
+from imaging import pil_to_surface, load_scaled_image
+
+
+def png_round_trip(image):
+    """The conversion medicine.py used before: encode to PNG, decode with pygame."""
+    byte_io = io.BytesIO()
+    image.save(byte_io, format="PNG")
+    byte_io.seek(0)
+    return pygame.image.load(byte_io)
+
+
+def make_text_image(text="功效: 大补元气，复脉固脱，补脾益肺，生津安神", font_size=24):
+    font = ImageFont.load_default()
+    bbox = ImageDraw.Draw(Image.new("RGB", (1, 1))).textbbox((0, 0), text, font=font)
+    width = bbox[2] - bbox[0] + 20
+    height = bbox[3] - bbox[1] + 20
+    image = Image.new("RGBA", (max(width, 600), max(height, font_size + 20)), (0, 0, 0, 0))
+    ImageDraw.Draw(image).text((10, 10), text, font=font, fill=(50, 110, 50))
+    return image
+
+
+def load_herb_old(path, target_size=(150, 150)):
+    img = Image.open(path).convert("RGBA").resize(target_size, Image.LANCZOS)
+    return png_round_trip(img)
+
+
+def load_herb_new(path, target_size=(150, 150)):
+    return pil_to_surface(load_scaled_image(path, target_size))
+
+
+def bench(label, func, repeat):
+    seconds = min(timeit.repeat(func, number=repeat, repeat=3)) / repeat
+    print(f"{label:<40} {seconds * 1e6:10.1f} us")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--image", default="gancao.jpg", help="herb image used for the load benchmark")
+    args = parser.parse_args()
+
+    pygame.init()
+    text_image = make_text_image()
+
+    print(f"text image {text_image.size}")
+    old = bench("  PNG round-trip", lambda: png_round_trip(text_image), args.repeat)
+    new = bench("  direct buffer", lambda: pil_to_surface(text_image), args.repeat)
+    print(f"  speed-up x{old / new:.1f}")
+
+    if os.path.exists(args.image):
+        print(f"herb image {args.image}")
+        repeat = max(1, args.repeat // 10)
+        old = bench("  open+resize+PNG round-trip", lambda: load_herb_old(args.image), repeat)
+        new = bench("  draft decode+resize+direct buffer", lambda: load_herb_new(args.image), repeat)
+        print(f"  speed-up x{old / new:.1f}")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Per-frame cost of building the camera preview thumbnail, old paths vs the shared stage.
+
+Usage: python -m benchmarks.bench_preview [--width 1280 --height 720 --repeat N]
+"""
+import argparse
+import os
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import cv2
+import numpy as np
+import pygame
+
+from preview import CameraPreview, inference_frame, INFERENCE_WIDTH
+
+# A simple chain of 21 "hand" points and the pairs that join them
+HAND_POINTS = [(0.3 + 0.02 * i, 0.4 + 0.01 * (i % 5)) for i in range(21)]
+HAND_CONNECTIONS = [(i, i + 1) for i in range(20)]
+
+
+def game_py_old(frame):
+    """GAME.py: resize, BGR->RGB, tobytes, frombuffer."""
+    frame_scaled = cv2.resize(frame, (200, 150))
+    frame_rgb = cv2.cvtColor(frame_scaled, cv2.COLOR_BGR2RGB)
+    return pygame.image.frombuffer(frame_rgb.tobytes(), frame_rgb.shape[1::-1], "RGB")
+
+
+def pingpong_old(frame):
+    """pingpong.py: landmarks at full resolution, rotate, make_surface, flip, scale."""
+    frame = cv2.resize(frame, (1000, 800))
+    h, w = frame.shape[:2]
+    points = [(int(x * w), int(y * h)) for x, y in HAND_POINTS]
+    for start, end in HAND_CONNECTIONS:
+        cv2.line(frame, points[start], points[end], (0, 255, 0), 2)
+    surface = pygame.surfarray.make_surface(cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE))
+    surface = pygame.transform.flip(surface, True, False)
+    return pygame.transform.scale(surface, (200, 150))
+
+
+def medicine_old(frame):
+    """medicine.py: BGR->RGB, second mirror, rot90, make_surface at full size."""
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    frame = cv2.flip(frame, 1)
+    frame = np.rot90(frame)
+    return pygame.surfarray.make_surface(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    pygame.init()
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    # The shared stage starts from the frame that is prepared for inference anyway
+    rgb = inference_frame(frame, INFERENCE_WIDTH, mirror=True)
+    preview = CameraPreview((200, 150))
+
+    cases = [
+        ("GAME.py (old)", lambda: game_py_old(frame)),
+        ("pingpong.py (old)", lambda: pingpong_old(frame.copy())),
+        ("medicine.py (old)", lambda: medicine_old(frame)),
+        ("inference frame (shared, not preview cost)", lambda: inference_frame(frame, INFERENCE_WIDTH, mirror=True)),
+        ("CameraPreview.update", lambda: preview.update(rgb, HAND_POINTS, HAND_CONNECTIONS)),
+    ]
+    print(f"camera frame {args.width}x{args.height}, inference frame {rgb.shape[1]}x{rgb.shape[0]}")
+    for label, func in cases:
+        seconds = min(timeit.repeat(func, number=args.repeat, repeat=3)) / args.repeat
+        print(f"  {label:<44} {seconds * 1e6:10.1f} us/frame")
+    print(f"  CameraPreview refreshes every {preview.interval * 1000:.0f} ms, so its cost is paid on a fraction of frames")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
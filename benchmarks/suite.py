@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""Benchmark suite for the games' hot paths, checked against a stored baseline.
+
+Every case runs fixed, seeded inputs on the SDL dummy driver: no camera,
+window or GPU is needed. Each case is timed with timeit (auto-ranged to
+about 0.2 s per run, best of --repeat runs). The results are written as JSON to
+.cache/benchmarks/suite-<time>.json. When a baseline exists, a case fails if its
+best time is more than --max-slowdown times the baseline's; the exit code is
+then 1. Baselines are per machine: save one with --save-baseline on the
+machine that will run the comparisons.
+
+Usage: python -m benchmarks.suite [--save-baseline] [--baseline PATH] [--max-slowdown 1.3] [--only NAME ...]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import cv2
+import numpy as np
+import pygame
+
+import game_core
+import medicine_core
+import pingpong_core
+from imaging import create_text_image, load_custom_image
+from paths import cache_path
+from preview import CameraPreview, inference_frame, INFERENCE_WIDTH
+
+HAND_CONNECTIONS = [(i, i + 1) for i in range(20)]
+
+
+def open_palm():
+    """21 hand points of an open palm (all fingers and the thumb extended)."""
+    points = [(0.5, 0.9)] * 21
+    for finger, x in zip(range(5, 21, 4), (0.42, 0.48, 0.54, 0.6)):
+        mcp, pip, dip, tip = range(finger, finger + 4)
+        points[mcp], points[pip], points[dip], points[tip] = (x, 0.7), (x, 0.55), (x, 0.45), (x, 0.35)
+    points[1], points[2], points[3], points[4] = (0.4, 0.8), (0.36, 0.75), (0.3, 0.7), (0.25, 0.65)
+    return points
+
+
+# --- Cases: each returns the function to time ---
+def game_targets(count):
+    rng = random.Random(0)
+    balls = []
+    for i in range(count):
+        balls.append(game_core.Ball(game_core.TARGET_KINDS[i % 3], balls, rng))
+    return balls
+
+
+def case_collide_balls(count):
+    def setup():
+        balls = game_targets(count)
+        return lambda: game_core.collide_balls(balls)
+    return setup
+
+
+def case_hit_test():
+    core = game_core.ShootingCore(rng=random.Random(0))
+    core.start_round()
+    core.crosshair = [-1000, -1000]  # a miss scans every target
+    return core.shoot
+
+
+def case_game_step():
+    core = game_core.ShootingCore(rng=random.Random(0))
+    core.start_round()
+    hand = [(0.5, 0.5)] * 21  # crosshair in the middle, not pinching
+    hand[game_core.THUMB_TIP] = (0.6, 0.6)
+    return lambda: core.step(1 / 60, hand)
+
+
+def playing_pingpong():
+    core = pingpong_core.PingpongCore(rng=random.Random(0))
+    core.state = pingpong_core.GameState.PLAYING
+    return core
+
+
+def case_pingpong_step():
+    core = playing_pingpong()
+
+    def frame():
+        # The nose follows the ball, so the paddle returns it
+        nose_x = 1 - (core.ball_x + pingpong_core.BALL_SIZE / 2 - pingpong_core.TABLE_LEFT) / pingpong_core.CAM_WIDTH
+        core.step(1 / 60, [(nose_x, 0.3)] * 33)
+        if core.state != pingpong_core.GameState.PLAYING:
+            core.reset()
+            core.state = pingpong_core.GameState.PLAYING
+    return frame
+
+
+def case_obstacle_hit():
+    """The worst pingpong frame: the ball strikes an obstacle from below."""
+    core = playing_pingpong()
+    obstacle = core.obstacles[len(core.obstacles) // 2]
+
+    def frame():
+        obstacle.hits_remaining = pingpong_core.OBSTACLE_HITS  # never destroyed
+        core.ball_x = obstacle.x + 40
+        core.ball_y = obstacle.y + obstacle.height + 5
+        core.ball_dx, core.ball_dy = 0, -10
+        core.step(1 / 60)
+    return frame
+
+
+def case_classify_gesture():
+    palm = open_palm()
+    return lambda: medicine_core.classify_gesture(palm)
+
+
+def case_test_questions():
+    rng = random.Random(0)
+    learned = medicine_core.HERBS[:10]
+    return lambda: medicine_core.generate_test_questions(learned, rng)
+
+
+def case_text_image():
+    return lambda: create_text_image("功效: 大补元气，复脉固脱，补脾益肺，生津安神", 24, (50, 110, 50))
+
+
+def case_herb_image():
+    path = "gancao.jpg" if os.path.exists("gancao.jpg") else None
+    if path is None:
+        return None
+    return lambda: load_custom_image(path, (150, 150))
+
+
+def camera_frame():
+    return np.random.default_rng(0).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+
+
+def case_inference_frame():
+    frame = camera_frame()
+    return lambda: inference_frame(frame, INFERENCE_WIDTH, mirror=True)
+
+
+def case_preview_update():
+    rgb = inference_frame(camera_frame(), INFERENCE_WIDTH, mirror=True)
+    preview = CameraPreview((200, 150))
+    points = open_palm()
+    return lambda: preview.update(rgb, points, HAND_CONNECTIONS)
+
+
+# name -> (what is measured, setup)
+CASES = {
+    "game.collide_balls_8": ("GAME.py target collisions, 8 targets (O(n^2))", case_collide_balls(8)),
+    "game.collide_balls_16": ("GAME.py target collisions, 16 targets", case_collide_balls(16)),
+    "game.hit_test": ("GAME.py shot that misses all 8 targets", case_hit_test),
+    "game.step": ("GAME.py simulation frame while playing", case_game_step),
+    "pingpong.step": ("pingpong simulation frame, paddle following the ball", case_pingpong_step),
+    "pingpong.obstacle_hit": ("pingpong frame with an obstacle collision", case_obstacle_hit),
+    "medicine.classify_gesture": ("gesture classification of one hand", case_classify_gesture),
+    "medicine.generate_test_questions": ("8 test questions from 10 learned herbs", case_test_questions),
+    "medicine.create_text_image": ("PIL text rendering of one herb line", case_text_image),
+    "medicine.load_custom_image": ("herb photo decode and scale to 150x150", case_herb_image),
+    "preview.inference_frame": ("1280x720 camera frame to the mirrored 640 px RGB frame", case_inference_frame),
+    "preview.update": ("camera thumbnail with 21 landmarks", case_preview_update),
+}
+
+
+def measure(func, repeat):
+    """Best and median seconds per call."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()  # enough calls for about 0.2 s
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"best_us": round(min(runs) * 1e6, 3), "median_us": round(statistics.median(runs) * 1e6, 3),
+            "calls": number, "runs": repeat}
+
+
+def machine():
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "pygame": pygame.version.ver,
+    }
+
+
+def compare(results, baseline, max_slowdown):
+    """Per-case ratios to the baseline and the cases that are slower than max_slowdown."""
+    ratios = {}
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get("best_us"):
+            continue
+        ratio = result["best_us"] / before["best_us"]
+        ratios[name] = round(ratio, 3)
+        if ratio > max_slowdown:
+            regressions.append(f"{name}: {before['best_us']:.1f} -> {result['best_us']:.1f} us "
+                               f"(x{ratio:.2f}, limit x{max_slowdown})")
+    return ratios, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="*", help="case names or prefixes, e.g. pingpong. game.step")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--baseline", default=None, help="baseline JSON (default .cache/benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--max-slowdown", type=float, default=1.3,
+                        help="fail when a case's best time exceeds the baseline's by this factor")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (description, _) in CASES.items():
+            print(f"{name:<34} {description}")
+        return 0
+
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # assets are found from the root
+    pygame.init()
+    baseline_path = args.baseline or cache_path("benchmarks", "baseline.json")
+
+    results = {}
+    for name, (description, setup) in CASES.items():
+        if args.only and not any(name == sel or name.startswith(sel) for sel in args.only):
+            continue
+        func = setup()
+        if func is None:
+            print(f"  {name:<34} skipped (input not available)")
+            continue
+        func()  # warm caches (fonts, imports) outside the timing
+        results[name] = dict(measure(func, args.repeat), description=description)
+        print(f"  {name:<34} {results[name]['best_us']:12.2f} us  (median {results[name]['median_us']:.2f})")
+    pygame.quit()
+
+    report = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "machine": machine(), "results": results}
+    failures = []
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"baseline saved to {baseline_path}")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("machine") != report["machine"]:
+            print("Warning: the baseline was recorded on a different machine or library versions.")
+        report["baseline"] = {"path": baseline_path, "time": baseline.get("time"), "max_slowdown": args.max_slowdown}
+        report["ratios"], failures = compare(results, baseline, args.max_slowdown)
+        report["regressions"] = failures
+        for name, ratio in report["ratios"].items():
+            print(f"  {name:<34} x{ratio:.2f} of baseline")
+    else:
+        print(f"No baseline at {baseline_path}; run with --save-baseline to store one.")
+
+    path = cache_path("benchmarks", f"suite-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"results written to {path}")
+    for failure in failures:
+        print(f"  REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Hardware calibration: measures this machine and writes the performance profile.
+
+Negotiates the camera's capture mode (probing it again) and measures its
+delivered frame rate and decode cost, MediaPipe inference time per tracker at
+each preset's inference width and model complexity, and the blit and text
+render cost of a typical frame, then saves the highest preset that fits its
+frame budget.
+
+Usage: python calibrate.py [--camera 0] [--frames 60] [--repeat 20]
+Re-run after swapping the camera or the PC; the games pick the result up at
+their next launch.
+"""
+import argparse
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+import pygame
+
+import fonts
+from camera import apply_mode, measure_delivery, negotiate, TRACKER_MIN_FPS
+from perf_profile import PRESET_ORDER, preset_settings, save_profile
+from preview import inference_frame
+
+LOGICAL_SIZE = (1200, 800)
+SPRITES = 12          # balls, crosshair, paddle, preview...
+TEXT_PER_FRAME = 3    # uncached text renders per frame (most text comes from the compositor cache)
+BUDGET_SHARE = 0.8    # leave the rest of the frame for game logic and presenting
+
+
+def measure_camera(index, frames):
+    """Negotiated mode with its delivered fps and decode cost, and one frame ({} and None without a camera)."""
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        cap.release()
+        print(f"  no camera at index {index}, skipping camera throughput")
+        return {}, None
+    cap.release()
+    min_size = max(preset_settings(name)["capture_size"] for name in PRESET_ORDER)
+    mode = negotiate(index, min_size, TRACKER_MIN_FPS, refresh=True)
+    cap = cv2.VideoCapture(index)
+    try:
+        actual = apply_mode(cap, mode)
+        delivered_fps, decode_ms = measure_delivery(cap, frames)
+        ret, sample = cap.read()
+    finally:
+        cap.release()
+    print(f"  camera {actual}: {delivered_fps} fps delivered, {decode_ms} ms decode")
+    return {"mode": actual, "delivered_fps": delivered_fps, "decode_ms": decode_ms}, sample if ret else None
+
+
+def _trackers(complexity, tracking_confidence):
+    yield "hands", mp.solutions.hands.Hands(
+        static_image_mode=False, max_num_hands=1, model_complexity=complexity,
+        min_detection_confidence=0.7, min_tracking_confidence=tracking_confidence)
+    yield "pose", mp.solutions.pose.Pose(
+        static_image_mode=False, model_complexity=complexity,
+        min_detection_confidence=0.5, min_tracking_confidence=tracking_confidence)
+
+
+def measure_inference(frame, repeat):
+    """Milliseconds per process() call, keyed tracker_width_cComplexity."""
+    results = {}
+    configs = sorted({(s["inference_width"], s["model_complexity"], s["tracking_confidence"])
+                      for s in map(preset_settings, PRESET_ORDER)}, reverse=True)
+    for width, complexity, confidence in configs:
+        rgb = inference_frame(frame, width, mirror=True)
+        for name, tracker in _trackers(complexity, confidence):
+            tracker.process(rgb)  # the first call loads the model
+            start = time.perf_counter()
+            for _ in range(repeat):
+                tracker.process(rgb)
+            ms = (time.perf_counter() - start) / repeat * 1000
+            tracker.close()
+            results[f"{name}_{width}_c{complexity}"] = round(ms, 2)
+            print(f"  {name} at {width}px, complexity {complexity}: {ms:.1f} ms")
+    return results
+
+
+def measure_render(repeat):
+    """Milliseconds for a full background plus sprites, and for one text render."""
+    canvas = pygame.Surface(LOGICAL_SIZE)
+    background = pygame.Surface(LOGICAL_SIZE)
+    background.fill((90, 140, 200))
+    sprite = pygame.Surface((100, 100), pygame.SRCALPHA)
+    pygame.draw.circle(sprite, (255, 200, 0, 255), (50, 50), 50)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        canvas.blit(background, (0, 0))
+        for i in range(SPRITES):
+            canvas.blit(sprite, (80 + 90 * i, 100 + 40 * i))
+    blit_ms = (time.perf_counter() - start) / repeat * 1000
+
+    font = fonts.get_font(36)
+    start = time.perf_counter()
+    for i in range(repeat):
+        font.render(f"乒乓球分数: {i}", True, (255, 255, 255))
+    text_ms = (time.perf_counter() - start) / repeat * 1000
+    print(f"  frame blits: {blit_ms:.2f} ms, text render: {text_ms:.2f} ms")
+    return round(blit_ms, 3), round(text_ms, 3)
+
+
+def estimated_frame_ms(measurements, name):
+    settings = preset_settings(name)
+    suffix = f"_{settings['inference_width']}_c{settings['model_complexity']}"
+    inference = max(measurements["inference"].get(tracker + suffix, 0.0) for tracker in ("hands", "pose"))
+    decode = measurements["camera"].get("decode_ms", 0.0)
+    return decode + inference + measurements["blit_ms"] + TEXT_PER_FRAME * measurements["text_ms"]
+
+
+def choose_preset(measurements):
+    """Highest preset whose estimated frame time fits its budget."""
+    for name in PRESET_ORDER:
+        budget = 1000.0 / preset_settings(name)["fps"] * BUDGET_SHARE
+        if estimated_frame_ms(measurements, name) <= budget:
+            return name
+    return PRESET_ORDER[-1]
+
+
+def run(camera_index=0, frames=60, repeat=20):
+    """Measure, choose and save a preset; returns its settings."""
+    pygame.init()
+    print("Calibrating camera...")
+    camera, frame = measure_camera(camera_index, frames)
+    if frame is None:
+        # Noise keeps the trackers in detection mode, so this is an upper bound
+        frame = np.random.default_rng(0).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+    print("Calibrating inference...")
+    inference = measure_inference(frame, repeat)
+    print("Calibrating rendering...")
+    blit_ms, text_ms = measure_render(repeat * 5)
+
+    measurements = {"camera": camera, "inference": inference, "blit_ms": blit_ms, "text_ms": text_ms}
+    measurements["estimated_frame_ms"] = {name: round(estimated_frame_ms(measurements, name), 2)
+                                          for name in PRESET_ORDER}
+    preset = choose_preset(measurements)
+    settings = save_profile(preset, measurements)
+    print(f"Performance profile: '{preset}' {settings}")
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--camera", type=int, default=0, help="camera index")
+    parser.add_argument("--frames", type=int, default=60, help="frames read when measuring the camera")
+    parser.add_argument("--repeat", type=int, default=20, help="inference calls per tracker")
+    args = parser.parse_args()
+    run(args.camera, args.frames, args.repeat)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""Camera supervisor: detects a lost camera and reopens it with exponential backoff.
+
+The games call ``read()`` once per frame. It returns the frame, or None while
+the camera is missing; when ``connected`` is False the game shows its "camera
+reconnecting" screen at a low frame rate and keeps handling events. A single
+failed read repeats the last frame instead. After a few consecutive failed
+reads the device is released and reopened on a background thread (opening a
+USB camera can block for a second or more), waiting 0.5 s, 1 s, 2 s ... up to
+8 s between attempts.
+
+Reconnect count and downtime are available from ``metrics()``.
+
+Capture format: ``probe_modes()`` tries a list of FOURCC / resolution / fps
+combinations, reads back what the driver actually set and measures the
+delivered frame rate and decode time of each. ``negotiate()`` picks the
+cheapest mode that still meets the trackers' needs (usually MJPG 640x480 at
+30 fps) and keeps the result per device in the cache directory, so probing only
+happens on first use or with ``python camera.py --probe``. Every open verifies
+the mode the driver delivers and re-probes on the next launch if it differs.
+"""
+import json
+import threading
+import time
+
+import cv2
+
+import tracing
+from paths import cache_path
+
+RECONNECT_FPS = 10  # frame rate of the "reconnecting" screen
+MODES_FILE = "camera_modes.json"
+TRACKER_MIN_SIZE = (640, 480)
+TRACKER_MIN_FPS = 30
+
+# (fourcc, width, height, fps) tried when probing
+PROBE_MODES = [
+    ("MJPG", 640, 480, 30),
+    ("MJPG", 640, 480, 60),
+    ("MJPG", 800, 600, 30),
+    ("MJPG", 1280, 720, 30),
+    ("MJPG", 320, 240, 30),
+    ("YUYV", 640, 480, 30),
+    ("YUYV", 800, 600, 20),
+    ("YUYV", 1280, 720, 10),
+    ("YUYV", 320, 240, 30),
+]
+
+
+def fourcc_str(value):
+    value = int(value)
+    text = "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4))
+    return text if text.isprintable() and text.strip() else str(value)
+
+
+def actual_mode(cap):
+    """The mode the driver is delivering, as read back from the device."""
+    return {
+        "fourcc": fourcc_str(cap.get(cv2.CAP_PROP_FOURCC)),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": round(cap.get(cv2.CAP_PROP_FPS), 1),
+    }
+
+
+def apply_mode(cap, mode):
+    """Request a mode (fourcc may be None) with a one-frame buffer; returns what the driver set."""
+    if mode.get("fourcc"):
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode["fourcc"]))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, mode["width"])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, mode["height"])
+    if mode.get("fps"):
+        cap.set(cv2.CAP_PROP_FPS, mode["fps"])
+    # Hand out the newest frame rather than one that queued up while the game was busy
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return actual_mode(cap)
+
+
+def measure_delivery(cap, frames):
+    """(delivered fps, decode ms per frame) over the given number of frames."""
+    for _ in range(3):  # let the new mode settle
+        cap.read()
+    delivered = 0
+    decode = 0.0
+    start = time.perf_counter()
+    for _ in range(frames):
+        if not cap.grab():
+            continue
+        t = time.perf_counter()
+        ret, _ = cap.retrieve()
+        decode += time.perf_counter() - t
+        delivered += ret
+    elapsed = time.perf_counter() - start
+    if not delivered:
+        return 0.0, 0.0
+    return round(delivered / elapsed, 1), round(decode / delivered * 1000, 2)
+
+
+def probe_modes(index=0, modes=PROBE_MODES, frames=15):
+    """Every distinct mode the device accepts, with delivered fps and decode cost."""
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        return []
+    results = []
+    seen = set()
+    try:
+        for fourcc, width, height, fps in modes:
+            actual = apply_mode(cap, {"fourcc": fourcc, "width": width, "height": height, "fps": fps})
+            key = tuple(actual.values())
+            if key in seen:  # the driver substituted a mode we already measured
+                continue
+            seen.add(key)
+            actual["delivered_fps"], actual["decode_ms"] = measure_delivery(cap, frames)
+            results.append(actual)
+            print(f"  {fourcc} {width}x{height}@{fps} -> {actual['fourcc']} {actual['width']}x{actual['height']}"
+                  f"@{actual['fps']}: {actual['delivered_fps']} fps delivered, {actual['decode_ms']} ms decode")
+    finally:
+        cap.release()
+    return results
+
+
+def choose_mode(probed, min_size=TRACKER_MIN_SIZE, min_fps=TRACKER_MIN_FPS):
+    """Cheapest probed mode at least min_size that delivers min_fps, or None."""
+    usable = [m for m in probed
+              if m["width"] >= min_size[0] and m["height"] >= min_size[1]
+              and m["delivered_fps"] >= min_fps * 0.9]
+    if not usable:
+        return None
+    # Fewest pixels per second first (USB bandwidth), then compressed over raw, then decode time.
+    # The measured rate, not CAP_PROP_FPS: many V4L2/UVC drivers report 0 there.
+    return min(usable, key=lambda m: (m["width"] * m["height"] * m["delivered_fps"],
+                                      m["fourcc"] != "MJPG", m["decode_ms"]))
+
+
+def _read_modes():
+    try:
+        with open(cache_path(MODES_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_modes(modes):
+    try:
+        with open(cache_path(MODES_FILE), "w", encoding="utf-8") as f:
+            json.dump(modes, f, indent=2)
+    except OSError as e:
+        print(f"Warning: could not write camera mode cache: {e}")
+
+
+def forget_mode(index):
+    """Drop a device's negotiated mode so the next negotiate() probes again."""
+    modes = _read_modes()
+    if modes.pop(str(index), None) is not None:
+        _write_modes(modes)
+
+
+def negotiate(index=0, min_size=TRACKER_MIN_SIZE, min_fps=TRACKER_MIN_FPS, refresh=False):
+    """The capture mode to request from a device, probing it on first use.
+
+    Falls back to a plain size/fps request (no FOURCC) when nothing probed
+    meets the requirements.
+    """
+    requirement = [list(min_size), min_fps]
+    entry = _read_modes().get(str(index))
+    if not refresh and entry and entry.get("requirement") == requirement:
+        return entry["chosen"]
+    print(f"Probing camera {index} capture modes...")
+    with tracing.span("camera.probe", "camera"):
+        probed = probe_modes(index)
+    if not probed:
+        return {"fourcc": None, "width": min_size[0], "height": min_size[1], "fps": min_fps}
+    chosen = choose_mode(probed, min_size, min_fps)
+    if chosen is None:
+        print(f"Warning: no mode of camera {index} delivers {min_size[0]}x{min_size[1]} at {min_fps} fps")
+        chosen = {"fourcc": None, "width": min_size[0], "height": min_size[1], "fps": min_fps}
+    else:
+        print(f"Camera {index}: using {chosen['fourcc']} {chosen['width']}x{chosen['height']} at {chosen['fps']} fps")
+    modes = _read_modes()
+    modes[str(index)] = {"requirement": requirement, "probed": probed, "chosen": chosen}
+    _write_modes(modes)
+    return chosen
+
+
+class CameraSupervisor:
+    """Owns the VideoCapture and reopens it whenever it stops delivering frames."""
+    def __init__(self, index=0, min_size=TRACKER_MIN_SIZE, min_fps=TRACKER_MIN_FPS, failure_threshold=3,
+                 initial_backoff=0.5, max_backoff=8.0, name="camera"):
+        self.index = index
+        self.min_size = min_size
+        self.min_fps = min_fps
+        self.mode = None            # negotiated mode requested from the driver
+        self.delivered_mode = None  # what the driver actually set
+        self.failure_threshold = failure_threshold  # consecutive failed reads before reconnecting
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._cap = None
+        self._opening = False
+        self._closed = False
+        self._failures = 0
+        self._backoff = initial_backoff
+        self._next_attempt = 0.0
+        self._down_since = None
+        self._last_frame = None  # repeated for reads that fail below failure_threshold
+
+        self.reconnects = 0
+        self.frames = 0
+        self._connected_at = None
+        self._frames_at_connect = 0
+        self.failed_reads = 0
+        self.open_attempts = 0
+        self.downtime = 0.0  # seconds without a camera, finished outages only
+
+        cap = self._open()
+        if cap is None:
+            print(f"[{self.name}] could not open camera {index}, retrying in the background")
+            self._mark_down()
+        else:
+            self._set_connected(cap)
+
+    # --- Opening ---
+    def _open(self):
+        self.open_attempts += 1
+        # Before opening: a cached mode needs no device, and probing opens the device itself
+        mode = self.mode or negotiate(self.index, self.min_size, self.min_fps)
+        cap = cv2.VideoCapture(self.index)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        self.mode = mode
+        self._verify(apply_mode(cap, mode))
+        return cap
+
+    def _verify(self, actual):
+        self.delivered_mode = actual
+        wanted = self.mode
+        mismatch = (actual["width"], actual["height"]) != (wanted["width"], wanted["height"]) or \
+            (wanted.get("fourcc") and actual["fourcc"] != wanted["fourcc"])
+        if mismatch:
+            print(f"[{self.name}] driver delivers {actual} instead of {wanted}, "
+                  f"capture modes will be probed again next launch")
+            forget_mode(self.index)
+
+    def _set_connected(self, cap):
+        self._cap = cap
+        self._connected_at = time.monotonic()
+        self._frames_at_connect = self.frames
+
+    def _reopen(self):
+        with tracing.span("camera.reopen", "camera", attempt=self.open_attempts + 1):
+            cap = self._open()
+            if cap is not None and not cap.read()[0]:
+                cap.release()
+                cap = None
+        with self._lock:
+            self._opening = False
+            if self._closed and cap is not None:
+                cap.release()
+                return
+            if cap is None:
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+                self._next_attempt = time.monotonic() + self._backoff
+                return
+            outage = time.monotonic() - self._down_since
+            self.downtime += outage
+            self.reconnects += 1
+            self._down_since = None
+            self._failures = 0
+            self._backoff = self.initial_backoff
+            self._set_connected(cap)
+        print(f"[{self.name}] camera reconnected after {outage:.1f} s (reconnect #{self.reconnects})")
+
+    def _mark_down(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self._last_frame = None
+        self._down_since = time.monotonic()
+        self._backoff = self.initial_backoff
+        self._next_attempt = self._down_since + self._backoff
+
+    # --- Per-frame API ---
+    @property
+    def connected(self):
+        return self._cap is not None
+
+    @property
+    def state(self):
+        if self._closed:
+            return "closed"
+        return "connected" if self.connected else "reconnecting"
+
+    def read(self):
+        """The next BGR frame, or None while the camera is unavailable.
+
+        A read that fails while the camera is still connected (fewer than
+        failure_threshold in a row) returns the last good frame again, so a
+        dropped frame never looks like an outage to the game.
+        """
+        cap = self._cap
+        if cap is not None:
+            ret, frame = cap.read()
+            if ret:
+                self._failures = 0
+                self.frames += 1
+                self._last_frame = frame
+                return frame
+            self.failed_reads += 1
+            self._failures += 1
+            if self._failures < self.failure_threshold:
+                return self._last_frame
+            print(f"[{self.name}] camera stopped delivering frames, reconnecting")
+            with self._lock:
+                self._mark_down()
+            return None
+
+        with self._lock:
+            if self._opening or time.monotonic() < self._next_attempt:
+                return None
+            self._opening = True
+        threading.Thread(target=self._reopen, name=f"{self.name}-reopen", daemon=True).start()
+        return None
+
+    def get(self, prop):
+        """cv2.CAP_PROP_* value of the open device, or 0 while disconnected."""
+        cap = self._cap
+        return cap.get(prop) if cap is not None else 0
+
+    def metrics(self):
+        now = time.monotonic()
+        current = now - self._down_since if self._down_since is not None else 0.0
+        delivered_fps = 0.0
+        if self.connected and now > self._connected_at:
+            delivered_fps = (self.frames - self._frames_at_connect) / (now - self._connected_at)
+        return {
+            "state": self.state,
+            "mode": self.delivered_mode,
+            "delivered_fps": round(delivered_fps, 1),
+            "frames": self.frames,
+            "reconnects": self.reconnects,
+            "failed_reads": self.failed_reads,
+            "open_attempts": self.open_attempts,
+            "downtime_seconds": round(self.downtime + current, 3),
+            "current_outage_seconds": round(current, 3),
+        }
+
+    def release(self):
+        with self._lock:
+            self._closed = True
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+        print(f"[{self.name}] {self.metrics()}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Probe a camera's capture modes and negotiate the one to use.")
+    parser.add_argument("--camera", type=int, default=0, help="camera index")
+    parser.add_argument("--probe", action="store_true", help="probe again even if a mode is cached")
+    args = parser.parse_args()
+    print(negotiate(args.camera, refresh=args.probe))
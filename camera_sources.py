@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""Frame sources that stand in for the webcam: video files, image sequences and a synthetic subject.
+
+Every source has CameraSupervisor's per-frame API (``read()``, ``connected``,
+``state``, ``metrics()``, ``release()``), so the capture -> inference -> game
+pipeline runs unchanged on machines without a camera. The games open their
+camera with ``open_camera()``, which reads MOTION_CAMERA:
+
+  (unset) or 1          live device (CameraSupervisor), index 0 or 1
+  video:clip.mp4        a video file at its native rate; speed=2 plays it twice as fast,
+                        speed=max delivers every frame as fast as it is read
+  images:frames/        an image sequence (a folder or a glob such as frames/*.png), fps=30
+  synthetic:hand        a hand silhouette circling over noise; synthetic:face for a head
+                        and shoulders. size=640x480 and fps=30 (default: the game's capture size)
+
+Options follow the target, comma separated: ``video:clip.mp4,speed=max,loop=0``.
+Paced sources behave like a camera: read() waits for the next frame when the
+game is ahead and skips frames when it falls behind. Files loop by default;
+with loop=0 the end of input posts pygame.QUIT, so the game exits (and tools
+such as soak.py finish) instead of waiting for a camera that will not return.
+Example: ``MOTION_CAMERA=video:session.mp4,speed=max python soak.py pingpong.py``.
+"""
+import glob
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+import pygame
+
+import camera
+
+SKIN = (140, 170, 215)     # BGR
+CLOTHES = (120, 80, 60)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class FrameSource:
+    """Paced, looping sequence of frames with the camera's per-frame API."""
+    fourcc = "NONE"
+
+    def __init__(self, name, fps, speed=1.0, loop=True):
+        self.name = name
+        self.fps = fps
+        self.speed = speed    # 0: as fast as read() is called
+        self.loop = loop
+        self.size = (0, 0)
+        self.state = "connected"
+        self.frames = 0
+        self.skipped = 0      # frames passed over because the game fell behind
+        self._position = 0    # index of the next frame
+        self._start = None
+        self._first_read = None
+
+    @property
+    def connected(self):
+        return self.state == "connected"
+
+    def _due_index(self):
+        """Index of the frame to deliver now, waiting when the game is ahead of the frame rate."""
+        if not self.speed or not self.fps:
+            return self._position
+        rate = self.fps * self.speed
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now - self._position / rate
+        due = self._start + self._position / rate
+        if due > now:
+            time.sleep(due - now)
+            return self._position
+        return max(self._position, int((now - self._start) * rate))
+
+    def _frame_at(self, index):
+        """BGR frame number index, or None past the end."""
+        raise NotImplementedError
+
+    def _rewind(self):
+        pass
+
+    def read(self):
+        """The next BGR frame, or None once a source that does not loop has ended."""
+        if self.state != "connected":
+            return None
+        if self._first_read is None:
+            self._first_read = time.monotonic()
+        index = self._due_index()
+        frame = self._frame_at(index)
+        if frame is None and self.loop and index > 0:
+            self._rewind()
+            self._position = 0
+            self._start = None
+            index = self._due_index()
+            frame = self._frame_at(index)
+        if frame is None:
+            print(f"[{self.name}] end of input after {self.frames} frames")
+            self.state = "ended"
+            if pygame.get_init():
+                pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return None
+        self.skipped += index - self._position
+        self._position = index + 1
+        self.frames += 1
+        return frame
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.size[0], cv2.CAP_PROP_FRAME_HEIGHT: self.size[1],
+                cv2.CAP_PROP_FPS: self.fps}.get(prop, 0)
+
+    def metrics(self):
+        elapsed = time.monotonic() - self._first_read if self._first_read is not None else 0.0
+        return {
+            "state": self.state,
+            "mode": {"fourcc": self.fourcc, "width": self.size[0], "height": self.size[1], "fps": self.fps},
+            "delivered_fps": round(self.frames / elapsed, 1) if elapsed > 0 else 0.0,
+            "frames": self.frames,
+            "skipped_frames": self.skipped,
+            "reconnects": 0,
+            "failed_reads": 0,
+            "open_attempts": 1,
+            "downtime_seconds": 0.0,
+            "current_outage_seconds": 0.0,
+        }
+
+    def release(self):
+        self.state = "closed"
+        print(f"[{self.name}] {self.metrics()}")
+
+
+class VideoFileCamera(FrameSource):
+    """A video file played at its own frame rate times speed."""
+    fourcc = "FILE"
+
+    def __init__(self, path, speed=1.0, loop=True, name="video camera"):
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise FileNotFoundError(f"cannot open video {path}")
+        super().__init__(name, self._cap.get(cv2.CAP_PROP_FPS) or camera.TRACKER_MIN_FPS, speed, loop)
+        self.path = path
+        self.size = (int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self._decoded = 0   # index of the next frame the decoder returns
+
+    def _frame_at(self, index):
+        while self._decoded < index:
+            if not self._cap.grab():  # skipped frames are not decoded
+                return None
+            self._decoded += 1
+        ok, frame = self._cap.read()
+        self._decoded += 1
+        return frame if ok else None
+
+    def _rewind(self):
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._decoded = 0
+
+    def release(self):
+        super().release()
+        self._cap.release()
+
+
+class ImageSequenceCamera(FrameSource):
+    """Image files in name order, decoded as they are read."""
+    fourcc = "IMGS"
+
+    def __init__(self, pattern, fps=camera.TRACKER_MIN_FPS, speed=1.0, loop=True, name="image camera"):
+        super().__init__(name, fps, speed, loop)
+        if os.path.isdir(pattern):
+            self.files = sorted(os.path.join(pattern, f) for f in os.listdir(pattern)
+                                if f.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            self.files = sorted(glob.glob(pattern))
+        if not self.files:
+            raise FileNotFoundError(f"no images match {pattern}")
+        first = cv2.imread(self.files[0])
+        self.size = (first.shape[1], first.shape[0])
+
+    def _frame_at(self, index):
+        if index >= len(self.files):
+            return None
+        return cv2.imread(self.files[index])
+
+
+class SyntheticCamera(FrameSource):
+    """A hand (or head and shoulders) silhouette moving over a noisy background, with optional outages.
+
+    The picture depends only on the frame index, so unpaced runs see the same
+    frames every time.
+    """
+    fourcc = "SYNT"
+
+    def __init__(self, size=camera.TRACKER_MIN_SIZE, fps=camera.TRACKER_MIN_FPS, subject="hand", speed=1.0,
+                 outage_every=0, outage_seconds=5.0, name="synthetic camera"):
+        super().__init__(name, fps, speed, loop=False)
+        if subject not in ("hand", "face"):
+            raise ValueError(f"unknown synthetic subject {subject!r} (hand or face)")
+        self.size = tuple(size)
+        self.subject = subject
+        self.outage_every = outage_every
+        self.outage_seconds = outage_seconds
+        width, height = self.size
+        self._background = np.random.default_rng(0).integers(40, 90, (height, width, 3), dtype=np.uint8)
+        self._created = time.monotonic()
+        self._down_since = None
+        self.failed_reads = 0
+        self.reconnects = 0
+        self.downtime = 0.0
+
+    def _in_outage(self, elapsed):
+        if not self.outage_every:
+            return False
+        return elapsed % self.outage_every >= self.outage_every - self.outage_seconds
+
+    def read(self):
+        if self.state == "closed":
+            return None
+        now = time.monotonic()
+        if self._in_outage(now - self._created):
+            if self._down_since is None:
+                self._down_since = now
+                self.state = "reconnecting"
+            self.failed_reads += 1
+            return None
+        if self._down_since is not None:
+            self.downtime += now - self._down_since
+            self._down_since = None
+            self.reconnects += 1
+            self.state = "connected"
+        return super().read()
+
+    def _frame_at(self, index):
+        t = index / (self.fps or camera.TRACKER_MIN_FPS)
+        frame = self._background.copy()  # a real camera hands out a new buffer every read
+        if self.subject == "hand":
+            draw_hand(frame, t)
+        else:
+            draw_face(frame, t)
+        return frame
+
+    def metrics(self):
+        current = time.monotonic() - self._down_since if self._down_since is not None else 0.0
+        metrics = super().metrics()
+        metrics.update(reconnects=self.reconnects, failed_reads=self.failed_reads,
+                       downtime_seconds=round(self.downtime + current, 3), current_outage_seconds=round(current, 3))
+        return metrics
+
+
+def draw_hand(frame, t, centre=None):
+    """An open hand circling the frame (or held at centre, normalised), fingers spreading and closing every 2 s."""
+    height, width = frame.shape[:2]
+    unit = height / 24
+    if centre is None:
+        cx = width / 2 + width / 4 * math.cos(t * 0.8)
+        cy = height / 2 + height / 5 * math.sin(t * 1.1)
+    else:
+        cx, cy = centre[0] * width, centre[1] * height
+    spread = 0.5 + 0.5 * math.sin(t * math.pi)
+    cv2.ellipse(frame, (int(cx), int(cy)), (int(unit * 2.6), int(unit * 3)), 0, 0, 360, SKIN, -1)
+    # Thumb, then four fingers fanning out above the palm
+    for i, (base_angle, length) in enumerate(((-150, 3.2), (-112, 4.4), (-95, 4.8), (-80, 4.5), (-64, 3.6))):
+        angle = math.radians(base_angle + (i - 2) * 6 * spread)
+        base = (cx + unit * 2.2 * math.cos(angle), cy + unit * 2.6 * math.sin(angle))
+        tip = (base[0] + unit * length * math.cos(angle), base[1] + unit * length * math.sin(angle))
+        cv2.line(frame, (int(base[0]), int(base[1])), (int(tip[0]), int(tip[1])), SKIN, int(unit * 1.1),
+                 cv2.LINE_AA)
+    cv2.rectangle(frame, (int(cx - unit * 1.8), int(cy + unit * 2.5)), (int(cx + unit * 1.8), int(cy + unit * 6)),
+                  SKIN, -1)
+
+
+def draw_face(frame, t):
+    """Head and shoulders swaying side to side, as a player steering the pingpong paddle."""
+    height, width = frame.shape[:2]
+    unit = height / 24
+    cx = width / 2 + width / 3 * math.sin(t * 1.5)
+    cy = height * 0.4 + unit * math.sin(t * 0.7)
+    cv2.ellipse(frame, (int(cx), int(height + unit * 2)), (int(unit * 9), int(unit * 8)), 0, 180, 360, CLOTHES, -1)
+    cv2.rectangle(frame, (int(cx - unit * 1.4), int(cy + unit * 3)), (int(cx + unit * 1.4), int(cy + unit * 6)),
+                  SKIN, -1)
+    cv2.ellipse(frame, (int(cx), int(cy)), (int(unit * 3), int(unit * 4)), 0, 0, 360, SKIN, -1)
+    for side in (-1, 1):
+        cv2.circle(frame, (int(cx + side * unit * 1.2), int(cy - unit * 0.6)), int(unit * 0.4), (40, 40, 40), -1)
+    cv2.ellipse(frame, (int(cx), int(cy + unit * 1.8)), (int(unit * 1.2), int(unit * 0.4)), 0, 0, 180,
+                (60, 60, 150), -1)
+
+
+def _options(text):
+    options = {}
+    for item in text:
+        key, _, value = item.partition("=")
+        options[key.strip()] = value.strip()
+    return options
+
+
+def _speed(value):
+    return 0.0 if value == "max" else float(value)
+
+
+def open_source(spec, min_size=camera.TRACKER_MIN_SIZE, name="camera"):
+    """A frame source from a MOTION_CAMERA value such as ``video:clip.mp4,speed=max``."""
+    kind, _, rest = spec.partition(":")
+    target, *extra = rest.split(",")
+    options = _options(extra)
+    loop = options.get("loop", "1") != "0"
+    if kind == "video":
+        return VideoFileCamera(target, _speed(options.get("speed", "1")), loop, name=f"{name} (video)")
+    if kind == "images":
+        return ImageSequenceCamera(target, float(options.get("fps", camera.TRACKER_MIN_FPS)),
+                                   _speed(options.get("speed", "1")), loop, name=f"{name} (images)")
+    if kind == "synthetic":
+        size = tuple(int(v) for v in options["size"].lower().split("x")) if "size" in options else min_size
+        return SyntheticCamera(size, float(options.get("fps", camera.TRACKER_MIN_FPS)), target or "hand",
+                               _speed(options.get("speed", "1")), float(options.get("outage_every", 0)),
+                               name=f"{name} (synthetic)")
+    raise ValueError(f"unknown camera source {spec!r} (a device index, video:, images: or synthetic:)")
+
+
+def open_camera(index=0, min_size=camera.TRACKER_MIN_SIZE, min_fps=camera.TRACKER_MIN_FPS, name="camera"):
+    """The live camera, or the source named by MOTION_CAMERA."""
+    spec = os.environ.get("MOTION_CAMERA", "").strip()
+    if not spec or spec.isdigit():
+        return camera.CameraSupervisor(int(spec or index), min_size, min_fps, name=name)
+    source = open_source(spec, min_size, name)
+    print(f"[{source.name}] {spec}: {source.size[0]}x{source.size[1]} at {source.fps:g} fps")
+    return source
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure how fast a camera source delivers frames.")
+    parser.add_argument("source", help="a MOTION_CAMERA value, e.g. synthetic:face or video:clip.mp4,speed=max")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--save", help="write the last frame to this image file")
+    args = parser.parse_args()
+    source = open_source(args.source)
+    start = time.perf_counter()
+    frame = None
+    for _ in range(args.frames):
+        frame = source.read() if source.connected else None
+        if frame is None:
+            break
+    elapsed = time.perf_counter() - start
+    print(f"{source.frames} frames in {elapsed:.2f} s ({source.frames / elapsed:.1f} fps, "
+          f"{elapsed / max(source.frames, 1) * 1000:.2f} ms per read)")
+    if args.save and frame is not None:
+        cv2.imwrite(args.save, frame)
+    source.release()
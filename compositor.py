@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Layered frame compositor with cached static layers and dirty-rectangle presents.
+
+A frame is drawn in three steps:
+
+1. ``begin(base)`` puts a static full-screen layer under the frame. Layers come
+   from ``layer()`` and are only rebuilt when their key changes. If the base is
+   the same surface as last frame, only the rectangles touched last frame are
+   restored from it instead of blitting the whole screen.
+2. Dynamic content is drawn with ``blit()``/``mark()`` so that the touched
+   rectangles are recorded.
+3. ``present()`` pushes only the touched rectangles (this frame's and the
+   restored ones from the previous frame) to the display, or the whole screen
+   when the base changed.
+
+A frame where nothing dynamic was drawn and the base did not change presents
+nothing at all.
+"""
+from collections import OrderedDict
+
+import pygame
+
+# Above this many rectangles a single bounding rectangle is cheaper to push
+MAX_DIRTY_RECTS = 48
+TEXT_CACHE_SIZE = 256
+
+
+class Compositor:
+    """Static-layer cache plus dirty-rectangle bookkeeping for one screen surface."""
+    def __init__(self, screen, present=None):
+        self.screen = screen
+        self.rect = screen.get_rect()
+        # present(rects) pushes the given rects, present(None) the whole screen
+        self._present = present or self._display_present
+        self._layers = {}
+        self._overlays = {}
+        self._text = OrderedDict()
+        self.text_hits = 0
+        self.text_misses = 0
+        self.layer_hits = 0
+        self.layer_builds = 0
+        self._base = None
+        self._full = True
+        self._dirty = []
+        self._previous = []
+
+    @staticmethod
+    def _display_present(rects):
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    # --- Cached surfaces ---
+    def layer(self, name, key, build):
+        """Full-screen surface for layer name, rebuilt with build(surface) when key changes."""
+        cached = self._layers.get(name)
+        if cached is not None and cached[0] == key:
+            self.layer_hits += 1
+            return cached[1]
+        self.layer_builds += 1
+        surface = cached[1] if cached is not None else pygame.Surface(self.rect.size).convert()
+        build(surface)
+        self._layers[name] = (key, surface)
+        if surface is self._base:
+            self._full = True
+        return surface
+
+    def overlay(self, size, color):
+        """Reusable SRCALPHA surface of size filled with color (refilled only when color changes)."""
+        cached = self._overlays.get(size)
+        if cached is None:
+            cached = [None, pygame.Surface(size, pygame.SRCALPHA)]
+            self._overlays[size] = cached
+        if cached[0] != color:
+            cached[1].fill(color)
+            cached[0] = color
+        return cached[1]
+
+    def text(self, font, text, color, antialias=True):
+        """Rendered text surface, cached per (font, text, colour)."""
+        key = (id(font), text, color, antialias)
+        surface = self._text.get(key)
+        if surface is not None:
+            self._text.move_to_end(key)
+            self.text_hits += 1
+            return surface
+        self.text_misses += 1
+        surface = font.render(text, antialias, color)
+        self._text[key] = surface
+        if len(self._text) > TEXT_CACHE_SIZE:
+            self._text.popitem(last=False)
+        return surface
+
+    # --- Frame drawing ---
+    def begin(self, base):
+        """Start a frame on top of a static base surface."""
+        if base is not self._base or self._full:
+            self.screen.blit(base, (0, 0))
+            self._base = base
+            self._full = True
+        else:
+            for rect in self._previous:
+                self.screen.blit(base, rect, rect)
+
+    def blit(self, surface, dest, area=None):
+        """Blit onto the screen and record the touched rectangle."""
+        rect = self.screen.blit(surface, dest, area)
+        self._dirty.append(rect)
+        return rect
+
+    def mark(self, rect):
+        """Record a rectangle drawn directly on the screen (e.g. by pygame.draw); None is ignored."""
+        if rect is not None:
+            self._dirty.append(self.rect.clip(rect))
+        return rect
+
+    def invalidate(self):
+        """Present the whole screen on the next frame."""
+        self._full = True
+
+    def present(self):
+        """Push the changed regions of this frame to the display."""
+        if self._full:
+            self._present(None)
+        else:
+            rects = [r for r in self._previous + self._dirty if r.width and r.height]
+            if len(rects) > MAX_DIRTY_RECTS:
+                rects = [rects[0].unionall(rects[1:])]
+            if rects:
+                self._present(rects)
+        self._previous = self._dirty
+        self._dirty = []
+        self._full = False
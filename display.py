@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Fixed logical canvas presented at the display's resolution by a single scaling stage.
+
+Every game draws into a canvas of its own logical size (1200x800, 1280x800)
+and all game coordinates, layouts and pre-scaled assets stay in that space.
+How the canvas reaches the screen is decided once here:
+
+* ``scaled`` (default): pygame's SCALED mode. SDL uploads the logical canvas as
+  a texture and the GPU stretches it to the window or fullscreen resolution, so
+  a 4K TV costs the same CPU time as the logical size. Mouse events already
+  arrive in logical coordinates.
+* ``software``: the window is opened at the target size and the canvas is
+  scaled on the CPU; only the dirty rectangles are rescaled on partial
+  presents. Used where no SDL renderer is available, or forced for testing.
+
+Environment overrides: MOTION_DISPLAY_MODE (scaled/software),
+MOTION_FULLSCREEN (1/0) and MOTION_DISPLAY_SIZE (WxH, software mode).
+"""
+import os
+
+import pygame
+
+
+def _env_size(name):
+    value = os.environ.get(name)
+    if not value:
+        return None
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+class Display:
+    """Owns the window and the logical canvas games draw into."""
+    def __init__(self, logical_size, caption, fullscreen=None, resizable=False, mode=None, target_size=None):
+        self.logical_size = logical_size
+        if fullscreen is None:
+            fullscreen = os.environ.get("MOTION_FULLSCREEN", "0") == "1"
+        mode = mode or os.environ.get("MOTION_DISPLAY_MODE", "scaled")
+        target_size = target_size or _env_size("MOTION_DISPLAY_SIZE")
+        self.fullscreen = fullscreen
+        self.resizable = resizable
+
+        self.mode = None
+        if mode == "scaled":
+            flags = pygame.SCALED | (pygame.FULLSCREEN if fullscreen else 0) | (pygame.RESIZABLE if resizable else 0)
+            try:
+                self.window = pygame.display.set_mode(logical_size, flags)
+                self.surface = self.window
+                self.mode = "scaled"
+            except pygame.error as e:
+                print(f"Warning: scaled display unavailable ({e}), falling back to software scaling.")
+        if self.mode is None:
+            self.mode = "software"
+            self._open_software_window(target_size)
+        pygame.display.set_caption(caption)
+
+    # --- Software scaling path ---
+    def _open_software_window(self, target_size):
+        if target_size is None:
+            target_size = pygame.display.get_desktop_sizes()[0] if self.fullscreen else self.logical_size
+        flags = (pygame.FULLSCREEN if self.fullscreen else 0) | (pygame.RESIZABLE if self.resizable else 0)
+        self.window = pygame.display.set_mode(target_size, flags)
+        if target_size == self.logical_size and not self.resizable:
+            # Nothing to scale: draw straight into the window
+            self.surface = self.window
+            self.scale = 1.0
+            self.offset = (0, 0)
+            return
+        self.surface = pygame.Surface(self.logical_size).convert()
+        self._fit(target_size)
+
+    def _fit(self, window_size):
+        lw, lh = self.logical_size
+        self.scale = min(window_size[0] / lw, window_size[1] / lh)
+        out_w, out_h = int(lw * self.scale), int(lh * self.scale)
+        self.offset = ((window_size[0] - out_w) // 2, (window_size[1] - out_h) // 2)
+        self._output = self.window.subsurface((self.offset, (out_w, out_h)))
+        self.window.fill((0, 0, 0))
+
+    def _scaled_rect(self, rect):
+        """Output-space rectangle covering a logical rectangle."""
+        s = self.scale
+        left, top = int(rect.left * s), int(rect.top * s)
+        right, bottom = int(rect.right * s + 0.999), int(rect.bottom * s + 0.999)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def resize(self, window_size):
+        """Handle a VIDEORESIZE in software mode; SDL rescales by itself in scaled mode."""
+        if self.mode == "software" and self.surface is not self.window:
+            self.window = pygame.display.get_surface()
+            self._fit(window_size)
+
+    # --- Presenting ---
+    def present(self, rects=None):
+        """Push the whole canvas (rects=None) or the given logical rectangles to the screen."""
+        if self.surface is self.window:
+            if rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(rects)
+            return
+        if rects is None:
+            pygame.transform.scale(self.surface, self._output.get_size(), self._output)
+            pygame.display.flip()
+            return
+        out_rect = self._output.get_rect()
+        updated = []
+        for rect in rects:
+            dst = self._scaled_rect(rect).clip(out_rect)
+            if not dst.width or not dst.height:
+                continue
+            src = self.surface.subsurface(rect)
+            pygame.transform.scale(src, dst.size, self._output.subsurface(dst))
+            updated.append(dst.move(self.offset))
+        if updated:
+            pygame.display.update(updated)
+
+    def to_logical(self, pos):
+        """Map a window position to canvas coordinates."""
+        if self.surface is self.window:
+            return pos
+        return (int((pos[0] - self.offset[0]) / self.scale), int((pos[1] - self.offset[1]) / self.scale))
+
+    def map_event(self, event):
+        """Rewrite a mouse event's position into canvas coordinates (in place)."""
+        if self.surface is not self.window and hasattr(event, "pos"):
+            event.pos = self.to_logical(event.pos)
+        return event
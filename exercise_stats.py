@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""Live exercise statistics from the landmarks each game's core receives.
+
+The game loop hands every frame's landmark streams to observe(), which only
+appends to a bounded buffer; a background thread folds them into running
+statistics a few times a second, so nothing is computed on the render thread.
+Each sample costs O(1): the point the game is steered with (the same as
+session_report.py) goes into fixed-size ring buffers covering the last
+WINDOW_SECONDS, and these are updated incrementally per stream:
+
+  tracked, idle  seconds the point was tracked / held still beyond IDLE_AFTER
+  movements      movement onsets, with session_report.py's thresholds
+  repetitions    back-and-forth swings of at least REP_AMPLITUDE
+  speed          mean speed while moving, and the peak
+  range          largest horizontal and vertical range within one window
+                 (for pose the nose: the head's lateral range of motion)
+  arm reach      pose only: wrist-to-shoulder distance in shoulder widths
+                 (90th percentile of a window, best window kept)
+
+summary() may be read from any thread. With a Metrics object the values are
+exported as motion_exercise_* gauges; stop() prints the session's summary and
+writes it to .cache/exercise/<game>-<time>.json.
+"""
+import json
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from paths import cache_path
+from session_report import DEFAULT_STEERING, MAX_GAP, MOVE_START, MOVE_STOP, SMOOTHING, STEERING
+
+WINDOW_SECONDS = 10.0
+WINDOW_SAMPLES = 512     # ring size: WINDOW_SECONDS at up to 50 fps
+IDLE_AFTER = 2.0         # seconds still before the time counts as idle
+REP_AMPLITUDE = 0.08     # frame widths (or heights) a swing must cover
+UPDATE_INTERVAL = 0.25   # seconds between analytics passes
+BUFFER_FRAMES = 1024
+SHOULDERS, WRISTS = (11, 12), (15, 16)  # MediaPipe Pose
+
+_stats = None
+
+
+class RingBuffer:
+    """Fixed-size float buffer, overwritten oldest first; unfilled slots are NaN."""
+    __slots__ = ("data", "index")
+
+    def __init__(self, size=WINDOW_SAMPLES):
+        self.data = np.full(size, np.nan)
+        self.index = 0
+
+    def push(self, value):
+        self.data[self.index] = value
+        self.index = (self.index + 1) % len(self.data)
+
+
+class Swings:
+    """Direction reversals along one axis, ignoring wobbles smaller than REP_AMPLITUDE."""
+    __slots__ = ("extreme", "direction", "reversals")
+
+    def __init__(self):
+        self.extreme = None
+        self.direction = 0
+        self.reversals = 0
+
+    def add(self, value):
+        if self.extreme is None:
+            self.extreme = value
+        elif self.direction * (value - self.extreme) > 0:
+            self.extreme = value  # still heading the same way
+        elif abs(value - self.extreme) >= REP_AMPLITUDE:
+            if self.direction:
+                self.reversals += 1
+            self.direction = 1 if value > self.extreme else -1
+            self.extreme = value
+
+
+class StreamStats:
+    """Running statistics of one landmark stream's steering point."""
+    def __init__(self, stream, point):
+        self.stream = stream
+        self.point = point
+        self.times = RingBuffer()
+        self.xs = RingBuffer()
+        self.ys = RingBuffer()
+        self.arm = RingBuffer() if stream == "pose" else None
+        self.swings = (Swings(), Swings())
+        self.recent = deque(maxlen=SMOOTHING)
+        self.last = None         # (time, x, y)
+        self.moving = False
+        self.still = 0.0
+        self.tracked = 0.0
+        self.idle = 0.0
+        self.moving_time = 0.0
+        self.distance = 0.0
+        self.movements = 0
+        self.peak_speed = 0.0
+        self.range = (0.0, 0.0)
+        self.arm_reach = 0.0
+
+    def add(self, t, points):
+        x, y = points[self.point]
+        last = self.last
+        self.last = (t, x, y)
+        self.times.push(t)
+        self.xs.push(x)
+        self.ys.push(y)
+        self.swings[0].add(x)
+        self.swings[1].add(y)
+        if self.arm is not None and len(points) > WRISTS[1]:
+            (lx, ly), (rx, ry) = points[SHOULDERS[0]], points[SHOULDERS[1]]
+            width = math.hypot(lx - rx, ly - ry)
+            if width > 0.02:
+                reach = max(math.hypot(points[WRISTS[0]][0] - lx, points[WRISTS[0]][1] - ly),
+                            math.hypot(points[WRISTS[1]][0] - rx, points[WRISTS[1]][1] - ry))
+                self.arm.push(reach / width)
+        if last is None or not 0 < t - last[0] <= MAX_GAP:
+            self.gap()
+            return
+
+        dt = t - last[0]
+        step = math.hypot(x - last[1], y - last[2])
+        self.recent.append(step / dt)
+        speed = sum(self.recent) / SMOOTHING
+        self.tracked += dt
+        if not self.moving and speed >= MOVE_START:
+            self.moving = True
+            self.movements += 1
+        elif self.moving and speed <= MOVE_STOP:
+            self.moving = False
+        if self.moving:
+            self.moving_time += dt
+            self.distance += step
+            self.peak_speed = max(self.peak_speed, speed)
+        if speed <= MOVE_STOP:
+            self.still += dt
+            self.idle += min(dt, max(self.still - IDLE_AFTER, 0.0))
+        else:
+            self.still = 0.0
+
+    def gap(self):
+        """Tracking lost (or resumed after a gap): movements and stillness start over."""
+        self.recent.clear()
+        self.moving = False
+        self.still = 0.0
+
+    def update_window(self):
+        """Fold the last WINDOW_SECONDS into the best ranges (O(WINDOW_SAMPLES), once per pass)."""
+        if self.last is None:
+            return
+        recent = self.times.data >= self.last[0] - WINDOW_SECONDS  # NaN (unfilled) compares False
+        xs, ys = self.xs.data[recent], self.ys.data[recent]
+        self.range = (max(self.range[0], float(xs.max() - xs.min())), max(self.range[1], float(ys.max() - ys.min())))
+        if self.arm is not None:
+            arm = self.arm.data[~np.isnan(self.arm.data)]
+            if len(arm):
+                self.arm_reach = max(self.arm_reach, float(np.percentile(arm, 90)))
+
+    def summary(self):
+        summary = {
+            "tracked_s": round(self.tracked, 1), "idle_s": round(self.idle, 1), "movements": self.movements,
+            "repetitions": max(swings.reversals for swings in self.swings) // 2,
+            "mean_speed": round(self.distance / self.moving_time, 3) if self.moving_time else 0.0,
+            "peak_speed": round(self.peak_speed, 3),
+            "range_x": round(self.range[0], 3), "range_y": round(self.range[1], 3),
+        }
+        if self.arm is not None:
+            summary["arm_reach"] = round(self.arm_reach, 2)
+        return summary
+
+
+class ExerciseStats:
+    """Bounded frame buffer analysed by a background thread."""
+    def __init__(self, game, capacity=BUFFER_FRAMES):
+        self.game = game
+        steering = {**DEFAULT_STEERING, **STEERING.get(game, {})}
+        self.streams = {name: StreamStats(name, point) for name, point in steering.items()}
+        self.capacity = capacity
+        self.dropped = 0
+        self.time = 0.0
+        self._buffer = deque()
+        self._summary = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="exercise-stats", daemon=True)
+        self._thread.start()
+
+    # --- Game loop ---
+    def observe(self, dt, streams):
+        """One step(dt): streams maps a stream name to (points or None, confidence), as for landmark_log."""
+        self.time += dt
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        self._buffer.append((self.time, streams))
+
+    # --- Analytics thread ---
+    def _drain(self):
+        buffer = self._buffer
+        touched = set()
+        while buffer:
+            t, streams = buffer.popleft()
+            for name, (points, _) in streams.items():
+                stats = self.streams.get(name)
+                if stats is not None and points is not None:  # a lost point is a gap once MAX_GAP passes
+                    stats.add(t, points)
+                    touched.add(stats)
+        for stats in touched:
+            stats.update_window()
+        self._summary = {name: stats.summary() for name, stats in self.streams.items() if stats.last is not None}
+
+    def _run(self):
+        while not self._stop.wait(UPDATE_INTERVAL):
+            self._drain()
+
+    def summary(self):
+        """{stream: {...}} as of the last analytics pass; safe to call from any thread."""
+        return self._summary
+
+    def watch(self, metrics):
+        """Export the summary as motion_exercise_* gauges (read at scrape time)."""
+        fields = [
+            ("tracked_s", "motion_exercise_tracked_seconds", "counter", "Seconds the steering point was tracked."),
+            ("idle_s", "motion_exercise_idle_seconds", "counter", "Seconds the player held still."),
+            ("movements", "motion_exercise_movements_total", "counter", "Movement onsets."),
+            ("repetitions", "motion_exercise_repetitions_total", "counter", "Back-and-forth swings."),
+            ("mean_speed", "motion_exercise_mean_speed", "gauge", "Mean speed while moving (frame widths/s)."),
+            ("range_x", "motion_exercise_range_x", "gauge", "Largest horizontal range in one window."),
+            ("range_y", "motion_exercise_range_y", "gauge", "Largest vertical range in one window."),
+            ("arm_reach", "motion_exercise_arm_reach", "gauge", "Wrist-to-shoulder reach in shoulder widths."),
+        ]
+        for field, name, kind, help_text in fields:
+            metrics.gauge(name, help_text,
+                          lambda field=field: {stream: values[field] for stream, values in self._summary.items()
+                                               if field in values},
+                          kind=kind, value_label="stream")
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._drain()
+        summary = self.summary()
+        if not summary:
+            return summary
+        for stream, values in summary.items():
+            print(f"[exercise] {self.game} {stream}: tracked {values['tracked_s']:.0f} s, idle {values['idle_s']:.0f} s, "
+                  f"{values['movements']} movements, {values['repetitions']} repetitions, "
+                  f"speed {values['mean_speed']:.2f}/s (peak {values['peak_speed']:.2f}), "
+                  f"range {values['range_x']:.2f} x {values['range_y']:.2f}"
+                  + (f", arm reach {values['arm_reach']:.2f}" if "arm_reach" in values else ""))
+        path = cache_path("exercise", f"{self.game}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"game": self.game, "time": time.strftime("%Y-%m-%d %H:%M:%S"), "dropped": self.dropped,
+                       "streams": summary}, f, indent=2)
+        return summary
+
+
+# --- Module-level API used by the games ---
+def start(game, metrics=None):
+    """Start the analytics thread (and export its gauges to metrics, when given)."""
+    global _stats
+    if _stats is None:
+        _stats = ExerciseStats(game)
+        if metrics is not None:
+            _stats.watch(metrics)
+    return _stats
+
+
+def observe(dt, streams):
+    if _stats is not None:
+        _stats.observe(dt, streams)
+
+
+def stop():
+    """Stop the analytics thread, print the summary and write it to .cache/exercise."""
+    global _stats
+    if _stats is not None:
+        _stats.close()
+        _stats = None
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Process-wide font registry.
+
+A CJK-capable font file is looked up once per machine and the result is kept in
+the cache directory, so later launches skip the filesystem probing and the
+pygame system-font scan. Font objects are created once per (file, size, bold)
+and shared by every caller.
+
+Run ``python fonts.py`` to redo the discovery after installing new fonts.
+"""
+import json
+import os
+
+import pygame
+
+from paths import cache_path
+
+# Font files the three games used to probe, in their original order of preference
+CJK_FONT_CANDIDATES = [
+    "msyh.ttc",
+    "simhei.ttf",
+    # macOS
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/STHeiti Medium.ttc",
+    # Windows
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+    "C:/Windows/Fonts/simsun.ttc",
+    # Linux
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/wqy-zenhei/wqy-zenhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/Library/Fonts/Arial Unicode.ttf",
+]
+
+# System font names tried through pygame when none of the files above exist
+CJK_FONT_NAMES = [
+    "simhei", "microsoftyahei", "pingfangsc", "heititc", "notosanscjksc",
+    "notosanscjk", "wenquanyizenhei", "wenquanyimicrohei", "arialunicodems",
+]
+
+CACHE_FILE = "fonts.json"
+
+_UNRESOLVED = object()
+_cjk_path = _UNRESOLVED
+_fonts = {}
+_pil_fonts = {}
+
+
+def _discover():
+    for path in CJK_FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    if not pygame.font.get_init():
+        pygame.font.init()
+    return pygame.font.match_font(CJK_FONT_NAMES)
+
+
+def _read_cache():
+    try:
+        with open(cache_path(CACHE_FILE), encoding="utf-8") as f:
+            path = json.load(f)["path"]
+    except (OSError, ValueError, KeyError):
+        return _UNRESOLVED
+    if path is not None and not os.path.exists(path):
+        return _UNRESOLVED
+    return path
+
+
+def _write_cache(path):
+    try:
+        with open(cache_path(CACHE_FILE), "w", encoding="utf-8") as f:
+            json.dump({"path": path}, f)
+    except OSError as e:
+        print(f"Warning: could not write font cache: {e}")
+
+
+def cjk_font_path(refresh=False):
+    """Path of a font file with Chinese glyphs, or None if the machine has none."""
+    global _cjk_path
+    if refresh or _cjk_path is _UNRESOLVED:
+        path = _UNRESOLVED if refresh else _read_cache()
+        if path is _UNRESOLVED:
+            path = _discover()
+            _write_cache(path)
+        _cjk_path = path
+    return _cjk_path
+
+
+def get_font(size, preferred=None, bold=False):
+    """Shared pygame Font of the given size.
+
+    preferred is an optional font file that is used when it exists; otherwise
+    the registry's CJK font is used, falling back to pygame's default font.
+    """
+    key = (preferred, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        path = preferred if preferred and os.path.exists(preferred) else cjk_font_path()
+        try:
+            font = pygame.font.Font(path, size)
+        except (OSError, pygame.error):
+            font = pygame.font.Font(None, size)
+        font.bold = bold
+        _fonts[key] = font
+    return font
+
+
+def get_pil_font(size):
+    """Shared PIL ImageFont of the given size using the registry's CJK font."""
+    font = _pil_fonts.get(size)
+    if font is None:
+        from PIL import ImageFont
+        path = cjk_font_path()
+        try:
+            font = ImageFont.truetype(path, size) if path else ImageFont.load_default()
+        except OSError:
+            font = ImageFont.load_default()
+        _pil_fonts[size] = font
+    return font
+
+
+if __name__ == "__main__":
+    print(f"CJK font: {cjk_font_path(refresh=True)}")
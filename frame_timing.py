@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Per-stage frame timing with rolling histograms and an on-screen HUD.
+
+Each game loop calls ``begin()`` at the top of the frame and ``lap(stage)``
+after every stage (camera read, colour conversion, inference, logic, render,
+present). The time since the previous mark is stored in a fixed-size ring per
+stage; percentiles are only computed when the HUD refreshes or on ``dump()``.
+
+Timing is off by default and costs one attribute check per call while off.
+F3 toggles the HUD and starts collecting; MOTION_FRAME_TIMING=1 collects from
+launch. On exit ``dump()`` writes the numbers to .cache/frame_timing/. When a
+tracer is running (tracing.py) every lap is also recorded as a span tagged
+with the frame number.
+"""
+import json
+import os
+import time
+
+import pygame
+
+import fonts
+import tracing
+from paths import cache_path
+
+WINDOW = 600          # frames kept per stage
+HUD_REFRESH = 0.5     # seconds between HUD text updates
+DROP_FACTOR = 1.5     # a frame longer than this many budgets missed its slot
+
+_latest = None        # the most recently created FrameTimer, for soak.py's sampler
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class StageRing:
+    """Last WINDOW samples of one stage, in milliseconds."""
+    __slots__ = ("samples", "index", "count")
+
+    def __init__(self, size=WINDOW):
+        self.samples = [0.0] * size
+        self.index = 0
+        self.count = 0
+
+    def add(self, ms):
+        self.samples[self.index] = ms
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+
+    def summary(self):
+        ordered = sorted(self.samples[:min(self.count, len(self.samples))])
+        if not ordered:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(sum(ordered) / len(ordered), 3),
+            "p50": round(percentile(ordered, 50), 3),
+            "p95": round(percentile(ordered, 95), 3),
+            "p99": round(percentile(ordered, 99), 3),
+            "max": round(ordered[-1], 3),
+        }
+
+
+class FrameTimer:
+    """Stage timings of one game loop."""
+    def __init__(self, name, target_fps, enabled=None):
+        global _latest
+        _latest = self
+        self.name = name
+        self.budget_ms = 1000.0 / target_fps
+        if enabled is None:
+            enabled = os.environ.get("MOTION_FRAME_TIMING", "0") == "1"
+        self._tracer = tracing.tracer()
+        self.enabled = enabled or self._tracer is not None
+        self.show_hud = False
+        self.stages = {}       # stage -> StageRing, in first-seen order
+        self.frame = StageRing()
+        self.frames = 0
+        self.dropped = 0
+        self._frame_start = None
+        self._mark = 0.0
+        self._hud_surface = None
+        self._hud_updated = 0.0
+
+    # --- Measuring ---
+    def begin(self):
+        """Start of a frame; closes the previous one (its length includes the tick() sleep)."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            ms = (now - self._frame_start) * 1000
+            self.frame.add(ms)
+            self.frames += 1
+            if ms > self.budget_ms * DROP_FACTOR:
+                self.dropped += 1
+        if self._tracer is not None:
+            self._tracer.next_frame()
+        self._frame_start = self._mark = now
+
+    def lap(self, stage):
+        """Charge the time since the previous mark to a stage."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        ring = self.stages.get(stage)
+        if ring is None:
+            ring = self.stages[stage] = StageRing()
+        ring.add((now - self._mark) * 1000)
+        if self._tracer is not None:
+            self._tracer.complete(stage, self._mark * 1e6, now * 1e6)
+        self._mark = now
+
+    def skip(self):
+        """Forget the current frame (e.g. the loop continued early while the camera is away)."""
+        self._frame_start = None
+
+    # --- HUD ---
+    def handle_event(self, event):
+        """F3 toggles the HUD (and collection); returns True when the event was used."""
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.show_hud = not self.show_hud
+            if self.show_hud:
+                self.enabled = True
+            self._hud_surface = None
+            return True
+        return False
+
+    def summary(self):
+        ordered = sorted(self.frame.samples[:min(self.frame.count, WINDOW)])
+        mean = sum(ordered) / len(ordered) if ordered else 0.0
+        return {
+            "game": self.name,
+            "budget_ms": round(self.budget_ms, 3),
+            "frames": self.frames,
+            "fps": round(1000.0 / mean, 1) if mean else 0.0,
+            "dropped_frames": self.dropped,
+            "frame_ms": self.frame.summary(),
+            "stages": {stage: ring.summary() for stage, ring in self.stages.items()},
+        }
+
+    def _render_hud(self):
+        summary = self.summary()
+        font = fonts.get_font(18)
+        lines = [f"{self.name}  {summary['fps']:.1f} fps  dropped {summary['dropped_frames']}/{summary['frames']}",
+                 f"{'stage':<10}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for stage, s in summary["stages"].items():
+            if s["count"]:
+                lines.append(f"{stage:<10}{s['p50']:7.2f}{s['p95']:7.2f}{s['p99']:7.2f}")
+        rendered = [font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(r.get_width() for r in rendered) + 16
+        height = sum(r.get_height() for r in rendered) + 12
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        y = 6
+        for r in rendered:
+            panel.blit(r, (8, y))
+            y += r.get_height()
+        return panel
+
+    def draw(self, compositor, bottomleft):
+        """Draw the HUD through the compositor, anchored at bottomleft, when it is shown."""
+        if not self.show_hud:
+            return
+        now = time.perf_counter()
+        if self._hud_surface is None or now - self._hud_updated >= HUD_REFRESH:
+            self._hud_surface = self._render_hud()
+            self._hud_updated = now
+        compositor.blit(self._hud_surface, self._hud_surface.get_rect(bottomleft=bottomleft))
+
+    # --- Dump ---
+    def dump(self):
+        """Write the summary to .cache/frame_timing/<game>-<time>.json; returns the path or None."""
+        if not self.frames:
+            return None
+        path = cache_path("frame_timing", f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.summary(), f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"Warning: could not write frame timing: {e}")
+            return None
+        print(f"[{self.name}] frame timing written to {path}")
+        return path
+
+
+def latest():
+    """The game loop's FrameTimer, or None before one exists."""
+    return _latest
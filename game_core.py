@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""Headless simulation of GAME.py: the start ball, the target field, the shots and the scores.
+
+``ShootingCore.step(dt, landmarks, events)`` advances one frame. landmarks are
+the tracked hand's 21 normalised (x, y) points, or None when no hand was
+seen; dt (seconds) drives the hold, transition and shot timers, while the
+targets and particles move one step per frame as they always have. Nothing
+here needs a display, a camera or audio: sounds and the switch to another
+game are reported in ``effects`` and ``switch_to`` for the caller.
+"""
+import math
+import random
+
+SCREEN_WIDTH = 1200
+SCREEN_HEIGHT = 800
+
+INDEX_FINGER_TIP = 8
+THUMB_TIP = 4
+PINCH_DISTANCE = 0.05      # thumb-index distance (normalised) that counts as a pinch
+HOLD_TO_START = 1.0        # seconds on the start ball
+TRANSITION_SECONDS = 2.0
+SHOT_COOLDOWN = 0.5
+WIN_SCORE = 5              # a score above this launches the matching game
+TARGET_COUNT = 8
+PARTICLES_PER_HIT = 30
+
+# Target kinds are the image files the game draws them with
+PINGPONG = "乒乓球拍.png"
+FISHING = "钓鱼竿.png"
+HEALING = "中草药.png"
+TARGET_KINDS = [FISHING, PINGPONG, HEALING]
+
+BLUE = (10, 132, 255)
+ACCENT_GREEN = (48, 209, 88)
+RED = (255, 0, 0)
+YELLOW = (255, 255, 0)
+ORANGE = (255, 165, 0)
+TARGET_COLORS = [BLUE, ACCENT_GREEN, RED, YELLOW, ORANGE]
+
+START_BALL_POS = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 150)
+START_BALL_RADIUS = 80
+
+
+class Ball:
+    """A single target object for the player to shoot."""
+    def __init__(self, kind, balls, rng, radius=80):
+        self.radius = radius
+        self.kind = kind
+        self.color = rng.choice(TARGET_COLORS)
+        self.pos = self.get_random_pos(balls, rng)
+        self.velocity = self.get_random_velocity(rng)
+
+    def get_random_pos(self, balls, rng):
+        while True:
+            new_pos = [rng.randint(self.radius, SCREEN_WIDTH - self.radius),
+                       rng.randint(self.radius, SCREEN_HEIGHT - self.radius)]
+            if not any(math.hypot(new_pos[0] - ball.pos[0], new_pos[1] - ball.pos[1]) < self.radius + ball.radius
+                       for ball in balls):
+                return new_pos
+
+    @staticmethod
+    def get_random_velocity(rng):
+        angle = rng.uniform(0, 2 * math.pi)
+        speed = rng.uniform(3, 6)
+        return [speed * math.cos(angle), speed * math.sin(angle)]
+
+    def update(self):
+        self.pos[0] += self.velocity[0]
+        self.pos[1] += self.velocity[1]
+
+        if self.pos[0] <= self.radius:
+            self.pos[0] = self.radius
+            self.velocity[0] *= -1
+        elif self.pos[0] >= SCREEN_WIDTH - self.radius:
+            self.pos[0] = SCREEN_WIDTH - self.radius
+            self.velocity[0] *= -1
+
+        if self.pos[1] <= self.radius:
+            self.pos[1] = self.radius
+            self.velocity[1] *= -1
+        elif self.pos[1] >= SCREEN_HEIGHT - self.radius:
+            self.pos[1] = SCREEN_HEIGHT - self.radius
+            self.velocity[1] *= -1
+
+
+class Particle:
+    """A single particle for the explosion effect."""
+    def __init__(self, x, y, color, rng):
+        self.pos = [x, y]
+        self.velocity = [rng.uniform(-3, 3), rng.uniform(-3, 3)]
+        self.radius = rng.randint(3, 8)
+        self.color = color
+        self.lifetime = 60
+
+    def update(self):
+        self.pos[0] += self.velocity[0]
+        self.pos[1] += self.velocity[1]
+        self.radius -= 0.1
+        self.lifetime -= 1
+
+
+def collide_balls(balls):
+    """Separate overlapping targets and exchange their velocities along the contact normal."""
+    for i in range(len(balls)):
+        for j in range(i + 1, len(balls)):
+            ball1, ball2 = balls[i], balls[j]
+            dist_vec = [ball1.pos[0] - ball2.pos[0], ball1.pos[1] - ball2.pos[1]]
+            dist = math.sqrt(dist_vec[0]**2 + dist_vec[1]**2)
+            if dist < ball1.radius + ball2.radius:
+                overlap = (ball1.radius + ball2.radius) - dist
+                if dist == 0: dist = 1
+                normal_vec = [dist_vec[0] / dist, dist_vec[1] / dist]
+                ball1.pos[0] += normal_vec[0] * overlap / 2
+                ball1.pos[1] += normal_vec[1] * overlap / 2
+                ball2.pos[0] -= normal_vec[0] * overlap / 2
+                ball2.pos[1] -= normal_vec[1] * overlap / 2
+                v1, v2 = ball1.velocity, ball2.velocity
+                x1_minus_x2 = [ball1.pos[0] - ball2.pos[0], ball1.pos[1] - ball2.pos[1]]
+                dist_squared = x1_minus_x2[0]**2 + x1_minus_x2[1]**2
+                if dist_squared == 0: continue
+                dot_product = (v1[0] - v2[0]) * x1_minus_x2[0] + (v1[1] - v2[1]) * x1_minus_x2[1]
+                factor = dot_product / dist_squared
+                change_vx, change_vy = factor * x1_minus_x2[0], factor * x1_minus_x2[1]
+                ball1.velocity[0] -= change_vx
+                ball1.velocity[1] -= change_vy
+                ball2.velocity[0] += change_vx
+                ball2.velocity[1] += change_vy
+
+
+class ShootingCore:
+    """State of GAME.py: "loading" -> "transition" -> "playing"."""
+    def __init__(self, crosshair_radius=50, particle_cap=PARTICLES_PER_HIT, rng=None):
+        self.crosshair_radius = crosshair_radius
+        self.particle_cap = particle_cap   # lowered by the quality governor
+        self.rng = rng or random.Random()
+        self.time = 0.0
+        self.state = "loading"
+        self.crosshair = [SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2]
+        self.pinching = False
+        self.hold_start = None        # when the crosshair reached the start ball
+        self.transition_start = 0.0
+        self.last_shot = None
+        self.scores = {kind: 0 for kind in TARGET_KINDS}
+        self.balls = []
+        self.particles = []
+        self.effects = []             # "explosion", "round_started" since the last step
+        self.switch_to = None         # script to launch once a score passes WIN_SCORE
+
+    @property
+    def hold_progress(self):
+        """0..1 while the crosshair rests on the start ball, None otherwise."""
+        if self.hold_start is None:
+            return None
+        return min((self.time - self.hold_start) / HOLD_TO_START, 1.0)
+
+    def step(self, dt, landmarks=None, events=()):
+        self.time += dt
+        self.effects = []
+        if landmarks is not None:
+            self._track_hand(landmarks)
+        if self.state == "transition" and self.time - self.transition_start > TRANSITION_SECONDS:
+            self.start_round()
+        if self.state == "playing":
+            for ball in self.balls:
+                ball.update()
+            collide_balls(self.balls)
+            for particle in self.particles:
+                particle.update()
+            self.particles = [p for p in self.particles if p.lifetime > 0]
+
+    def _track_hand(self, landmarks):
+        tip_x, tip_y = landmarks[INDEX_FINGER_TIP]
+        thumb_x, thumb_y = landmarks[THUMB_TIP]
+        self.crosshair = [int(tip_x * SCREEN_WIDTH), int(tip_y * SCREEN_HEIGHT)]
+        self.pinching = math.hypot(thumb_x - tip_x, thumb_y - tip_y) < PINCH_DISTANCE
+
+        if self.state == "loading":
+            dist = math.hypot(self.crosshair[0] - START_BALL_POS[0], self.crosshair[1] - START_BALL_POS[1])
+            if dist < START_BALL_RADIUS + self.crosshair_radius:
+                if self.hold_start is None:
+                    self.hold_start = self.time
+                if self.time - self.hold_start >= HOLD_TO_START:
+                    self.state = "transition"
+                    self.transition_start = self.time
+                    self.hold_start = None
+            else:
+                self.hold_start = None
+        elif self.state == "playing" and self.pinching:
+            if self.last_shot is None or self.time - self.last_shot > SHOT_COOLDOWN:
+                self.shoot()
+
+    def shoot(self):
+        """Hit the first target under the crosshair, if any."""
+        for i, ball in enumerate(self.balls):
+            dist = math.hypot(self.crosshair[0] - ball.pos[0], self.crosshair[1] - ball.pos[1])
+            if dist > ball.radius + self.crosshair_radius:
+                continue
+            self.scores[ball.kind] += 1
+            self.effects.append("explosion")
+            for _ in range(min(PARTICLES_PER_HIT, self.particle_cap)):
+                self.particles.append(Particle(ball.pos[0], ball.pos[1], ball.color, self.rng))
+
+            # The last target of a kind is replaced by the same kind, so every kind stays on the field
+            other_balls = [b for b in self.balls if b is not ball]
+            is_last_of_kind = not any(b.kind == ball.kind for b in other_balls)
+            kind = ball.kind if is_last_of_kind else self.rng.choice(TARGET_KINDS)
+            self.balls[i] = Ball(kind, other_balls, self.rng)
+            self.last_shot = self.time
+
+            if self.scores[PINGPONG] > WIN_SCORE:
+                self.switch_to = "pingpong.py"
+            elif self.scores[HEALING] > WIN_SCORE:
+                self.switch_to = "medicine.py"
+            return ball
+        return None
+
+    def start_round(self):
+        self.state = "playing"
+        self.scores = {kind: 0 for kind in TARGET_KINDS}
+        self.particles = []
+        self.last_shot = None
+        self.balls = []
+        # At least one of each kind, then random kinds up to TARGET_COUNT
+        for kind in TARGET_KINDS:
+            self.balls.append(Ball(kind, self.balls, self.rng))
+        for _ in range(TARGET_COUNT - len(TARGET_KINDS)):
+            self.balls.append(Ball(self.rng.choice(TARGET_KINDS), self.balls, self.rng))
+        self.effects.append("round_started")
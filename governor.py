@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Adaptive quality governor driven by measured frame time.
+
+Every game feeds the time its frame took (excluding the clock.tick sleep and the
+wait for the camera's next frame) into
+``QualityGovernor.frame()``. The governor keeps a rolling window of those times
+and, at fixed intervals, compares a high percentile against the frame budget:
+
+* over budget: step one level down the quality ladder
+* well under budget for a sustained period: step one level back up
+
+Each level lowers exactly one knob, cheapest-looking first, so the game gives
+up particles and trails before it gives up tracking resolution. Every decision
+is printed with the percentile that triggered it.
+"""
+from collections import deque
+
+# (knob, value) applied cumulatively on top of the previous level
+QUALITY_STEPS = [
+    ("particle_cap", 20),
+    ("trail_length", 2),
+    ("preview_interval", 1 / 5),
+    ("particle_cap", 5),
+    ("inference_width", 480),
+    ("trail_length", 0),
+    ("inference_width", 320),
+    ("model_complexity", 0),
+]
+
+HIGHEST_QUALITY = {
+    "particle_cap": 50,         # most particles spawned by a single effect burst
+    "trail_length": 5,          # ball trail copies in pingpong
+    "preview_interval": 1 / 15, # seconds between camera preview refreshes
+    "inference_width": 640,     # width of the frame handed to MediaPipe
+    "model_complexity": 1,      # MediaPipe model complexity
+}
+
+
+def build_levels(highest=HIGHEST_QUALITY, steps=QUALITY_STEPS):
+    levels = [dict(highest)]
+    for knob, value in steps:
+        level = dict(levels[-1])
+        level[knob] = value
+        levels.append(level)
+    return levels
+
+
+QUALITY_LEVELS = build_levels()
+
+
+class QualityGovernor:
+    """Steps through QUALITY_LEVELS based on a rolling frame-time percentile."""
+    def __init__(self, target_fps, levels=QUALITY_LEVELS, start_level=0, window=120,
+                 percentile=90, headroom=0.7, check_every=30, raise_after=5, name="governor"):
+        self.levels = levels
+        self.level = max(0, min(start_level, len(levels) - 1))
+        self.budget_ms = 1000.0 / target_fps
+        self.percentile = percentile
+        self.headroom = headroom        # raise quality only below budget * headroom
+        self.check_every = check_every  # frames between decisions
+        self.raise_after = raise_after  # consecutive good checks needed to raise quality
+        self.name = name
+        self._times = deque(maxlen=window)
+        self._frames = 0
+        self._good_checks = 0
+        self._raise_wait = raise_after
+        self._checks_since_raise = None
+        self.decisions = 0
+
+    def __getitem__(self, knob):
+        return self.levels[self.level][knob]
+
+    @property
+    def knobs(self):
+        return self.levels[self.level]
+
+    def current_percentile(self):
+        if not self._times:
+            return 0.0
+        ordered = sorted(self._times)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+
+    def frame(self, frame_ms):
+        """Record one frame's work time. Returns True when the quality level changed."""
+        self._times.append(frame_ms)
+        self._frames += 1
+        if self._frames < self.check_every or len(self._times) < self._times.maxlen // 2:
+            return False
+        self._frames = 0
+
+        p = self.current_percentile()
+        if self._checks_since_raise is not None:
+            self._checks_since_raise += 1
+        if p > self.budget_ms and self.level < len(self.levels) - 1:
+            self._good_checks = 0
+            if self._checks_since_raise is not None and self._checks_since_raise <= self.raise_after:
+                # The last raise did not hold: wait longer before trying again
+                self._raise_wait = min(self._raise_wait * 2, self.raise_after * 8)
+            self._checks_since_raise = None
+            return self._set_level(self.level + 1, p, "over")
+        if p < self.budget_ms * self.headroom and self.level > 0:
+            self._good_checks += 1
+            if self._good_checks >= self._raise_wait:
+                self._good_checks = 0
+                self._checks_since_raise = 0
+                return self._set_level(self.level - 1, p, "under")
+        else:
+            self._good_checks = 0
+            if self._checks_since_raise is not None and self._checks_since_raise > self.raise_after:
+                # Held steady after a raise: back to the normal wait
+                self._raise_wait = self.raise_after
+                self._checks_since_raise = None
+        return False
+
+    def _set_level(self, level, p, direction):
+        old, new = self.levels[self.level], self.levels[level]
+        changes = ", ".join(f"{k} {old[k]:.3g} -> {new[k]:.3g}" for k in new if new[k] != old[k])
+        print(f"[{self.name}] p{self.percentile} frame time {p:.1f} ms {direction} budget "
+              f"{self.budget_ms:.1f} ms: quality level {self.level} -> {level} ({changes})")
+        self.level = level
+        self.decisions += 1
+        # Start the next window fresh so the change is judged on its own frames
+        self._times.clear()
+        return True
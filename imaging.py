@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Helpers for handing PIL images to pygame without an encode/decode round-trip."""
+import pygame
+from PIL import Image, ImageDraw
+
+import fonts
+
+
+def pil_to_surface(image):
+    """Wrap a PIL image as a pygame Surface.
+
+    The pixel data is exported once with ``tobytes()`` and the Surface is built
+    directly on top of that buffer, so no PNG compression/decompression and no
+    further copy happens. RGB and RGBA images are passed through as-is, any
+    other mode is converted to RGBA first.
+    """
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    return pygame.image.frombuffer(image.tobytes(), image.size, image.mode)
+
+
+def load_scaled_image(image_path, target_size):
+    """Open an image file and resize it to target_size as an RGBA PIL image.
+
+    JPEG files are decoded at a reduced scale (1/2, 1/4 or 1/8) when that still
+    covers target_size, which skips most of the decode work for large photos.
+    """
+    img = Image.open(image_path)
+    img.draft("RGB", target_size)
+    img = img.convert("RGBA")
+    return img.resize(target_size, Image.LANCZOS)
+
+
+def create_text_image(text, font_size, color, bg_color=None):
+    """Render text (CJK included) with the shared PIL font onto a transparent surface, padded by 10 px."""
+    font = fonts.get_pil_font(font_size)
+
+    bbox = ImageDraw.Draw(Image.new("RGB", (1, 1))).textbbox((0, 0), text, font=font)
+    padding = 10
+    width = bbox[2] - bbox[0] + padding * 2
+    height = bbox[3] - bbox[1] + padding * 2
+
+    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    ImageDraw.Draw(image).text((padding, padding), text, font=font, fill=color)
+    return pil_to_surface(image)
+
+
+def load_custom_image(image_path, target_size=(150, 150)):
+    """Load an image scaled to target_size, or a grey "图片缺失" placeholder when it cannot be read."""
+    try:
+        return pil_to_surface(load_scaled_image(image_path, target_size))
+    except Exception as e:
+        print(f"加载图片错误: {e} - 路径: {image_path}")
+
+        placeholder = pygame.Surface(target_size, pygame.SRCALPHA)
+        placeholder.fill((200, 200, 200, 128))
+        text_surface = fonts.get_font(24).render("图片缺失", True, (100, 100, 100))
+        placeholder.blit(text_surface, text_surface.get_rect(center=(target_size[0]//2, target_size[1]//2)))
+        return placeholder
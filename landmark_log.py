@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""Compact binary recording of the landmarks each game's core receives, for tuning and replay.
+
+Set MOTION_RECORD=1 and every call to the core's step() is recorded to
+.cache/recordings/<game>-<time>.mlog: the time, the step's dt, the game state, each landmark
+stream (hands, pose) with its confidence, and the mouse and key events handed
+to the core. The game loop only appends a tuple to a bounded buffer; a
+background thread quantises, encodes and writes, and drops frames rather
+than block when it falls behind.
+
+File layout (little-endian):
+  header   "MLOG", version (u16), JSON length (u32), JSON {game, created, scale, streams}
+  chunks   "MCHK", first frame (u32), frames (u32), first time in us (i64), payload length (u32),
+           zlib payload. Each chunk decodes on its own: time deltas (i32 us), step dts (i32 us),
+           state indices (u8), and per stream a presence mask (u8), confidences (u8, 0 = unknown) and the
+           coordinates as int16 (value * SCALE) delta-encoded frame to frame.
+  index    JSON [[offset, first frame, frames, first time], ...] then the trailer
+           index offset (i64), index length (u32), "MIDX"
+A file cut short by a crash has no index; the reader then walks the chunk headers.
+
+Read with LandmarkLog(path), which memory-maps the file and decodes chunks on
+demand; ``python landmark_log.py info <file>`` prints a summary.
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+
+import numpy as np
+import pygame
+
+from paths import cache_path
+
+VERSION = 2
+SCALE = 16384          # int16 steps per unit: 0.00006 resolution over -2..2
+CHUNK_FRAMES = 256     # ~8 s at 30 fps per independently decodable chunk
+BUFFER_FRAMES = 4096
+FLUSH_INTERVAL = 0.5   # seconds between writer drains
+STREAMS = {"hands": 21, "pose": 33}  # points per stream, each (x, y) normalised
+EVENT_ATTRS = ("pos", "button", "key", "mod", "unicode", "rel", "buttons", "size")
+
+_HEADER = struct.Struct("<4sHI")
+_CHUNK = struct.Struct("<4sIIqI")
+_TRAILER = struct.Struct("<qI4s")
+
+_recorder = None
+
+
+def _now_us():
+    return time.perf_counter_ns() // 1000
+
+
+def _event_record(event):
+    attrs = {name: getattr(event, name) for name in EVENT_ATTRS if hasattr(event, name)}
+    return [pygame.event.event_name(event.type), attrs]
+
+
+_event_types = {}
+
+
+def decode_event(record):
+    """pygame event from a recorded [name, attrs] pair (see LandmarkLog.frame)."""
+    if not _event_types:
+        for event_type in range(pygame.NUMEVENTS):
+            _event_types.setdefault(pygame.event.event_name(event_type), event_type)
+    name, attrs = record
+    attrs = {key: tuple(value) if isinstance(value, list) else value for key, value in attrs.items()}
+    return pygame.event.Event(_event_types[name], attrs)
+
+
+def encode_chunk(frames, streams):
+    """zlib payload of one chunk from (time_us, dt, state, {stream: (points, confidence)}, events) tuples."""
+    times = np.array([frame[0] for frame in frames], dtype=np.int64)
+    states = []
+    state_index = []
+    events = []
+    for i, (_, _, state, _, frame_events) in enumerate(frames):
+        if state not in states:
+            states.append(state)
+        state_index.append(states.index(state))
+        events.extend([i] + _event_record(event) for event in frame_events)
+    meta = json.dumps({"states": states, "events": events}, ensure_ascii=False).encode("utf-8")
+
+    parts = [struct.pack("<I", len(meta)), meta,
+             np.diff(times, prepend=times[0]).astype(np.int32).tobytes(),
+             np.array([round(frame[1] * 1e6) for frame in frames], dtype=np.int32).tobytes(),
+             np.array(state_index, dtype=np.uint8).tobytes()]
+    for name, count in streams.items():
+        present = []
+        confidence = []
+        points = []
+        for frame in frames:
+            coords, score = frame[3].get(name) or (None, None)
+            present.append(coords is not None)
+            if coords is not None:
+                points.append(coords)
+                confidence.append(0 if score is None else 1 + round(min(max(score, 0.0), 1.0) * 254))
+        parts.append(np.array(present, dtype=np.uint8).tobytes())
+        parts.append(np.array(confidence, dtype=np.uint8).tobytes())
+        if points:
+            quantised = np.clip(np.rint(np.asarray(points, dtype=np.float64) * SCALE),
+                                -32767, 32767).astype(np.int16).reshape(len(points), count, 2)
+            # int16 differences wrap around, and so does the reader's cumulative sum
+            parts.append(np.diff(quantised, axis=0, prepend=np.zeros((1, count, 2), np.int16)).tobytes())
+    return zlib.compress(b"".join(parts), 1)
+
+
+def decode_chunk(payload, frames, t0_us, streams):
+    """Times (s since the recording started), step dts (s), states, events and
+    {stream: (present, confidence, points)}. Absent points and unknown confidences are NaN.
+    """
+    data = zlib.decompress(payload)
+    meta_len, = struct.unpack_from("<I", data)
+    meta = json.loads(data[4:4 + meta_len].decode("utf-8"))
+    offset = 4 + meta_len
+    times = (t0_us + np.cumsum(np.frombuffer(data, np.int32, frames, offset), dtype=np.int64)) / 1e6
+    offset += 4 * frames
+    dts = np.frombuffer(data, np.int32, frames, offset) / 1e6
+    offset += 4 * frames
+    states = [meta["states"][i] for i in np.frombuffer(data, np.uint8, frames, offset)]
+    offset += frames
+    decoded = {}
+    for name, count in streams.items():
+        present = np.frombuffer(data, np.uint8, frames, offset).astype(bool)
+        offset += frames
+        k = int(present.sum())
+        raw = np.frombuffer(data, np.uint8, k, offset).astype(np.float32)
+        offset += k
+        confidence = np.full(frames, np.nan, np.float32)
+        confidence[present] = np.where(raw == 0, np.nan, (raw - 1) / 254)
+        points = np.full((frames, count, 2), np.nan, np.float32)
+        if k:
+            deltas = np.frombuffer(data, np.int16, k * count * 2, offset).reshape(k, count, 2)
+            offset += deltas.nbytes
+            points[present] = np.cumsum(deltas, axis=0, dtype=np.int16).astype(np.float32) / SCALE
+        decoded[name] = (present, confidence, points)
+    return times, dts, states, meta["events"], decoded
+
+
+class Recorder:
+    """Bounded frame buffer written to a .mlog file by a writer thread."""
+    def __init__(self, game, path=None, streams=None, chunk_frames=CHUNK_FRAMES, capacity=BUFFER_FRAMES):
+        self.game = game
+        self.streams = dict(streams or STREAMS)
+        self.path = path or cache_path("recordings", f"{game}-{time.strftime('%Y%m%d-%H%M%S')}.mlog")
+        self.chunk_frames = chunk_frames
+        self.capacity = capacity
+        self.frames = 0        # frames written into chunks
+        self.dropped = 0
+        self._start_us = _now_us()
+        self._buffer = deque()
+        self._pending = []
+        self._index = []
+        self._stop = threading.Event()
+        self._file = open(self.path, "wb")
+        header = json.dumps({"game": game, "created": time.time(), "scale": SCALE, "streams": self.streams},
+                            ensure_ascii=False).encode("utf-8")
+        self._file.write(_HEADER.pack(b"MLOG", VERSION, len(header)) + header)
+        self._writer = threading.Thread(target=self._run, name="landmark-writer", daemon=True)
+        self._writer.start()
+        print(f"[record] recording landmarks to {self.path}")
+
+    # --- Recording (game loop) ---
+    def record(self, state, dt, streams, events=()):
+        """One step(dt): streams maps a stream name to (points or None, confidence or None)."""
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        self._buffer.append((_now_us() - self._start_us, dt, state, streams, tuple(events)))
+
+    # --- Writing (writer thread) ---
+    def _write_chunk(self, frames):
+        payload = encode_chunk(frames, self.streams)
+        offset = self._file.tell()
+        self._file.write(_CHUNK.pack(b"MCHK", self.frames, len(frames), frames[0][0], len(payload)) + payload)
+        self._index.append([offset, self.frames, len(frames), frames[0][0]])
+        self.frames += len(frames)
+
+    def _drain(self, final=False):
+        buffer = self._buffer
+        while buffer:
+            self._pending.append(buffer.popleft())
+            if len(self._pending) >= self.chunk_frames:
+                self._write_chunk(self._pending)
+                self._pending = []
+        if final and self._pending:
+            self._write_chunk(self._pending)
+            self._pending = []
+        self._file.flush()
+
+    def _run(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            self._drain()
+
+    def close(self):
+        self._stop.set()
+        self._writer.join()
+        self._drain(final=True)
+        index = json.dumps({"chunks": self._index, "frames": self.frames, "dropped": self.dropped}).encode("utf-8")
+        offset = self._file.tell()
+        self._file.write(index + _TRAILER.pack(offset, len(index), b"MIDX"))
+        self._file.close()
+        size = os.path.getsize(self.path)
+        print(f"[record] wrote {self.frames} frames ({size / 1024:.0f} KB) to {self.path}"
+              + (f", {self.dropped} dropped" if self.dropped else ""))
+
+
+class LandmarkLog:
+    """Memory-mapped reader with random access by frame."""
+    def __init__(self, path):
+        self.path = path
+        if os.path.getsize(path) < _HEADER.size:
+            raise ValueError(f"{path} is empty or truncated")
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_len = _HEADER.unpack_from(self._map)
+        if magic != b"MLOG" or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} landmark log")
+        self._data_start = _HEADER.size + header_len
+        self.header = json.loads(self._map[_HEADER.size:self._data_start].decode("utf-8"))
+        self.streams = self.header["streams"]
+        self.chunks, self.dropped = self._read_index()
+        self.frames = sum(chunk[2] for chunk in self.chunks)
+        self._starts = [chunk[1] for chunk in self.chunks]
+        self._cached = (None, None)
+
+    def _read_index(self):
+        if len(self._map) >= self._data_start + _TRAILER.size:
+            offset, length, magic = _TRAILER.unpack_from(self._map, len(self._map) - _TRAILER.size)
+            if magic == b"MIDX":
+                index = json.loads(self._map[offset:offset + length].decode("utf-8"))
+                return index["chunks"], index.get("dropped", 0)
+        # No index (the game did not exit cleanly): walk the chunk headers
+        chunks = []
+        offset = self._data_start
+        while offset + _CHUNK.size <= len(self._map):
+            magic, first, frames, t0, length = _CHUNK.unpack_from(self._map, offset)
+            if magic != b"MCHK" or offset + _CHUNK.size + length > len(self._map):
+                break
+            chunks.append([offset, first, frames, t0])
+            offset += _CHUNK.size + length
+        return chunks, 0
+
+    def __len__(self):
+        return self.frames
+
+    def chunk(self, i):
+        """Decoded chunk i (see decode_chunk); the last one is kept."""
+        if self._cached[0] != i:
+            offset, _, frames, t0 = self.chunks[i]
+            length = _CHUNK.unpack_from(self._map, offset)[4]
+            start = offset + _CHUNK.size
+            self._cached = (i, decode_chunk(self._map[start:start + length], frames, t0, self.streams))
+        return self._cached[1]
+
+    def frame(self, n):
+        """Frame n as {"t", "dt", "state", "events", <stream>: (points or None, confidence or None)}."""
+        if not 0 <= n < self.frames:
+            raise IndexError(n)
+        i = int(np.searchsorted(self._starts, n, side="right")) - 1
+        times, dts, states, events, streams = self.chunk(i)
+        j = n - self.chunks[i][1]
+        frame = {"t": float(times[j]), "dt": float(dts[j]), "state": states[j],
+                 "events": [event[1:] for event in events if event[0] == j]}
+        for name, (present, confidence, points) in streams.items():
+            score = float(confidence[j])
+            frame[name] = (points[j], None if score != score else score) if present[j] else (None, None)
+        return frame
+
+    def __iter__(self):
+        for n in range(self.frames):
+            yield self.frame(n)
+
+    def stream(self, name):
+        """Whole-recording arrays for one stream: times (s), present, confidence, points (NaN when absent)."""
+        parts = [self.chunk(i) for i in range(len(self.chunks))]
+        if not parts:
+            count = self.streams[name]
+            return np.empty(0), np.empty(0, bool), np.empty(0, np.float32), np.empty((0, count, 2), np.float32)
+        return (np.concatenate([p[0] for p in parts]),
+                *(np.concatenate([p[4][name][k] for p in parts]) for k in range(3)))
+
+    def states(self):
+        return [state for i in range(len(self.chunks)) for state in self.chunk(i)[2]]
+
+    def close(self):
+        self._cached = (None, None)
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def find_recordings(paths):
+    """.mlog files from a list of files and folders (folders are searched one level deep)."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, "*.mlog"))))
+        else:
+            found.append(path)
+    return found
+
+
+# --- Module-level API used by the games ---
+def start(game, path=None, streams=None):
+    """Start recording if MOTION_RECORD=1 (or forced with a path); returns the Recorder or None."""
+    global _recorder
+    if _recorder is None and (path or os.environ.get("MOTION_RECORD", "0") == "1"):
+        _recorder = Recorder(game, path, streams)
+    return _recorder
+
+
+def record(state, dt, streams, events=()):
+    """Record what the core's step() receives; does nothing while recording is off."""
+    if _recorder is not None:
+        _recorder.record(state, dt, streams, events)
+
+
+def hand_confidence(results):
+    """Handedness score of the first hand in a MediaPipe Hands result."""
+    if results.multi_handedness:
+        return results.multi_handedness[0].classification[0].score
+    return None
+
+
+def pose_confidence(results):
+    """Mean landmark visibility of a MediaPipe Pose result."""
+    if results.pose_landmarks:
+        return sum(lm.visibility for lm in results.pose_landmarks.landmark) / len(results.pose_landmarks.landmark)
+    return None
+
+
+def stop():
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+def info(path):
+    with LandmarkLog(path) as log:
+        size = os.path.getsize(path)
+        print(f"{path}: {log.header['game']}, {log.frames} frames in {len(log.chunks)} chunks, "
+              f"{size / 1024:.1f} KB ({size / max(log.frames, 1):.0f} bytes/frame)"
+              + (f", {log.dropped} dropped" if log.dropped else ""))
+        if not log.frames:
+            return
+        times = log.stream(next(iter(log.streams)))[0]
+        print(f"  duration {times[-1] - times[0]:.1f} s")
+        states = log.states()
+        for state in dict.fromkeys(states):
+            print(f"  state {state}: {states.count(state)} frames")
+        for name in log.streams:
+            present = log.stream(name)[1]
+            print(f"  {name}: detected in {int(present.sum())} frames")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Landmark recording utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info_parser = sub.add_parser("info", help="summarise recordings")
+    info_parser.add_argument("recordings", nargs="+")
+    args = parser.parse_args()
+    for recording in args.recordings:
+        info(recording)
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""Motion-to-photon latency: how long a hand movement takes to show on screen.
+
+The game script runs inside this process (as in soak.py) with a synthetic
+camera that shows a hand held at one of two positions. At random times the
+hand jumps to the other position. Each jump is timed at four points:
+
+  moved      the scheduled jump (the "motion")
+  captured   the first camera frame showing the hand at its new place
+  tracked    the first tracker result reporting the new place
+  presented  the first presented frame whose pixels show the crosshair or
+             hand marker at its new place (the "photon")
+
+so each trial splits into capture (camera frame interval), inference (convert
+and tracking), game (logic, render and present) and the total. The rendered
+frames are classified against two reference frames captured while the hand
+held still at each position, using only the pixels that differ between the
+two and stay still while the hand does (animations and the camera preview
+thumbnail, which refreshes on its own timer, are left out). By
+default a stand-in tracker finds the hand by colour, leaving out the model's
+own cost; --tracker mediapipe runs the real model on the silhouette. The time
+the display takes to scan out after present is not included.
+
+Supported: GAME.py (crosshair on the start screen) and pingpong.py (hand
+marker on the introduction screen); medicine.py shows no hand-driven cursor.
+
+Usage: python latency.py GAME.py [--trials 40] [--fps 30] [--tracker marker|mediapipe] [--max-p95-ms 150]
+Results go to .cache/latency/<game>-<time>.json; the exit code is 1 above --max-p95-ms.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import types
+
+import numpy as np
+
+import camera
+from camera_sources import FrameSource, draw_hand
+from paths import cache_path
+from script_runner import run_script
+
+POSITIONS = {"A": (0.3, 0.35), "B": (0.7, 0.35)}  # normalised, in the camera picture
+SUPPORTED = ("GAME.py", "pingpong.py")
+WARMUP_FRAMES = 30
+TRIAL_TIMEOUT = 1.0    # seconds before a jump that never shows counts as missed
+THUMB_TIP = 4
+STAGES = ("capture_ms", "inference_ms", "game_ms", "total_ms")
+
+
+class LatencyRig:
+    """Schedules the jumps and collects the timestamps reported by the hooks."""
+    def __init__(self, trials, period, settle, seed):
+        self.trials_wanted = trials
+        self.period = period
+        self.settle = settle
+        self.rng = random.Random(seed)
+        self.phase = "warmup"
+        self.phase_start = None
+        self.frames = 0
+        self.scene = "A"
+        self.pending = None
+        self.switch_at = None
+        self.trial = None
+        self.trials = []
+        self.references = {}
+        self.still = {}        # per side: (lowest, highest) value of each pixel while the hand held still
+        self.tracked_x = {"A": [], "B": []}
+        self.previews = []     # camera preview thumbnails: they show the hand too, but on their own timer
+        self.preview_rects = set()
+        self.region = None
+        self.mask = None
+        self.error = None
+        self.finished = False
+
+    # --- Scene (read by the camera) ---
+    def scene_at(self, now):
+        if self.switch_at is not None and now >= self.switch_at:
+            self.scene = self.pending
+            self.switch_at = None
+        return self.scene
+
+    def _jump(self, at):
+        self.pending = "B" if self.scene == "A" else "A"
+        self.switch_at = at
+        return self.pending
+
+    # --- Hooks ---
+    def captured(self, scene, now):
+        trial = self.trial
+        if trial and trial["captured"] is None and scene == trial["target"]:
+            trial["captured"] = now
+
+    def tracked(self, x, now):
+        if x is None:
+            return
+        if self.phase in ("A", "B") and now - self.phase_start > self.settle / 2:
+            self.tracked_x[self.phase].append(x)
+        trial = self.trial
+        if trial and trial["tracked"] is None and trial["captured"] is not None:
+            a, b = self.tracked_x["A"][-1], self.tracked_x["B"][-1]
+            if (abs(x - b) < abs(x - a)) == (trial["target"] == "B"):
+                trial["tracked"] = now
+
+    def blitted(self, source, rect):
+        if any(source is preview for preview in self.previews):
+            self.preview_rects.add(tuple(rect))
+
+    def presented(self, surface, now):
+        self.frames += 1
+        if self.phase == "warmup":
+            if self.phase_start is None:
+                self.phase_start = now
+            if self.frames >= WARMUP_FRAMES and now - self.phase_start > 1.0:
+                self.phase, self.phase_start = "A", now
+        elif self.phase in ("A", "B"):
+            if now - self.phase_start > self.settle / 2:
+                self._hold(self.phase, self._grab(surface))
+            if now - self.phase_start <= self.settle:
+                return
+            if self.phase == "A":
+                self._jump(now)
+                self.phase, self.phase_start = "B", now
+            elif self._calibrate():
+                self.phase = "trials"
+                self._next_trial(now)
+            else:
+                self._finish()
+        elif self.phase == "trials":
+            self._check_trial(surface, now)
+        elif self.phase == "done":
+            self._finish()
+
+    # --- Calibration and trials ---
+    @staticmethod
+    def _grab(surface, region=None):
+        import pygame
+        if region is not None:
+            surface = surface.subsurface(region)
+        return pygame.surfarray.array3d(surface).astype(np.int16)
+
+    def _hold(self, side, frame):
+        self.references[side] = frame
+        if side in self.still:
+            lowest, highest = self.still[side]
+            self.still[side] = (np.minimum(lowest, frame), np.maximum(highest, frame))
+        else:
+            self.still[side] = (frame, frame)
+
+    def _calibrate(self):
+        if not self.tracked_x["A"] or not self.tracked_x["B"]:
+            self.error = "the tracker did not find the synthetic hand"
+            return False
+        self.tracked_x = {side: [float(np.median(xs))] for side, xs in self.tracked_x.items()}
+        difference = np.abs(self.references["A"] - self.references["B"]).sum(axis=2) > 60
+        for lowest, highest in self.still.values():
+            difference &= (highest - lowest).max(axis=2) <= 8
+        self.still = {}
+        for x, y, w, h in self.preview_rects:
+            difference[x:x + w, y:y + h] = False
+        if difference.sum() < 20:
+            self.error = "the screen does not change when the hand moves"
+            return False
+        xs, ys = np.nonzero(difference)  # surfarray arrays are indexed [x, y]
+        self.region = (int(xs.min()), int(ys.min()), int(xs.max() - xs.min() + 1), int(ys.max() - ys.min() + 1))
+        x, y, w, h = self.region
+        self.mask = difference[x:x + w, y:y + h]
+        self.references = {side: ref[x:x + w, y:y + h][self.mask] for side, ref in self.references.items()}
+        print(f"[latency] calibrated: hand marker changes {int(self.mask.sum())} pixels in {self.region}")
+        return True
+
+    def _next_trial(self, now):
+        if len(self.trials) >= self.trials_wanted:
+            self.phase = "done"
+            return
+        # Random spacing, so jumps land at every phase of the camera and frame clocks
+        at = now + self.rng.uniform(0.75, 1.25) * self.period
+        self.trial = {"moved": at, "target": self._jump(at), "captured": None, "tracked": None,
+                      "presented": None, "frames": 0}
+
+    def _check_trial(self, surface, now):
+        trial = self.trial
+        if now < trial["moved"]:
+            return
+        trial["frames"] += 1
+        pixels = self._grab(surface, self.region)[self.mask]
+        distance = {side: np.abs(pixels - ref).mean() for side, ref in self.references.items()}
+        if min(distance, key=distance.get) == trial["target"] and trial["tracked"] is not None:
+            trial["presented"] = now
+        elif now - trial["moved"] > TRIAL_TIMEOUT:
+            trial["missed"] = True
+        else:
+            return
+        self.trials.append(trial)
+        self.trial = None
+        self._next_trial(now)
+
+    def _finish(self):
+        import pygame
+        self.finished = True
+        pygame.event.post(pygame.event.Event(pygame.QUIT))  # repeated until the loop exits
+
+    # --- Report ---
+    def results(self):
+        rows = []
+        for trial in self.trials:
+            if trial.get("missed"):
+                continue
+            rows.append({
+                "capture_ms": (trial["captured"] - trial["moved"]) * 1000,
+                "inference_ms": (trial["tracked"] - trial["captured"]) * 1000,
+                "game_ms": (trial["presented"] - trial["tracked"]) * 1000,
+                "total_ms": (trial["presented"] - trial["moved"]) * 1000,
+                "frames": trial["frames"],
+            })
+        summary = {}
+        for stage in STAGES:
+            values = np.array([row[stage] for row in rows])
+            if len(values):
+                summary[stage] = {"p50": round(float(np.percentile(values, 50)), 1),
+                                  "p95": round(float(np.percentile(values, 95)), 1),
+                                  "max": round(float(values.max()), 1),
+                                  "mean": round(float(values.mean()), 1)}
+        return rows, summary
+
+
+class StepCamera(FrameSource):
+    """Paced synthetic camera showing the hand at the rig's current position."""
+    fourcc = "STEP"
+
+    def __init__(self, rig, size, fps, name):
+        super().__init__(name, fps, loop=False)
+        self.rig = rig
+        self.size = tuple(size)
+        width, height = self.size
+        self._background = np.random.default_rng(0).integers(40, 90, (height, width, 3), dtype=np.uint8)
+
+    def _frame_at(self, index):
+        now = time.perf_counter()
+        scene = self.rig.scene_at(now)
+        frame = self._background.copy()
+        draw_hand(frame, 0.5, centre=POSITIONS[scene])  # fingers fully spread, so only the jump moves pixels
+        self.rig.captured(scene, now)
+        return frame
+
+
+class MarkerTracker:
+    """Stand-in for the MediaPipe trackers: the centroid of the hand's skin colour, as every landmark."""
+    def __init__(self, kind):
+        self.kind = kind
+
+    def process(self, rgb):
+        red = rgb[::4, ::4, 0]
+        ys, xs = np.nonzero(red > 170)
+        if len(xs) < 20:
+            points = None
+        else:
+            x, y = xs.mean() / red.shape[1], ys.mean() / red.shape[0]
+            points = [types.SimpleNamespace(x=x, y=y, z=0.0, visibility=1.0) for _ in range(33)]
+            points[THUMB_TIP] = types.SimpleNamespace(x=x + 0.15, y=y, z=0.0, visibility=1.0)  # not pinching
+        if self.kind == "pose":
+            return types.SimpleNamespace(pose_landmarks=types.SimpleNamespace(landmark=points) if points else None)
+        hand = types.SimpleNamespace(landmark=points[:21]) if points else None
+        score = [types.SimpleNamespace(classification=[types.SimpleNamespace(score=1.0)])]
+        return types.SimpleNamespace(multi_hand_landmarks=[hand] if hand else None,
+                                     multi_handedness=score if hand else None)
+
+    def close(self):
+        pass
+
+
+class TimedTracker:
+    """Wraps a tracker and reports where it saw the hand, and when."""
+    def __init__(self, tracker, rig):
+        self.tracker = tracker
+        self.rig = rig
+
+    def process(self, rgb):
+        result = self.tracker.process(rgb)
+        x = None
+        if getattr(result, "multi_hand_landmarks", None):
+            x = result.multi_hand_landmarks[0].landmark[0].x
+        elif getattr(result, "pose_landmarks", None):
+            x = result.pose_landmarks.landmark[0].x
+        self.rig.tracked(x, time.perf_counter())
+        return result
+
+    def close(self):
+        self.tracker.close()
+
+
+def run_game(script, rig, fps, tracker, window):
+    """Run the game with the step camera, timed trackers and a hook after every present."""
+    import mediapipe as mp
+    import pygame
+
+    import compositor
+    import preview
+
+    os.environ.pop("MOTION_CAMERA", None)  # open_camera() then builds the (replaced) CameraSupervisor
+    camera.CameraSupervisor = lambda index=0, min_size=camera.TRACKER_MIN_SIZE, min_fps=None, name="camera": \
+        StepCamera(rig, min_size, fps, f"{name} (latency)")
+    for kind, module, factory in (("hands", mp.solutions.hands, "Hands"), ("pose", mp.solutions.pose, "Pose")):
+        real = getattr(module, factory)
+        if tracker == "marker":
+            setattr(module, factory, lambda kind=kind, **kwargs: TimedTracker(MarkerTracker(kind), rig))
+        else:
+            setattr(module, factory, lambda real=real, **kwargs: TimedTracker(real(**kwargs), rig))
+
+    class RigPreview(preview.CameraPreview):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            rig.previews.append(self.surface)
+
+    def blit(self, surface, dest, area=None, blit=compositor.Compositor.blit):
+        rect = blit(self, surface, dest, area)
+        rig.blitted(surface, rect)
+        return rect
+    preview.CameraPreview = RigPreview
+    compositor.Compositor.blit = blit
+    for name in ("update", "flip"):
+        present = getattr(pygame.display, name)
+
+        def hooked(*args, present=present, **kwargs):
+            result = present(*args, **kwargs)
+            surface = pygame.display.get_surface()
+            if surface is not None:
+                rig.presented(surface, time.perf_counter())
+            return result
+        setattr(pygame.display, name, hooked)
+
+    run_script(script, window)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("game", choices=SUPPORTED)
+    parser.add_argument("--trials", type=int, default=40, help="hand jumps to time")
+    parser.add_argument("--period", type=float, default=0.6, help="average seconds between jumps")
+    parser.add_argument("--settle", type=float, default=1.5, help="seconds held at each position to calibrate")
+    parser.add_argument("--fps", type=float, default=camera.TRACKER_MIN_FPS, help="camera frame rate")
+    parser.add_argument("--tracker", choices=("marker", "mediapipe"), default="marker")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="fail when the p95 total exceeds this")
+    parser.add_argument("--window", action="store_true", help="show the game instead of rendering off-screen")
+    args = parser.parse_args()
+
+    rig = LatencyRig(args.trials, args.period, args.settle, args.seed)
+    try:
+        run_game(args.game, rig, args.fps, args.tracker, args.window)
+    finally:
+        rows, summary = rig.results()
+    missed = sum(1 for trial in rig.trials if trial.get("missed"))
+    failures = []
+    if rig.error:
+        failures.append(rig.error)
+    elif not rows:
+        failures.append("no trial completed")
+    elif args.max_p95_ms is not None and summary["total_ms"]["p95"] > args.max_p95_ms:
+        failures.append(f"p95 motion-to-photon {summary['total_ms']['p95']:.1f} ms > {args.max_p95_ms} ms")
+
+    report = {"game": args.game, "tracker": args.tracker, "camera_fps": args.fps,
+              "time": time.strftime("%Y-%m-%d %H:%M:%S"), "completed": len(rows), "missed": missed,
+              "summary": summary, "failures": failures, "trials": rows}
+    name = os.path.splitext(args.game)[0]
+    path = cache_path("latency", f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"[latency] {args.game}: {len(rows)} trials, {missed} missed ({args.tracker} tracker, camera {args.fps:g} fps)")
+    for stage, values in summary.items():
+        print(f"  {stage:<13} p50 {values['p50']:7.1f}  p95 {values['p95']:7.1f}  max {values['max']:7.1f}")
+    for failure in failures:
+        print(f"  FAIL {failure}")
+    print(f"[latency] report written to {path}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""中医药学习的无界面模拟：药材知识库、手势识别和学习/测试状态机。
+
+``MedicineCore.step(dt, landmarks, events)`` 推进一帧。landmarks 是镜像后画面中
+一只手的 21 个归一化 (x, y) 关键点，未检测到时为 None；events 是已换算到逻辑坐标的
+pygame 事件（鼠标点击和按键）。手势冷却按帧计算。切换背景音乐等需要声卡的操作记录在
+``effects`` 中由调用方执行，因此不需要窗口、摄像头或声卡。
+"""
+import math
+import random
+
+import pygame
+
+WIDTH, HEIGHT = 1280, 800
+
+LEARN_BEFORE_TEST = 30       # 学习多少种药材后开始测试
+QUESTION_COUNT = 8
+GESTURE_COOLDOWN = 20        # 学习模式手势冷却（帧）
+TEST_GESTURE_COOLDOWN = 30   # 测试模式手势冷却（帧）
+
+# 手部关键点序号（与 MediaPipe HandLandmark 一致）
+WRIST = 0
+THUMB_MCP = 2
+THUMB_TIP = 4
+INDEX_FINGER_MCP = 5
+INDEX_FINGER_PIP = 6
+INDEX_FINGER_TIP = 8
+MIDDLE_FINGER_MCP = 9
+MIDDLE_FINGER_PIP = 10
+MIDDLE_FINGER_TIP = 12
+RING_FINGER_MCP = 13
+RING_FINGER_PIP = 14
+RING_FINGER_TIP = 16
+PINKY_MCP = 17
+PINKY_PIP = 18
+PINKY_TIP = 20
+
+# 中医药知识库（图片由游戏按 image_path 加载）
+HERBS = [
+    {
+        "name": "人参",
+        "category": "补气药",
+        "effect": "大补元气，复脉固脱，补脾益肺，生津安神",
+        "usage": "煎服，3-9克",
+        "image_path": "renshen.jpg"
+    },
+    {
+        "name": "黄芪",
+        "category": "补气药",
+        "effect": "补气固表，利尿托毒，排脓，敛疮生肌",
+        "usage": "煎服，9-30克",
+        "image_path": "huangqi.jpg"
+    },
+    {
+        "name": "当归",
+        "category": "补血药",
+        "effect": "补血活血，调经止痛，润肠通便",
+        "usage": "煎服，6-12克",
+        "image_path": "danggui.jpg"
+    },
+    {
+        "name": "枸杞",
+        "category": "补阴药",
+        "effect": "滋补肝肾，益精明目",
+        "usage": "煎服，6-12克",
+        "image_path": "gouqi.jpg"
+    },
+    {
+        "name": "金银花",
+        "category": "清热解毒药",
+        "effect": "清热解毒，疏散风热",
+        "usage": "煎服，6-15克",
+        "image_path": "jinyinhua.jpeg"
+    },
+    {
+        "name": "茯苓",
+        "category": "利水渗湿药",
+        "effect": "利水渗湿，健脾宁心",
+        "usage": "煎服，9-15克",
+        "image_path": "fuling.jpeg"
+    },
+    {
+        "name": "陈皮",
+        "category": "理气药",
+        "effect": "理气健脾，燥湿化痰",
+        "usage": "煎服，3-9克",
+        "image_path": "chenpi.jpeg"
+    },
+    {
+        "name": "三七",
+        "category": "止血药",
+        "effect": "散瘀止血，消肿定痛",
+        "usage": "研末吞服，1-3克",
+        "image_path": "sanqi.jpeg"
+    },
+    {
+        "name": "甘草",
+        "category": "补气药",
+        "effect": "补脾益气，清热解毒，祛痰止咳，缓急止痛，调和诸药",
+        "usage": "煎服，2-10克",
+        "image_path": "gancao.jpg"
+    },
+    {
+        "name": "川芎",
+        "category": "活血止痛药",
+        "effect": "活血行气，祛风止痛",
+        "usage": "煎服，3-9克",
+        "image_path": "chuanxiong.jpeg"
+    },
+    {
+        "name": "白术",
+        "category": "补气药",
+        "effect": "健脾益气，燥湿利水，止汗，安胎",
+        "usage": "煎服，6-12克",
+        "image_path": "baizhu.jpeg"
+    },
+    {
+        "name": "黄连",
+        "category": "清热燥湿药",
+        "effect": "清热燥湿，泻火解毒",
+        "usage": "煎服，2-5克",
+        "image_path": "huanglian.jpeg"
+    },
+    {
+        "name": "地黄",
+        "category": "补血药",
+        "effect": "鲜地黄：清热生津，凉血止血；生地黄：清热凉血，养阴生津",
+        "usage": "煎服，10-15克",
+        "image_path": "dihuang.jpeg"
+    },
+    {
+        "name": "麦冬",
+        "category": "补阴药",
+        "effect": "养阴生津，润肺清心",
+        "usage": "煎服，6-12克",
+        "image_path": "maidong.jpg"
+    },
+    {
+        "name": "丹参",
+        "category": "活血调经药",
+        "effect": "活血祛瘀，通经止痛，清心除烦，凉血消痈",
+        "usage": "煎服，10-15克",
+        "image_path": "danshen.jpeg"
+    }
+]
+
+
+# 计算两点之间的欧氏距离
+def distance(point1, point2):
+    return math.hypot(point1[0] - point2[0], point1[1] - point2[1])
+
+
+# 改进的手指伸直判断函数，允许一定的误差范围，使判断更灵活
+def is_finger_extended(tip, mcp, pip):
+    return tip[1] < pip[1] + 0.02 and pip[1] < mcp[1] + 0.02
+
+
+def classify_gesture(points):
+    """由 21 个归一化关键点识别手势："张开手掌"、"比耶"、"数字1"-"数字4" 或 "其他手势" """
+    index_tip = points[INDEX_FINGER_TIP]
+    middle_tip = points[MIDDLE_FINGER_TIP]
+    index_mcp = points[INDEX_FINGER_MCP]
+
+    index_extended = is_finger_extended(index_tip, index_mcp, points[INDEX_FINGER_PIP])
+    middle_extended = is_finger_extended(middle_tip, points[MIDDLE_FINGER_MCP], points[MIDDLE_FINGER_PIP])
+    ring_extended = is_finger_extended(points[RING_FINGER_TIP], points[RING_FINGER_MCP], points[RING_FINGER_PIP])
+    pinky_extended = is_finger_extended(points[PINKY_TIP], points[PINKY_MCP], points[PINKY_PIP])
+
+    # 改进的拇指伸直判断：基于拇指长度
+    thumb_extended = distance(points[THUMB_TIP], points[THUMB_MCP]) > 0.1
+
+    # 食指和中指之间的距离，按食指长度归一化（用于区分比耶和数字2）
+    index_middle_distance = distance(index_tip, middle_tip)
+    index_length = distance(index_tip, index_mcp)
+
+    # 张开手掌：所有手指都伸直
+    if index_extended and middle_extended and ring_extended and pinky_extended and thumb_extended:
+        return "张开手掌"
+    if index_extended and middle_extended and not ring_extended and not pinky_extended:
+        return "比耶" if index_middle_distance > 0.5 * index_length else "数字2"
+    # 数字1：只有食指伸直
+    if index_extended and not middle_extended and not ring_extended and not pinky_extended:
+        return "数字1"
+    # 数字3：食指、中指和无名指伸直
+    if index_extended and middle_extended and ring_extended and not pinky_extended:
+        return "数字3"
+    # 数字4：食指、中指、无名指和小指伸直
+    if index_extended and middle_extended and ring_extended and pinky_extended:
+        return "数字4"
+    return "其他手势"
+
+
+def generate_test_questions(learned_herbs, rng=random):
+    """生成测试题目：学过至少5种药材时只考学过的"""
+    questions = []
+    available_herbs = learned_herbs if len(learned_herbs) >= 5 else HERBS
+
+    for _ in range(QUESTION_COUNT):
+        # 随机选择一个药材作为问题主体和问题类型
+        target_herb = rng.choice(available_herbs)
+        question_type = rng.choice(["effect", "category", "usage"])
+
+        if question_type == "effect":
+            question_text = f"{target_herb['name']}的功效是什么？"
+        elif question_type == "category":
+            question_text = f"{target_herb['name']}属于哪类药材？"
+        else:  # usage
+            question_text = f"{target_herb['name']}的正确用法是？"
+        correct_answer = target_herb[question_type]
+
+        # 选择其他药材的同类型属性作为干扰项
+        options = [correct_answer]
+        while len(options) < 4:
+            other_herb = rng.choice(HERBS)
+            if other_herb != target_herb:
+                distractor = other_herb[question_type]
+                if distractor not in options:
+                    options.append(distractor)
+
+        # 打乱选项顺序
+        rng.shuffle(options)
+        questions.append({
+            "text": question_text,
+            "options": options,
+            "correct_index": options.index(correct_answer),
+            "target_herb": target_herb
+        })
+
+    return questions
+
+
+class MedicineCore:
+    """欢迎界面 -> 学习（比耶详情，张开手掌下一个）-> 测试（1-4选答案，张开手掌下一题）"""
+    def __init__(self, window_size=(WIDTH, HEIGHT), rng=None):
+        self.rng = rng or random.Random()
+        self.time = 0.0
+        self.show_welcome = True
+        self.current_herb = self.rng.choice(HERBS)
+        self.learned_count = 0  # 已学习药材数量
+        self.learned_herbs = []  # 存储已学习的药材
+        self.score = 0  # 学习进度计数
+        self.show_info = False
+        self.hand_position = (0, 0)  # 手腕的归一化坐标
+        self.hand_gesture = "未检测到手势"
+        self.gesture_cooldown = 0
+        self.window_size = window_size
+        self.in_test = False  # 是否处于测试状态
+        self.test_questions = []  # 测试题目
+        self.current_question = 0  # 当前问题索引
+        self.test_score = 0  # 测试得分
+        self.selected_answer = None  # 用户选择的答案
+        self.test_completed = False  # 测试是否完成
+        self.test_gesture_cooldown = 0  # 测试模式下的手势冷却
+        self.effects = []  # 本帧需要调用方执行的操作："toggle_music"
+
+    @property
+    def scene(self):
+        """当前界面名称，用于 trace、指标和性能采样"""
+        return "welcome" if self.show_welcome else "test" if self.in_test else "learning"
+
+    # --- 按钮动作 ---
+    def next_herb(self):
+        # 记录已学习的药材，选择新药材
+        if self.current_herb not in self.learned_herbs:
+            self.learned_herbs.append(self.current_herb)
+        self.current_herb = self.rng.choice(HERBS)
+        self.show_info = False
+        self.learned_count += 1
+        self.gesture_cooldown = GESTURE_COOLDOWN
+
+        # 检查是否已学习30种药材，准备测试
+        if self.learned_count >= LEARN_BEFORE_TEST and not self.in_test:
+            self.test_questions = generate_test_questions(self.learned_herbs, self.rng)
+            self.in_test = True
+            self.current_question = 0
+            self.test_score = 0
+            self.test_completed = False
+
+    def toggle_info(self):
+        self.show_info = not self.show_info
+        self.gesture_cooldown = GESTURE_COOLDOWN
+
+    def next_question(self):
+        # 回答了当前问题才能进入下一题或完成测试
+        if self.selected_answer is None:
+            return
+        current_q = self.test_questions[self.current_question]
+        if self.selected_answer == current_q["correct_index"]:
+            self.test_score += 1
+        self.current_question += 1
+        self.selected_answer = None
+        if self.current_question >= len(self.test_questions):
+            self.test_completed = True
+
+    def return_to_learning(self):
+        self.in_test = False
+        self.learned_count = 0  # 重置计数，允许重新积累学习
+
+    def buttons(self):
+        """当前界面的按钮：(矩形, 文字, 动作, 选项序号)"""
+        w, h = self.window_size
+        if not self.in_test:
+            return [
+                (pygame.Rect(w - 180, h - 250, 160, 50), "下一个药材", self.next_herb, None),
+                (pygame.Rect(w - 180, h - 350, 160, 50), "药材详情", self.toggle_info, None),
+            ]
+        if self.test_completed:
+            return [(pygame.Rect(w//2 - 80, h - 100, 160, 50), "返回学习", self.return_to_learning, None)]
+        current_q = self.test_questions[self.current_question]
+        buttons = [(pygame.Rect(w//2 - 300, 300 + i * 70, 600, 50), option, None, i)
+                   for i, option in enumerate(current_q["options"])]
+        # 下一题按钮仅在选择答案后显示
+        if self.selected_answer is not None:
+            buttons.append((pygame.Rect(w//2 - 80, h - 100, 160, 50), "下一题", self.next_question, None))
+        return buttons
+
+    # --- 每帧更新 ---
+    def step(self, dt, landmarks=None, events=()):
+        self.time += dt
+        self.effects = []
+        for event in events:
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                self.click(event.pos, event.button)
+            elif event.type == pygame.KEYDOWN:
+                self.key(event.key)
+
+        if landmarks is not None:
+            self.hand_position = landmarks[WRIST]
+            self.hand_gesture = classify_gesture(landmarks)
+            self.handle_gesture(self.hand_gesture)
+
+        # 更新冷却时间
+        if self.gesture_cooldown > 0:
+            self.gesture_cooldown -= 1
+        if self.test_gesture_cooldown > 0:
+            self.test_gesture_cooldown -= 1
+
+    def click(self, pos, button=1):
+        in_test = self.in_test
+        if button == 1:
+            for rect, text, action, answer_index in self.buttons():
+                if rect.collidepoint(pos):
+                    if action:
+                        action()
+                    if answer_index is not None:
+                        self.selected_answer = answer_index
+                    break
+        # 点击任意位置开始
+        if not in_test:
+            self.show_welcome = False
+
+    def key(self, key):
+        # 任意键关闭欢迎界面，之后空格键控制音乐播放/暂停
+        if self.show_welcome:
+            self.show_welcome = False
+        elif key == pygame.K_SPACE:
+            self.effects.append("toggle_music")
+
+    def handle_gesture(self, gesture):
+        if self.in_test and not self.test_completed:
+            # 测试模式：数字手势选择答案（1-4对应选项0-3），张开手掌进入下一题
+            if self.test_gesture_cooldown > 0:
+                return
+            if gesture.startswith("数字"):
+                num = int(gesture.replace("数字", ""))
+                if 1 <= num <= 4 and self.selected_answer is None:
+                    self.selected_answer = num - 1
+                    self.test_gesture_cooldown = TEST_GESTURE_COOLDOWN
+            elif gesture == "张开手掌" and self.selected_answer is not None:
+                self.next_question()
+                self.test_gesture_cooldown = TEST_GESTURE_COOLDOWN
+        elif self.gesture_cooldown <= 0:
+            # 学习模式：比耶查看详情，张开手掌切换下一个药材
+            if gesture == "比耶":
+                self.toggle_info()
+            elif gesture == "张开手掌":
+                self.next_herb()
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Optional localhost metrics endpoint in Prometheus text format, for unattended kiosks.
+
+Set MOTION_METRICS_PORT (e.g. 9464) and each game serves
+http://127.0.0.1:<port>/metrics from a daemon thread; without it nothing
+listens. The game loop only bumps plain counters and histogram buckets that
+no other thread writes, so recording takes no locks. Everything else (frame
+rate, camera reconnects, cache hits, memory, current state) is read by
+collector functions when a scrape arrives, so it costs the loop nothing.
+
+Every sample carries a game="..." label. GAME.py stops its server before it
+launches another game, which then takes over the port.
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+HOST = "127.0.0.1"  # never reachable from the network
+# Inference latency buckets in seconds, around the 16 / 33 ms frame budgets
+LATENCY_BUCKETS = (0.005, 0.01, 0.02, 0.033, 0.05, 0.075, 0.1, 0.2, 0.5)
+
+
+class Counter:
+    """Monotonic count written by one thread (the game loop)."""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram written by one thread; buckets are made cumulative at scrape time."""
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class TrackerMetrics:
+    """Inference latency and detection counts of one MediaPipe tracker."""
+    def __init__(self, metrics, tracker):
+        self.latency = metrics.histogram("motion_inference_seconds",
+                                         "MediaPipe process() time per frame.", tracker=tracker)
+        self.frames = metrics.counter("motion_tracker_frames_total",
+                                      "Frames given to the tracker.", tracker=tracker)
+        self.hits = metrics.counter("motion_tracker_detections_total",
+                                    "Frames in which the tracker found a hand or body.", tracker=tracker)
+
+    def observe(self, seconds, detected):
+        self.latency.observe(seconds)
+        self.frames.value += 1
+        if detected:
+            self.hits.value += 1
+
+
+def resident_memory_bytes():
+    """Resident set size of this process, or None when it cannot be read."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class _Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = _Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(int(value))
+
+
+class Metrics:
+    """Metric families of one game, rendered as Prometheus text on demand."""
+    def __init__(self, game):
+        self.game = game
+        self._families = {}  # name -> [type, help, [(labels, source, value_label)]], in registration order
+        self._server = None
+        self._failed = set()
+        started = time.time()
+        self.gauge("motion_start_time_seconds", "Unix time the game started.", lambda: started)
+        self.gauge("motion_resident_memory_bytes", "Resident memory of the game process.", resident_memory_bytes)
+
+    # --- Registration (main thread, at setup) ---
+    def _add(self, name, kind, help_text, labels, source, value_label=None):
+        family = self._families.setdefault(name, [kind, help_text, []])
+        family[2].append((dict(labels, game=self.game), source, value_label))
+        return source
+
+    def counter(self, name, help_text, **labels):
+        """A Counter the game increments; name should end in _total."""
+        return self._add(name, "counter", help_text, labels, Counter())
+
+    def histogram(self, name, help_text, bounds=LATENCY_BUCKETS, **labels):
+        return self._add(name, "histogram", help_text, labels, Histogram(bounds))
+
+    def gauge(self, name, help_text, read, kind="gauge", value_label=None, **labels):
+        """A value read at scrape time by read() on the server thread (kind="counter" for running totals).
+
+        With value_label, read() returns {label value: value} and each entry
+        becomes one sample.
+        """
+        return self._add(name, kind, help_text, labels, read, value_label)
+
+    def tracker(self, name):
+        return TrackerMetrics(self, name)
+
+    # --- Common sources ---
+    def watch_clock(self, clock):
+        self.gauge("motion_fps", "Frame rate averaged by pygame over the last ten frames.", clock.get_fps)
+
+    def watch_state(self, read):
+        """Current scene as motion_game_state{state="..."} 1."""
+        self.gauge("motion_game_state", "Current game state (1 for the active one).",
+                   lambda: {str(read()): 1}, value_label="state")
+
+    def watch_camera(self, camera):
+        fields = [
+            ("reconnects", "motion_camera_reconnects_total", "counter", "Camera reconnections after an outage."),
+            ("failed_reads", "motion_camera_failed_reads_total", "counter", "Camera reads that returned no frame."),
+            ("frames", "motion_camera_frames_total", "counter", "Frames read from the camera."),
+            ("downtime_seconds", "motion_camera_downtime_seconds_total", "counter",
+             "Seconds the camera has been unavailable."),
+            ("delivered_fps", "motion_camera_delivered_fps", "gauge",
+             "Frames per second delivered by the camera since it connected."),
+        ]
+        for field, name, kind, help_text in fields:
+            self.gauge(name, help_text, lambda field=field: camera.metrics()[field], kind=kind)
+        self.gauge("motion_camera_connected", "1 while the camera is delivering frames.",
+                   lambda: camera.connected)
+
+    def watch_compositor(self, compositor):
+        self.gauge("motion_cache_hits_total", "Lookups served from a cache.",
+                   lambda: compositor.text_hits, kind="counter", cache="text")
+        self.gauge("motion_cache_misses_total", "Lookups that had to build the entry.",
+                   lambda: compositor.text_misses, kind="counter", cache="text")
+        self.gauge("motion_cache_hits_total", "Lookups served from a cache.",
+                   lambda: compositor.layer_hits, kind="counter", cache="layer")
+        self.gauge("motion_cache_misses_total", "Lookups that had to build the entry.",
+                   lambda: compositor.layer_builds, kind="counter", cache="layer")
+
+    def watch_sounds(self, bank):
+        self.gauge("motion_cache_hits_total", "Lookups served from a cache.",
+                   lambda: bank.disk_hits, kind="counter", cache="sound_pcm")
+        self.gauge("motion_cache_misses_total", "Lookups that had to build the entry.",
+                   lambda: bank.decodes, kind="counter", cache="sound_pcm")
+
+    def watch_governor(self, governor):
+        self.gauge("motion_quality_level", "Quality governor level (0 is the highest quality).",
+                   lambda: governor.level)
+
+    def watch_game(self, clock, state, camera, compositor, sounds, governor):
+        """Everything the games have in common; state() returns the current scene name."""
+        self.watch_clock(clock)
+        self.watch_state(state)
+        self.watch_camera(camera)
+        self.watch_compositor(compositor)
+        self.watch_sounds(sounds)
+        self.watch_governor(governor)
+
+    # --- Rendering (server thread) ---
+    def _samples(self, name, labels, source, value_label):
+        if isinstance(source, Histogram):
+            counts = list(source.counts)  # one copy so the buckets agree with each other
+            total = 0
+            for bound, count in zip(source.bounds + (float("inf"),), counts):
+                total += count
+                yield f"{name}_bucket", dict(labels, le=_format_value(float(bound))), total
+            yield f"{name}_sum", labels, source.sum
+            yield f"{name}_count", labels, total
+        elif isinstance(source, Counter):
+            yield name, labels, source.value
+        else:
+            value = source()
+            if value_label is not None:
+                for label_value, v in value.items():
+                    yield name, dict(labels, **{value_label: label_value}), v
+            elif value is not None:
+                yield name, labels, value
+
+    def render(self):
+        lines = []
+        for name, (kind, help_text, series) in list(self._families.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, source, value_label in series:
+                try:
+                    for sample, sample_labels, value in self._samples(name, labels, source, value_label):
+                        lines.append(f"{sample}{_format_labels(sample_labels)} {_format_value(value)}")
+                except Exception as e:
+                    # A collector failing must not break the scrape (or the game)
+                    if name not in self._failed:
+                        self._failed.add(name)
+                        print(f"Warning: metric {name} could not be read: {e}")
+        return "\n".join(lines) + "\n"
+
+    # --- Server ---
+    def serve(self, port):
+        """Serve /metrics on 127.0.0.1:port from a daemon thread; False if the port is taken."""
+        try:
+            server = HTTPServer((HOST, port), _Handler)
+        except OSError as e:
+            print(f"Warning: metrics endpoint unavailable on port {port} ({e}).")
+            return False
+        server.metrics = self
+        self._server = server
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.5},
+                         name="metrics-server", daemon=True).start()
+        print(f"[{self.game}] metrics on http://{HOST}:{port}/metrics")
+        return True
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the console
+
+
+def start(game, port=None):
+    """Metrics for this game, served only when MOTION_METRICS_PORT (or port) is set."""
+    metrics = Metrics(game)
+    port = port or int(os.environ.get("MOTION_METRICS_PORT", "0") or 0)
+    if port:
+        metrics.serve(port)
+    return metrics
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""Shared filesystem locations for the games."""
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("MOTION_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+
+
+def cache_path(*parts):
+    """Return a path inside the per-machine cache directory, creating parent folders."""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Per-machine performance profile written by calibrate.py and read by every game at startup.
+
+A profile is one of the presets below, chosen from measurements taken on the
+kiosk itself. ``quality_level`` is the QualityGovernor level the games start
+at, so the inference width, model complexity and effect limits of a preset
+are the governor's knobs at that level.
+
+If no profile exists yet the first game launched runs the calibration. Force a
+preset with MOTION_PERF_PRESET=low/medium/high, or recalibrate with
+``python calibrate.py``.
+"""
+import json
+import os
+import time
+
+from governor import QUALITY_LEVELS
+from paths import cache_path
+
+PROFILE_FILE = "perf_profile.json"
+DEFAULT_PRESET = "medium"
+
+PRESETS = {
+    "high": {
+        "fps": 60,                 # GAME.py and pingpong.py
+        "medicine_fps": 30,
+        # Smallest capture the trackers need; the camera negotiates the cheapest mode at least this large
+        "capture_size": (640, 480),
+        "tracking_confidence": 0.5,
+        "quality_level": 0,
+    },
+    "medium": {
+        "fps": 60,
+        "medicine_fps": 30,
+        "capture_size": (640, 480),
+        "tracking_confidence": 0.5,
+        "quality_level": 2,
+    },
+    "low": {
+        "fps": 30,
+        "medicine_fps": 24,
+        "capture_size": (640, 480),
+        # Lower tracking confidence keeps the tracker running between frames
+        # instead of falling back to the more expensive palm/person detection
+        "tracking_confidence": 0.4,
+        "quality_level": 7,
+    },
+}
+PRESET_ORDER = ["high", "medium", "low"]
+
+
+def preset_settings(name):
+    """Concrete settings of a preset, including the governor knobs of its quality level."""
+    settings = dict(PRESETS[name])
+    settings.update(QUALITY_LEVELS[settings["quality_level"]])
+    settings["preset"] = name
+    return settings
+
+
+def save_profile(preset, measurements):
+    """Write the chosen preset and the measurements behind it; returns the settings."""
+    settings = preset_settings(preset)
+    profile = {
+        "preset": preset,
+        "calibrated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "measurements": measurements,
+        "settings": settings,
+    }
+    with open(cache_path(PROFILE_FILE), "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+    return settings
+
+
+def read_profile():
+    """The saved profile dict, or None when the machine has not been calibrated."""
+    try:
+        with open(cache_path(PROFILE_FILE), encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return profile if profile.get("preset") in PRESETS else None
+
+
+def load_profile(calibrate_if_missing=True):
+    """Settings for this machine: forced preset, saved profile, first-launch calibration, or the default."""
+    forced = os.environ.get("MOTION_PERF_PRESET")
+    if forced:
+        if forced in PRESETS:
+            return preset_settings(forced)
+        print(f"Warning: unknown MOTION_PERF_PRESET '{forced}', expected one of {PRESET_ORDER}")
+
+    profile = read_profile()
+    if profile is None and calibrate_if_missing:
+        print("No performance profile yet, calibrating this machine (python calibrate.py to redo)...")
+        try:
+            import calibrate
+            return calibrate.run()
+        except Exception as e:
+            print(f"Warning: calibration failed ({e}), using the '{DEFAULT_PRESET}' preset.")
+    if profile is None:
+        return preset_settings(DEFAULT_PRESET)
+    # Presets may have been tuned since the profile was written; the preset name decides
+    return preset_settings(profile["preset"])
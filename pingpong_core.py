@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""乒乓球游戏的无界面模拟：球、球拍、障碍物、血量和游戏状态机。
+
+``PingpongCore.step(dt, landmarks, events)`` 推进一帧。landmarks 是当前状态所用检测器
+（``tracker``：介绍界面为手部，游戏中为姿势）输出的归一化 (x, y) 关键点，未检测到时为
+None；events 是已换算到逻辑坐标的 pygame 事件（只处理弹窗按钮的点击）。球每帧移动一步，
+dt（秒）驱动按钮停留和倒计时。音效记录在 ``effects`` 中由调用方播放，因此不需要窗口、
+摄像头或声卡。
+"""
+import random
+
+import pygame
+
+# 逻辑画布与球桌
+SCREEN_WIDTH = 1200
+SCREEN_HEIGHT = 800
+TABLE_TOP = 0
+TABLE_BOTTOM = SCREEN_HEIGHT
+TABLE_LEFT = 100
+TABLE_RIGHT = SCREEN_WIDTH - 100
+# 检测结果是归一化坐标，按球桌区域换算
+CAM_WIDTH = TABLE_RIGHT - TABLE_LEFT
+CAM_HEIGHT = TABLE_BOTTOM - TABLE_TOP
+
+# 球拍、球和障碍物尺寸
+PADDLE_WIDTH = 250
+PADDLE_Y = SCREEN_HEIGHT - 300
+PADDLE_COLLISION_WIDTH = PADDLE_WIDTH - 40
+PADDLE_COLLISION_HEIGHT = 9
+BALL_SIZE = 40
+OBSTACLE_WIDTH = 120
+OBSTACLE_HEIGHT = 40
+OBSTACLE_HITS = 5
+
+# 游戏设置
+MAX_HEALTH = 5
+INITIAL_BALL_SPEED = 10
+MAX_BALL_SPEED = 20
+MAX_HISTORY = 5            # 残影数量
+WALL_FLASH_DURATION = 10   # 以下动画时长单位均为帧
+HIT_FEEDBACK_DURATION = 15
+HIT_ANIMATION = 10
+DESTROY_ANIMATION = 15
+DAMAGE_ANIMATION = 10
+VICTORY_SPARKLES = 50
+BUTTON_HOVER_SECONDS = 3   # 手需要在按钮上停留3秒
+COUNTDOWN_SECONDS = 3
+INTRO_OVERLAY_ALPHA = 180  # 介绍界面的暗化程度
+
+# 介绍界面的继续按钮和结束弹窗
+BUTTON_RECT = pygame.Rect(SCREEN_WIDTH//2 - 100, SCREEN_HEIGHT//2 + 100, 200, 60)
+POPUP_RECT = pygame.Rect((SCREEN_WIDTH - 400) // 2, (SCREEN_HEIGHT - 250) // 2, 400, 250)
+POPUP_BUTTON_RECT = pygame.Rect(POPUP_RECT.x + 150, POPUP_RECT.y + 180, 100, 40)
+
+WRIST = 0  # 手部关键点：手腕
+NOSE = 0   # 姿势关键点：鼻尖
+
+
+# 游戏状态
+class GameState:
+    INTRODUCTION = -1
+    COUNTDOWN = 0
+    PLAYING = 1
+    GAME_OVER = 2
+    VICTORY = 3
+
+
+STATE_NAMES = {value: name for name, value in vars(GameState).items() if name.isupper()}
+
+
+class Obstacle:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.width = OBSTACLE_WIDTH
+        self.height = OBSTACLE_HEIGHT
+        self.hits_remaining = OBSTACLE_HITS
+        self.hit_animation = 0
+        self.destroy_animation = 0
+
+    def get_rect(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+
+# 生成横向铺满的障碍物（固定高度距离顶部100像素）
+def generate_full_row_obstacles():
+    num_obstacles = SCREEN_WIDTH // OBSTACLE_WIDTH + 1
+    return [Obstacle(i * OBSTACLE_WIDTH, TABLE_TOP + 100) for i in range(num_obstacles)]
+
+
+class PingpongCore:
+    """介绍 -> 倒计时 -> 游戏 -> 失败/胜利弹窗，点击弹窗按钮回到介绍。"""
+    def __init__(self, particle_cap=VICTORY_SPARKLES, rng=None):
+        self.particle_cap = particle_cap  # 画质调节降低的胜利特效数量
+        self.rng = rng or random.Random()
+        self.time = 0.0
+        self.state = GameState.INTRODUCTION
+        self.paddle_x = (SCREEN_WIDTH - PADDLE_WIDTH) // 2
+        self.dark_overlay_alpha = INTRO_OVERLAY_ALPHA
+        self.hover_start = None      # 手进入继续按钮的时间
+        self.countdown_start = None
+        self.left_wall_flash = 0
+        self.right_wall_flash = 0
+        self.damage_animation = 0
+        self.hand_pos = None         # 本帧检测到的手腕/鼻尖位置（画布坐标）
+        self.head_pos = None
+        self.effects = []            # 本帧的音效："wall"、"lose"、"hit"、"obstacle"、"win"
+        self.reset()
+
+    def reset(self):
+        """重新开局：血量、得分、球、障碍物和特效"""
+        self.health = MAX_HEALTH
+        self.score = 0
+        self.serve()
+        self.obstacles = generate_full_row_obstacles()
+        self.ball_history = []
+        self.hit_feedback = []
+
+    def serve(self):
+        self.ball_x = SCREEN_WIDTH // 2
+        self.ball_y = SCREEN_HEIGHT // 2
+        self.ball_dx = INITIAL_BALL_SPEED * (1 if self.rng.random() > 0.5 else -1)
+        self.ball_dy = -INITIAL_BALL_SPEED
+
+    @property
+    def tracker(self):
+        """当前状态需要的检测器："hands"、"pose" 或 None"""
+        if self.state == GameState.INTRODUCTION:
+            return "hands"
+        if self.state == GameState.PLAYING:
+            return "pose"
+        return None
+
+    @property
+    def hover_progress(self):
+        """手停留在继续按钮上的进度 0..1，不在按钮上时为 None"""
+        if self.hover_start is None:
+            return None
+        return min(1.0, (self.time - self.hover_start) / BUTTON_HOVER_SECONDS)
+
+    @property
+    def countdown_remaining(self):
+        if self.countdown_start is None:
+            return COUNTDOWN_SECONDS
+        return max(0, COUNTDOWN_SECONDS - (self.time - self.countdown_start))
+
+    def animating(self):
+        """静态画面上是否还有逐帧变化的动画"""
+        return (self.left_wall_flash > 0 or self.right_wall_flash > 0 or self.damage_animation > 0
+                or any(o.destroy_animation > 0 or o.hit_animation > 0 for o in self.obstacles))
+
+    # --- 每帧更新 ---
+    def step(self, dt, landmarks=None, events=()):
+        self.time += dt
+        self.effects = []
+        self._tick_animations()
+        for event in events:
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                self.click(event.pos)
+
+        self.hand_pos = None
+        self.head_pos = None
+        if landmarks is not None:
+            self._track(landmarks)
+
+        if self.state == GameState.PLAYING and self.head_pos:
+            # 使用头部位置控制球拍，平滑移动并限制在球桌内
+            target_paddle_x = self.head_pos[0] - PADDLE_WIDTH // 2
+            self.paddle_x += (target_paddle_x - self.paddle_x) * 0.2
+            self.paddle_x = max(TABLE_LEFT, min(TABLE_RIGHT - PADDLE_WIDTH, self.paddle_x))
+
+        if self.state == GameState.INTRODUCTION:
+            self._update_introduction()
+        elif self.state == GameState.COUNTDOWN:
+            self._update_countdown()
+        elif self.state == GameState.PLAYING:
+            self._update_playing()
+
+    def _tick_animations(self):
+        # 上一帧已经画过的动画各减一帧
+        if self.left_wall_flash > 0:
+            self.left_wall_flash -= 1
+        if self.right_wall_flash > 0:
+            self.right_wall_flash -= 1
+        if self.damage_animation > 0:
+            self.damage_animation -= 1
+        for obstacle in self.obstacles:
+            if obstacle.hit_animation > 0:
+                obstacle.hit_animation -= 1
+            if obstacle.destroy_animation > 0:
+                obstacle.destroy_animation -= 1
+
+    def click(self, pos):
+        """弹窗按钮：回到介绍界面并重新开局"""
+        if self.state in (GameState.GAME_OVER, GameState.VICTORY) and POPUP_BUTTON_RECT.collidepoint(pos):
+            self.state = GameState.INTRODUCTION
+            self.reset()
+
+    def _track(self, landmarks):
+        # 画面未镜像，x 方向翻转后映射到球桌区域
+        if self.state == GameState.INTRODUCTION:
+            x, y = landmarks[WRIST]
+            wrist_x = int(x * CAM_WIDTH)
+            wrist_y = int(y * CAM_HEIGHT)
+            self.hand_pos = (TABLE_LEFT + CAM_WIDTH - wrist_x,
+                             TABLE_TOP + int(wrist_y * (TABLE_BOTTOM - TABLE_TOP) / CAM_HEIGHT))
+        elif self.state == GameState.PLAYING:
+            x, y = landmarks[NOSE]
+            self.head_pos = (TABLE_LEFT + CAM_WIDTH - int(x * CAM_WIDTH), int(y * CAM_HEIGHT))
+
+    def _update_introduction(self):
+        # 检测手部是否在按钮上
+        if self.hand_pos and BUTTON_RECT.collidepoint(self.hand_pos):
+            if self.hover_start is None:
+                self.hover_start = self.time
+            elif self.time - self.hover_start >= BUTTON_HOVER_SECONDS:
+                self.state = GameState.COUNTDOWN
+                self.countdown_start = self.time
+                self.hover_start = None
+        else:
+            self.hover_start = None
+
+    def _update_countdown(self):
+        if self.countdown_start is None:
+            self.countdown_start = self.time
+        elapsed = self.time - self.countdown_start
+        if elapsed < COUNTDOWN_SECONDS:
+            # 暗化程度从180逐渐变为0
+            self.dark_overlay_alpha = int(INTRO_OVERLAY_ALPHA * (1 - elapsed / COUNTDOWN_SECONDS))
+        else:
+            self.state = GameState.PLAYING
+            self.dark_overlay_alpha = 0  # 完全恢复亮度
+
+    def _update_playing(self):
+        self.ball_x += self.ball_dx
+        self.ball_y += self.ball_dy
+
+        self.ball_history.append((self.ball_x + BALL_SIZE//2, self.ball_y + BALL_SIZE//2))
+        if len(self.ball_history) > MAX_HISTORY:
+            self.ball_history.pop(0)
+
+        if self.ball_x <= TABLE_LEFT and self.ball_dx < 0:
+            self.ball_dx = -self.ball_dx
+            self.left_wall_flash = WALL_FLASH_DURATION
+            self.effects.append("wall")
+        elif self.ball_x >= TABLE_RIGHT - BALL_SIZE and self.ball_dx > 0:
+            self.ball_dx = -self.ball_dx
+            self.right_wall_flash = WALL_FLASH_DURATION
+            self.effects.append("wall")
+
+        # 球掉出下边界 - 扣血
+        if self.ball_y >= TABLE_BOTTOM:
+            self.health = max(0, self.health - 1)
+            self.damage_animation = DAMAGE_ANIMATION
+            self.serve()
+            self.ball_history = []
+            self.effects.append("lose")
+            if self.health <= 0:
+                self.state = GameState.GAME_OVER
+
+        # 球拍碰撞检测
+        paddle_collision_rect = pygame.Rect(
+            self.paddle_x + (PADDLE_WIDTH - PADDLE_COLLISION_WIDTH) // 2,
+            PADDLE_Y + 100,
+            PADDLE_COLLISION_WIDTH,
+            PADDLE_COLLISION_HEIGHT + 200
+        )
+        ball_rect = pygame.Rect(self.ball_x, self.ball_y, BALL_SIZE, BALL_SIZE)
+
+        if ball_rect.colliderect(paddle_collision_rect) and self.ball_dy > 0:
+            self.ball_dy = -self.ball_dy
+            self.score += 1
+            self.hit_feedback.append({
+                'x': self.ball_x + BALL_SIZE//2,
+                'y': self.ball_y + BALL_SIZE//2,
+                'timer': HIT_FEEDBACK_DURATION
+            })
+            # 根据击中位置调整反弹角度，并限制最大速度
+            hit_pos = (self.ball_x + BALL_SIZE/2) - (self.paddle_x + PADDLE_WIDTH/2)
+            self.ball_dx = max(-MAX_BALL_SPEED, min(MAX_BALL_SPEED, hit_pos * 0.15))
+            self.ball_dy = max(-MAX_BALL_SPEED, min(MAX_BALL_SPEED, self.ball_dy))
+            self.effects.append("hit")
+
+        # 障碍物碰撞检测与解析
+        ball_rect = pygame.Rect(self.ball_x, self.ball_y, BALL_SIZE, BALL_SIZE)
+        obstacle_destroyed = False
+        for obstacle in self.obstacles:
+            if obstacle.destroy_animation > 0:
+                continue
+            obstacle_rect = obstacle.get_rect()
+            if not ball_rect.colliderect(obstacle_rect):
+                continue
+            # 计算重叠深度，沿穿透最小的轴将球推出
+            delta_x = ball_rect.centerx - obstacle_rect.centerx
+            delta_y = ball_rect.centery - obstacle_rect.centery
+            overlap_x = ball_rect.width / 2 + obstacle_rect.width / 2 - abs(delta_x)
+            overlap_y = ball_rect.height / 2 + obstacle_rect.height / 2 - abs(delta_y)
+            if overlap_x < overlap_y:
+                # 水平碰撞
+                self.ball_dx = -self.ball_dx
+                self.ball_x += overlap_x if delta_x > 0 else -overlap_x
+            else:
+                # 垂直碰撞
+                self.ball_dy = -self.ball_dy
+                self.ball_y += overlap_y if delta_y > 0 else -overlap_y
+
+            obstacle.hits_remaining -= 1
+            obstacle.hit_animation = HIT_ANIMATION
+            if obstacle.hits_remaining <= 0:
+                obstacle_destroyed = True
+                obstacle.destroy_animation = DESTROY_ANIMATION  # 触发销毁动画
+                self.effects.append("obstacle")
+            self.effects.append("obstacle")
+            self.hit_feedback.append({
+                'x': ball_rect.centerx,
+                'y': ball_rect.centery,
+                'timer': HIT_FEEDBACK_DURATION
+            })
+            break  # 每帧只处理一次碰撞，防止重复解析
+
+        # 移除已完成销毁动画的障碍物
+        self.obstacles = [obs for obs in self.obstacles if obs.hits_remaining > 0 or obs.destroy_animation > 0]
+
+        # 胜利条件：打破任意一个障碍物
+        if obstacle_destroyed:
+            self.state = GameState.VICTORY
+            self.effects.append("win")
+            for _ in range(min(VICTORY_SPARKLES, self.particle_cap)):
+                self.hit_feedback.append({
+                    'x': self.rng.randint(0, SCREEN_WIDTH),
+                    'y': self.rng.randint(0, SCREEN_HEIGHT),
+                    'timer': self.rng.randint(20, 40),
+                    'color': (self.rng.randint(200, 255), self.rng.randint(200, 255), 0)
+                })
+
+        # 更新击打反馈效果
+        for feedback in self.hit_feedback:
+            feedback['timer'] -= 1
+        self.hit_feedback = [f for f in self.hit_feedback if f['timer'] > 0]
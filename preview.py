@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Shared camera stage: the downscaled inference frame and the corner preview built from it.
+
+The camera frame is downscaled and converted to RGB once per frame by
+``inference_frame()``; that same array is fed to MediaPipe and, at a lower
+rate, to ``CameraPreview``. The preview resizes it straight into a numpy buffer
+that a pygame Surface shares, so refreshing the thumbnail allocates nothing and
+blitting it needs no conversion.
+"""
+import time
+
+import cv2
+import numpy as np
+import pygame
+
+# Width of the frame handed to the trackers; MediaPipe works on normalised
+# coordinates and resizes internally, so larger frames only cost conversion time
+INFERENCE_WIDTH = 640
+PREVIEW_INTERVAL = 1 / 15
+
+
+def inference_frame(frame, width=INFERENCE_WIDTH, mirror=False):
+    """Downscale a BGR camera frame to at most width pixels wide and return it as RGB."""
+    h, w = frame.shape[:2]
+    if w > width:
+        frame = cv2.resize(frame, (width, int(h * width / w)), interpolation=cv2.INTER_AREA)
+    if mirror:
+        frame = cv2.flip(frame, 1)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+class CameraPreview:
+    """Corner thumbnail of the camera feed with a landmark overlay drawn at thumbnail size."""
+    def __init__(self, size=(200, 150), interval=PREVIEW_INTERVAL, mirror=False):
+        self.size = size
+        self.interval = interval
+        self.mirror = mirror  # mirror the image (and landmarks) for display
+        self._rgb = np.zeros((size[1], size[0], 3), np.uint8)
+        # The Surface shares the numpy buffer, writing into _rgb updates it in place
+        self.surface = pygame.image.frombuffer(self._rgb, size, "RGB")
+        self.ready = False
+        self._last_update = None
+
+    def due(self, now=None):
+        """Whether the preview interval has elapsed since the last refresh."""
+        now = time.perf_counter() if now is None else now
+        return self._last_update is None or now - self._last_update >= self.interval
+
+    def update(self, rgb_frame, landmarks=None, connections=(), color=(0, 255, 0), markers=(), now=None):
+        """Refresh the thumbnail from an RGB frame.
+
+        landmarks is a sequence of normalised (x, y) points in frame coordinates,
+        connections the index pairs to join (e.g. mp_hands.HAND_CONNECTIONS), and
+        markers extra (x, y, rgb_color) dots drawn on top.
+        """
+        self._last_update = time.perf_counter() if now is None else now
+        cv2.resize(rgb_frame, self.size, dst=self._rgb, interpolation=cv2.INTER_LINEAR)
+        if self.mirror:
+            cv2.flip(self._rgb, 1, dst=self._rgb)
+        if landmarks:
+            points = [self._to_pixel(x, y) for x, y in landmarks]
+            for start, end in connections:
+                cv2.line(self._rgb, points[start], points[end], color, 1)
+            for point in points:
+                cv2.circle(self._rgb, point, 1, (255, 0, 0), -1)
+        for x, y, marker_color in markers:
+            cv2.circle(self._rgb, self._to_pixel(x, y), 4, marker_color, -1)
+        self.ready = True
+
+    def clear(self):
+        """Blank the thumbnail (e.g. while the camera is unavailable)."""
+        self._rgb[:] = 0
+        self.ready = False
+
+    def _to_pixel(self, x, y):
+        if self.mirror:
+            x = 1.0 - x
+        return int(x * self.size[0]), int(y * self.size[1])
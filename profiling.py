@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""On-demand sampling profiler for a live game, split by game state.
+
+Press F4 (or send SIGUSR1; Ctrl+Break on a Windows console) and a background
+thread samples the game loop's Python stack SAMPLE_HZ times a second for
+MOTION_PROFILE_SECONDS (default 10). Each sample is tagged with the game's
+current state ("loading"/"transition"/"playing", pingpong's GameState,
+medicine's welcome/learning/test). Sampling only reads the main thread's
+frame, so the loop itself runs unchanged; the cost is one stack walk per
+sample on the profiler thread.
+
+Results are written as folded stacks (one "frame;frame;frame count" line per
+distinct stack), read by flamegraph.pl, inferno and speedscope:
+.cache/profiles/<game>-<time>-<state>.folded per state, plus
+<game>-<time>.folded with the state as the root frame.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import pygame
+
+from paths import cache_path
+
+SAMPLE_HZ = 200
+DEFAULT_SECONDS = 10
+HOTKEY = pygame.K_F4
+
+
+def _frame_label(code):
+    # ';' separates frames in the folded format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _stack(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class StateProfiler:
+    """Samples the thread that created it while a capture is running."""
+    def __init__(self, name, state, seconds=None, rate=SAMPLE_HZ):
+        self.name = name
+        self.state = state  # returns the current state name; called from the sampling thread
+        self.seconds = seconds or float(os.environ.get("MOTION_PROFILE_SECONDS", DEFAULT_SECONDS))
+        self.interval = 1.0 / rate
+        self._target = threading.get_ident()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def handle_event(self, event):
+        """F4 starts a capture; returns True when the event was used."""
+        if event.type == pygame.KEYDOWN and event.key == HOTKEY:
+            self.start()
+            return True
+        return False
+
+    def install_signal(self):
+        """Start a capture on SIGUSR1 (POSIX) or SIGBREAK (Windows console), where available."""
+        signum = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+        if signum is not None and threading.current_thread() is threading.main_thread():
+            signal.signal(signum, lambda *args: self.start())
+
+    def start(self, seconds=None):
+        """Begin a capture in the background; ignored while one is running."""
+        if self.running:
+            return False
+        self._thread = threading.Thread(target=self._run, args=(seconds or self.seconds,),
+                                        name="state-profiler", daemon=True)
+        self._thread.start()
+        print(f"[{self.name}] profiling for {seconds or self.seconds:g} s...")
+        return True
+
+    def sample(self, counts):
+        frame = sys._current_frames().get(self._target)
+        if frame is None:
+            return False
+        try:
+            state = str(self.state())
+        except Exception:
+            state = "unknown"
+        counts[state][_stack(frame)] += 1
+        return True
+
+    def _run(self, seconds):
+        counts = defaultdict(Counter)  # state -> folded stack -> samples
+        deadline = time.perf_counter() + seconds
+        next_sample = time.perf_counter()
+        while next_sample < deadline:
+            if not self.sample(counts):
+                break  # the game loop has finished
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_sample = time.perf_counter()  # fell behind: don't burst to catch up
+        self.write(counts)
+
+    def write(self, counts):
+        """Write the folded stacks per state and combined; returns the paths."""
+        if not counts:
+            return []
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = []
+        combined = cache_path("profiles", f"{self.name}-{stamp}.folded")
+        try:
+            with open(combined, "w", encoding="utf-8") as all_states:
+                for state, stacks in counts.items():
+                    path = cache_path("profiles", f"{self.name}-{stamp}-{state}.folded")
+                    with open(path, "w", encoding="utf-8") as f:
+                        for stack, n in stacks.most_common():
+                            f.write(f"{stack} {n}\n")
+                            all_states.write(f"state:{state};{stack} {n}\n")
+                    paths.append(path)
+        except OSError as e:
+            print(f"Warning: could not write profile: {e}")
+            return paths
+        summary = ", ".join(f"{state} {sum(stacks.values())}" for state, stacks in counts.items())
+        print(f"[{self.name}] profile samples per state: {summary}; written to {combined}")
+        return [combined] + paths
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""Replay recorded sessions (landmark_log .mlog files) without a camera or a player.
+
+Two ways to replay, both deterministic for a given --seed:
+
+* ``check``: feeds each recording's landmarks, events and frame times straight
+  into the game's headless core, as fast as it will go. Each run gets a digest
+  of its per-frame states and effects; --save-baseline stores them and later
+  runs fail (exit code 1) when a recording no longer plays out the same way.
+  Hundreds of recordings take minutes.
+* ``play``: runs the real game script in this process, like soak.py, with the
+  camera, MediaPipe and the frame clock replaced by the recording: every
+  pipeline stage except inference runs and is timed by the frame timer. The
+  quality governor is pinned so the core sees the same particle caps every run.
+  Headless unless --window, and unthrottled unless --realtime.
+
+Usage: python replay.py check .cache/recordings [--seed 0] [--save-baseline]
+       python replay.py play .cache/recordings/pingpong-<time>.mlog [--realtime] [--window]
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+
+import numpy as np
+import pygame
+
+import camera
+import game_core
+import governor
+import landmark_log
+import medicine_core
+import pingpong_core
+from paths import BASE_DIR, cache_path
+from script_runner import run_script
+
+SCRIPTS = {"GAME": "GAME.py", "pingpong": "pingpong.py", "medicine": "medicine.py"}
+
+
+# --- Cores: how each game's core is built, named and fed ---
+def _game_core(rng):
+    return game_core.ShootingCore(rng=rng)
+
+
+def _pingpong_core(rng):
+    return pingpong_core.PingpongCore(rng=rng)
+
+
+def _medicine_core(rng):
+    return medicine_core.MedicineCore(rng=rng)
+
+
+# game -> (core factory, state name, stream the core is reading)
+CORES = {
+    "GAME": (_game_core, lambda core: core.state, lambda core: "hands"),
+    "pingpong": (_pingpong_core, lambda core: pingpong_core.STATE_NAMES[core.state], lambda core: core.tracker),
+    "medicine": (_medicine_core, lambda core: core.scene, lambda core: "hands"),
+}
+
+
+def points_list(points):
+    return None if points is None else [tuple(point) for point in points.tolist()]
+
+
+def check(path, seed):
+    """Replay one recording through its core; returns the run's summary."""
+    with landmark_log.LandmarkLog(path) as log:
+        game = log.header["game"]
+        make_core, state_of, stream_of = CORES[game]
+        core = make_core(random.Random(seed))
+        digest = hashlib.sha1()
+        step_times = []
+        effects = {}
+        first_divergence = None
+        for n, frame in enumerate(log):
+            state = state_of(core)
+            if first_divergence is None and state != frame["state"]:
+                first_divergence = {"frame": n, "recorded": frame["state"], "replayed": state}
+            stream = stream_of(core)
+            landmarks = points_list(frame[stream][0]) if stream in frame else None
+            events = [landmark_log.decode_event(event) for event in frame["events"]]
+
+            start = time.perf_counter()
+            core.step(frame["dt"], landmarks, events)
+            step_times.append(time.perf_counter() - start)
+
+            digest.update(f"{state}|{','.join(core.effects)}\n".encode("utf-8"))
+            for effect in core.effects:
+                effects[effect] = effects.get(effect, 0) + 1
+        frames = len(log)
+    step_us = np.array(step_times) * 1e6
+    return {
+        "game": game,
+        "frames": frames,
+        "final_state": state_of(core),
+        "digest": digest.hexdigest(),
+        "effects": effects,
+        # Live sessions are not seeded, so random-dependent play may differ from the recording
+        "first_divergence": first_divergence,
+        "step_mean_us": round(float(step_us.mean()), 2) if frames else 0.0,
+        "step_p95_us": round(float(np.percentile(step_us, 95)), 2) if frames else 0.0,
+    }
+
+
+# --- play: the game script driven by a recording ---
+class ReplaySession:
+    """Cursor over a recording shared by the replay camera, trackers and clock."""
+    def __init__(self, path):
+        self.log = landmark_log.LandmarkLog(path)
+        self.index = -1
+        self.frame = None
+        self.dt = 0.0
+        self.finished = False
+
+    def advance(self):
+        """Move to the next frame and post its events; posts QUIT after the last one."""
+        self.index += 1
+        if self.index >= len(self.log):
+            if not self.finished:
+                self.finished = True
+                pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return
+        self.frame = self.log.frame(self.index)
+        self.dt = self.frame["dt"]
+        for event in self.frame["events"]:
+            pygame.event.post(landmark_log.decode_event(event))
+
+    def landmarks(self, stream):
+        if self.frame is None or self.finished:
+            return None, None
+        return self.frame.get(stream, (None, None))
+
+
+class ReplayCamera:
+    """Stand-in for CameraSupervisor: a black frame per read; the landmarks come from the trackers."""
+    def __init__(self, index=0, min_size=camera.TRACKER_MIN_SIZE, min_fps=None, name="replay camera", **kwargs):
+        self.name = name
+        self.size = tuple(min_size)
+        self._frame = np.zeros((self.size[1], self.size[0], 3), np.uint8)
+        self.frames = 0
+        self.state = "connected"
+        self.connected = True
+
+    def read(self):
+        self.frames += 1
+        return self._frame.copy()  # a real camera hands out a new buffer every read
+
+    def get(self, prop):
+        return 0.0
+
+    def metrics(self):
+        return {
+            "state": self.state,
+            "mode": {"fourcc": "RPLY", "width": self.size[0], "height": self.size[1], "fps": 0.0},
+            "delivered_fps": 0.0,
+            "frames": self.frames,
+            "reconnects": 0,
+            "failed_reads": 0,
+            "open_attempts": 0,
+            "downtime_seconds": 0.0,
+            "current_outage_seconds": 0.0,
+        }
+
+    def release(self):
+        pass
+
+
+class ReplayTracker:
+    """Stand-in for mp.solutions.hands.Hands / pose.Pose returning the recorded landmarks."""
+    def __init__(self, session, stream):
+        self.session = session
+        self.stream = stream
+
+    def process(self, rgb):
+        points, confidence = self.session.landmarks(self.stream)
+        score = 1.0 if confidence is None else confidence
+        landmarks = None
+        if points is not None:
+            landmarks = types.SimpleNamespace(landmark=[
+                types.SimpleNamespace(x=float(x), y=float(y), z=0.0, visibility=score) for x, y in points])
+        if self.stream == "pose":
+            return types.SimpleNamespace(pose_landmarks=landmarks)
+        handedness = [types.SimpleNamespace(classification=[types.SimpleNamespace(score=score)])]
+        return types.SimpleNamespace(multi_hand_landmarks=[landmarks] if landmarks else None,
+                                     multi_handedness=handedness if landmarks else None)
+
+    def close(self):
+        pass
+
+
+class ReplayClock:
+    """Stand-in for pygame.time.Clock: get_time() is the recorded frame time; tick() moves to the next frame."""
+    def __init__(self, session, throttle, clock_type=pygame.time.Clock):
+        self.session = session
+        self.throttle = throttle
+        self._clock = clock_type()  # measures the real frame for get_rawtime() and get_fps()
+        self.session.advance()  # the first frame's events are read by the first event loop
+
+    def tick(self, framerate=0):
+        self._clock.tick(framerate if self.throttle else 0)
+        self.session.advance()
+        return self.get_time()
+
+    def get_time(self):
+        return self.session.dt * 1000
+
+    def get_rawtime(self):
+        return self._clock.get_rawtime()
+
+    def get_fps(self):
+        return self._clock.get_fps()
+
+
+class PinnedGovernor(governor.QualityGovernor):
+    """Quality governor that never changes level, so replays do not depend on the machine's speed."""
+    def frame(self, frame_ms):
+        self._times.append(frame_ms)
+        return False
+
+
+def _run_unless_game(run, args, *rest, **kwargs):
+    if isinstance(args, list) and args[:1] == [sys.executable]:
+        print(f"[replay] not launching {os.path.basename(args[-1])}")
+        return subprocess.CompletedProcess(args, 0)
+    return run(args, *rest, **kwargs)
+
+
+def play(path, seed, throttle, window):
+    """Run the recording's game script in this process with the replay stand-ins."""
+    import mediapipe as mp
+
+    session = ReplaySession(path)
+    game = session.log.header["game"]
+    script = os.path.join(BASE_DIR, SCRIPTS[game])
+    rng = random.Random(seed)
+
+    pygame.time.Clock = lambda: ReplayClock(session, throttle)
+    os.environ.pop("MOTION_CAMERA", None)  # open_camera() then builds the (replaced) CameraSupervisor
+    camera.CameraSupervisor = ReplayCamera
+    mp.solutions.hands.Hands = lambda **kwargs: ReplayTracker(session, "hands")
+    mp.solutions.pose.Pose = lambda **kwargs: ReplayTracker(session, "pose")
+    governor.QualityGovernor = PinnedGovernor
+    game_core.ShootingCore = functools.partial(game_core.ShootingCore, rng=rng)
+    pingpong_core.PingpongCore = functools.partial(pingpong_core.PingpongCore, rng=rng)
+    medicine_core.MedicineCore = functools.partial(medicine_core.MedicineCore, rng=rng)
+    # GAME.py launches the chosen game when a round is won; a replay stops there
+    subprocess.run = functools.partial(_run_unless_game, subprocess.run)
+
+    start = time.perf_counter()
+    run_script(script, window)
+    elapsed = time.perf_counter() - start
+    frames = min(session.index, len(session.log))
+    print(f"[replay] {game}: {frames} frames in {elapsed:.1f} s ({frames / max(elapsed, 1e-9):.0f} fps)")
+    session.log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    check_parser = sub.add_parser("check", help="replay recordings through the headless cores")
+    check_parser.add_argument("recordings", nargs="+", help=".mlog files or folders of them")
+    check_parser.add_argument("--seed", type=int, default=0)
+    check_parser.add_argument("--baseline", default=None, help="baseline JSON (default .cache/replay/baseline.json)")
+    check_parser.add_argument("--save-baseline", action="store_true", help="store these digests as the baseline")
+    play_parser = sub.add_parser("play", help="run a game script from a recording")
+    play_parser.add_argument("recording")
+    play_parser.add_argument("--seed", type=int, default=0)
+    play_parser.add_argument("--realtime", action="store_true", help="keep the game's frame rate (clock.tick)")
+    play_parser.add_argument("--window", action="store_true", help="show the game instead of rendering off-screen")
+    args = parser.parse_args()
+
+    if args.command == "play":
+        play(args.recording, args.seed, args.realtime, args.window)
+        return 0
+
+    baseline_path = args.baseline or cache_path("replay", "baseline.json")
+    baseline = {}
+    if not args.save_baseline and os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("seed") != args.seed:
+            print(f"Warning: the baseline was replayed with seed {baseline.get('seed')}, not {args.seed}.")
+
+    results = {}
+    failures = []
+    start = time.perf_counter()
+    for path in landmark_log.find_recordings(args.recordings):
+        name = os.path.basename(path)
+        try:
+            result = check(path, args.seed)
+        except Exception as e:
+            failures.append(f"{name}: replay failed: {e!r}")
+            continue
+        results[name] = result
+        expected = baseline.get("results", {}).get(name)
+        changed = expected is not None and expected["digest"] != result["digest"]
+        if changed:
+            failures.append(f"{name}: plays out differently from the baseline "
+                            f"(final state {expected['final_state']} -> {result['final_state']})")
+        print(f"  {name:<40} {result['frames']:7d} frames  {result['final_state']:<14} "
+              f"step {result['step_mean_us']:8.1f} us (p95 {result['step_p95_us']:.1f})"
+              + ("  CHANGED" if changed else ""))
+    elapsed = time.perf_counter() - start
+    frames = sum(result["frames"] for result in results.values())
+    print(f"[replay] {len(results)} recordings, {frames} frames in {elapsed:.1f} s")
+
+    report = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "seed": args.seed, "results": results,
+              "failures": failures}
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"baseline saved to {baseline_path}")
+    elif not baseline:
+        print(f"No baseline at {baseline_path}; run with --save-baseline to store one.")
+    path = cache_path("replay", f"check-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"results written to {path}")
+    for failure in failures:
+        print(f"  FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
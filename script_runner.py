@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Run a game script inside a tool's process, such as soak.py.
+
+The tool first replaces what it needs (camera, trackers, clock) and then calls
+run_script(), which sets up what every such run needs: the games' folder as the
+working directory, off-screen SDL drivers unless a window is wanted, and the
+medium preset when this machine has no profile yet (calibrating against a
+stand-in camera would store meaningless numbers).
+"""
+import os
+import runpy
+import sys
+
+from paths import BASE_DIR
+from perf_profile import read_profile
+
+
+def run_script(script, window=False):
+    """Run script (relative to the games' folder) as __main__ until it returns or calls sys.exit()."""
+    os.chdir(BASE_DIR)
+    if not window:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    if read_profile() is None:
+        os.environ.setdefault("MOTION_PERF_PRESET", "medium")
+    sys.argv = [script]
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit:
+        pass  # pingpong.py and medicine.py end with sys.exit()
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""Therapist reports from recorded sessions (landmark_log .mlog files).
+
+For each recording and landmark stream, the point the game is steered with is
+followed (GAME: index fingertip, pingpong and medicine: wrist, pose: nose):
+
+  active      time the point was tracked
+  movements   movement onsets: speed (averaged over a few samples) rising
+              above MOVE_START frame widths/s, ending when it falls below
+              MOVE_STOP or tracking drops
+  reach       horizontal and vertical range covered (5th to 95th percentile,
+              in frame widths and heights)
+  speed       mean speed while moving
+  reaction    time from each state change (a new round or screen) to the
+              next movement onset, if one starts within REACTION_WINDOW; only
+              state changes the point was tracked and still for READY_BEFORE
+              ahead of count (pingpong only starts tracking pose at PLAYING)
+
+Recordings are shared out to a pool of worker processes, largest first. Each
+worker walks its file one chunk at a time through the memory map, so a
+recording larger than RAM is never loaded whole, and computes each chunk's
+metrics with NumPy over the whole chunk, carrying only the last sample and the
+movement state to the next. Per-session rows are merged into a summary per ISO
+week, game and stream (reach from the summed histograms, reaction medians from
+all reactions).
+
+Usage: python session_report.py [.cache/recordings ...] [--workers N] [--since 2026-10-01] [--until 2026-10-08]
+Writes .cache/reports/sessions-<time>.csv and .cache/reports/summary-<time>.csv.
+"""
+import argparse
+import csv
+import datetime
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import landmark_log
+from paths import cache_path
+
+# Landmark each game steers with, per stream (MediaPipe indices)
+STEERING = {"GAME": {"hands": 8}}             # index fingertip
+DEFAULT_STEERING = {"hands": 0, "pose": 0}    # wrist, nose
+MOVE_START = 0.3        # frame widths per second, averaged over SMOOTHING samples
+MOVE_STOP = 0.12
+SMOOTHING = 3           # a one-frame tracking jump is not a movement
+MAX_GAP = 0.25          # seconds between tracked samples before a movement is cut
+REACTION_WINDOW = 3.0   # seconds after a state change to count a movement as its reaction
+READY_BEFORE = 0.5      # seconds tracked before a state change for it to time a reaction
+BINS = 500              # reach histogram bins over 0..1
+
+SESSION_FIELDS = ("recording", "game", "date", "week", "stream", "duration_min", "active_min", "movements",
+                  "movements_per_min", "reach_x", "reach_y", "mean_speed", "reactions", "reaction_median_ms",
+                  "dropped_frames")
+SUMMARY_FIELDS = ("week", "game", "stream", "sessions", "active_min", "movements", "movements_per_min",
+                  "reach_x", "reach_y", "reactions", "reaction_median_ms", "reaction_p90_ms")
+
+
+class StreamStats:
+    """Running metrics of one tracked point, fed a chunk at a time."""
+    def __init__(self, point):
+        self.point = point
+        self.last = None           # (time, x, y) of the previous tracked sample
+        self.moving = False
+        self.recent = np.zeros(SMOOTHING - 1)  # last raw speeds, for the moving average
+        self.samples = 0
+        self.active = 0.0
+        self.moving_time = 0.0
+        self.distance = 0.0
+        self.onsets = []
+        self.stops = []            # times movements ended
+        self.runs = []             # [first, last] sample time of each tracked run
+        self.hist_x = np.zeros(BINS, np.int64)
+        self.hist_y = np.zeros(BINS, np.int64)
+
+    def add(self, times, present, points):
+        t = times[present]
+        if not len(t):
+            return
+        xy = points[present, self.point].astype(np.float64)
+        self.samples += len(t)
+        self.hist_x += np.bincount(np.clip((xy[:, 0] * BINS).astype(np.int64), 0, BINS - 1), minlength=BINS)
+        self.hist_y += np.bincount(np.clip((xy[:, 1] * BINS).astype(np.int64), 0, BINS - 1), minlength=BINS)
+        if self.last is not None:
+            t = np.concatenate(([self.last[0]], t))
+            xy = np.concatenate(([self.last[1:]], xy))
+        else:
+            self.runs.append([float(t[0]), float(t[0])])
+        self.last = (t[-1], xy[-1, 0], xy[-1, 1])
+        if len(t) < 2:
+            return
+
+        dt = np.diff(t)
+        step = np.hypot(*np.diff(xy, axis=0).T)
+        valid = (dt > 0) & (dt <= MAX_GAP)
+        # A gap ends the current run; the sample after it starts the next one
+        gaps = np.flatnonzero(~valid)
+        run_start = np.concatenate(([self.runs[-1][0]], t[gaps + 1]))[np.cumsum(~valid)]  # per step
+        ends = np.append(t[gaps], t[-1])
+        self.runs[-1][1] = float(ends[0])
+        self.runs.extend([float(first), float(end)] for first, end in zip(t[gaps + 1], ends[1:]))
+        speed = np.divide(step, dt, out=np.zeros_like(step), where=valid)
+        window = np.concatenate((self.recent, speed))
+        self.recent = window[-(SMOOTHING - 1):]
+        speed = np.convolve(window, np.ones(SMOOTHING) / SMOOTHING, "valid")
+        # Hysteresis: start above MOVE_START, stop below MOVE_STOP or at a gap, else keep the previous state
+        level = np.full(len(speed), -1, np.int8)
+        level[speed >= MOVE_START] = 1
+        level[(speed <= MOVE_STOP) | ~valid] = 0
+        decided = np.where(level >= 0, np.arange(len(level)), -1)
+        np.maximum.accumulate(decided, out=decided)
+        moving = np.where(decided >= 0, level[decided] == 1, self.moving)
+        before = np.concatenate(([self.moving], moving[:-1]))
+        started = np.flatnonzero(moving & ~before)
+        # Dated from the start of the averaging window that crossed MOVE_START, but never before
+        # the run's first sample (the average starts from zeros there)
+        self.onsets.extend(np.maximum(t[1:][started] - SMOOTHING * dt[started], run_start[started]).tolist())
+        self.stops.extend(t[1:][np.flatnonzero(~moving & before)].tolist())
+        self.moving = bool(moving[-1])
+        self.active += float(dt[valid].sum())
+        self.distance += float(step[valid].sum())
+        self.moving_time += float(dt[valid & moving].sum())
+
+    def ready(self, stimuli):
+        """Which stimuli found the point tracked for READY_BEFORE and not moving."""
+        runs = np.asarray(self.runs)
+        run = np.searchsorted(runs[:, 0], stimuli, side="right") - 1
+        first, last = runs[np.maximum(run, 0)].T
+        tracked = (run >= 0) & (stimuli - first >= READY_BEFORE) & (last >= stimuli)
+        # Moving when the last onset before the stimulus is later than the last stop
+        last_onset = np.concatenate(([-np.inf], self.onsets))[np.searchsorted(self.onsets, stimuli, side="right")]
+        last_stop = np.concatenate(([-np.inf], self.stops))[np.searchsorted(self.stops, stimuli, side="right")]
+        return tracked & (last_onset <= last_stop)
+
+    def reactions(self, stimuli):
+        """Seconds from each ready stimulus to the first onset after it, when within the window and before the next stimulus."""
+        if not stimuli or not self.onsets:
+            return []
+        stimuli = np.asarray(stimuli)
+        onsets = np.asarray(self.onsets)
+        after = np.searchsorted(onsets, stimuli, side="left")
+        found = after < len(onsets)
+        delay = np.full(len(stimuli), np.inf)
+        delay[found] = onsets[after[found]] - stimuli[found]
+        following = np.append(stimuli[1:], np.inf)
+        keep = (delay <= REACTION_WINDOW) & (stimuli + delay < following) & self.ready(stimuli)
+        return delay[keep].tolist()
+
+
+def percentile_range(hist_x, hist_y, low=0.05, high=0.95):
+    """(x range, y range) between two percentiles of the reach histograms."""
+    ranges = []
+    for hist in (hist_x, hist_y):
+        total = hist.sum()
+        if not total:
+            ranges.append(0.0)
+            continue
+        cumulative = np.cumsum(hist)
+        lo = np.searchsorted(cumulative, low * total, side="left")
+        hi = np.searchsorted(cumulative, high * total, side="left")
+        ranges.append(float(hi - lo) / BINS)
+    return tuple(ranges)
+
+
+def analyse(path, since=None, until=None):
+    """Metrics of one recording: {"rows", "histograms", "reactions"}, or None when outside since/until."""
+    with landmark_log.LandmarkLog(path) as log:
+        game = log.header["game"]
+        created = datetime.datetime.fromtimestamp(log.header["created"])
+        if (since and created < since) or (until and created >= until):
+            return None
+        steering = {**DEFAULT_STEERING, **STEERING.get(game, {})}
+        stats = {name: StreamStats(steering[name]) for name in log.streams if name in steering}
+        stimuli = []
+        previous_state = None
+        first = last = None
+        for i in range(len(log.chunks)):
+            times, _, states, _, streams = log.chunk(i)
+            if first is None:
+                first = times[0]
+            last = times[-1]
+            changed = [j for j, state in enumerate(states)
+                       if state != (states[j - 1] if j else previous_state) and (j or previous_state is not None)]
+            stimuli.extend(times[changed].tolist())
+            previous_state = states[-1]
+            for name, stream_stats in stats.items():
+                present, _, points = streams[name]
+                stream_stats.add(times, present, points)
+        dropped = log.dropped
+
+    duration = 0.0 if first is None else float(last - first)
+    iso = created.isocalendar()
+    result = {"rows": [], "histograms": {}, "reactions": {}}
+    for name, stream_stats in stats.items():
+        if not stream_stats.samples:
+            continue
+        reactions = stream_stats.reactions(stimuli)
+        reach_x, reach_y = percentile_range(stream_stats.hist_x, stream_stats.hist_y)
+        active_min = stream_stats.active / 60
+        result["rows"].append({
+            "recording": os.path.basename(path), "game": game, "date": created.strftime("%Y-%m-%d %H:%M"),
+            "week": f"{iso[0]}-W{iso[1]:02d}", "stream": name,
+            "duration_min": round(duration / 60, 2), "active_min": round(active_min, 2),
+            "movements": len(stream_stats.onsets),
+            "movements_per_min": round(len(stream_stats.onsets) / active_min, 1) if active_min else 0.0,
+            "reach_x": round(reach_x, 3), "reach_y": round(reach_y, 3),
+            "mean_speed": round(stream_stats.distance / stream_stats.moving_time, 3) if stream_stats.moving_time else 0.0,
+            "reactions": len(reactions),
+            "reaction_median_ms": round(float(np.median(reactions)) * 1000) if reactions else "",
+            "dropped_frames": dropped,
+        })
+        result["histograms"][name] = (stream_stats.hist_x, stream_stats.hist_y)
+        result["reactions"][name] = reactions
+    return result
+
+
+def summarise(results):
+    """One row per (week, game, stream), merged from the sessions' rows, histograms and reactions."""
+    groups = {}
+    for result in results:
+        for row in result["rows"]:
+            key = (row["week"], row["game"], row["stream"])
+            group = groups.setdefault(key, {"sessions": 0, "active_min": 0.0, "movements": 0, "reactions": [],
+                                            "hist_x": np.zeros(BINS, np.int64), "hist_y": np.zeros(BINS, np.int64)})
+            group["sessions"] += 1
+            group["active_min"] += row["active_min"]
+            group["movements"] += row["movements"]
+            group["reactions"].extend(result["reactions"][row["stream"]])
+            hist_x, hist_y = result["histograms"][row["stream"]]
+            group["hist_x"] += hist_x
+            group["hist_y"] += hist_y
+    summary = []
+    for (week, game, stream), group in sorted(groups.items()):
+        reach_x, reach_y = percentile_range(group["hist_x"], group["hist_y"])
+        reactions = group["reactions"]
+        summary.append({
+            "week": week, "game": game, "stream": stream, "sessions": group["sessions"],
+            "active_min": round(group["active_min"], 1), "movements": group["movements"],
+            "movements_per_min": round(group["movements"] / group["active_min"], 1) if group["active_min"] else 0.0,
+            "reach_x": round(reach_x, 3), "reach_y": round(reach_y, 3), "reactions": len(reactions),
+            "reaction_median_ms": round(float(np.median(reactions)) * 1000) if reactions else "",
+            "reaction_p90_ms": round(float(np.percentile(reactions, 90)) * 1000) if reactions else "",
+        })
+    return summary
+
+
+def run(paths, workers, since=None, until=None):
+    """Analyse the recordings on a pool of worker processes (in this process when workers is 1)."""
+    paths = sorted(paths, key=os.path.getsize, reverse=True)  # largest first, so no worker is left with one at the end
+    results = []
+    failures = []
+    if workers <= 1:
+        for path in paths:
+            try:
+                result = analyse(path, since, until)
+            except Exception as e:
+                failures.append(f"{os.path.basename(path)}: {e!r}")
+                continue
+            if result is not None:
+                results.append(result)
+        return results, failures
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(analyse, path, since, until): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                failures.append(f"{os.path.basename(futures[future])}: {e!r}")
+                continue
+            if result is not None:
+                results.append(result)
+    return results, failures
+
+
+def write_csv(path, fields, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recordings", nargs="*", help=".mlog files or folders of them (default .cache/recordings)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--since", type=datetime.date.fromisoformat, default=None, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--until", type=datetime.date.fromisoformat, default=None, help="day after the last (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    since = args.since and datetime.datetime.combine(args.since, datetime.time())
+    until = args.until and datetime.datetime.combine(args.until, datetime.time())
+    paths = []
+    for path in landmark_log.find_recordings(args.recordings or [cache_path("recordings", "")]):
+        if os.path.isfile(path):
+            paths.append(path)
+        else:
+            print(f"Warning: {path} not found.")
+    if not paths:
+        print("No recordings found.")
+        return 1
+    start = time.perf_counter()
+    results, failures = run(paths, args.workers, since, until)
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"[report] {len(results)} of {len(paths)} recordings ({size / 1024 / 1024:.1f} MB) "
+          f"in {elapsed:.1f} s on {max(args.workers, 1)} worker(s)")
+
+    sessions = sorted((row for result in results for row in result["rows"]), key=lambda row: (row["date"], row["stream"]))
+    summary = summarise(results)
+    print(f"  {'week':<9} {'game':<9} {'stream':<6} {'sessions':>8} {'active min':>10} {'moves/min':>9} "
+          f"{'reach x':>7} {'reach y':>7} {'reaction ms':>11}")
+    for row in summary:
+        print(f"  {row['week']:<9} {row['game']:<9} {row['stream']:<6} {row['sessions']:8d} {row['active_min']:10.1f} "
+              f"{row['movements_per_min']:9.1f} {row['reach_x']:7.2f} {row['reach_y']:7.2f} "
+              f"{str(row['reaction_median_ms']):>11}")
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    sessions_path = cache_path("reports", f"sessions-{stamp}.csv")
+    summary_path = cache_path("reports", f"summary-{stamp}.csv")
+    write_csv(sessions_path, SESSION_FIELDS, sessions)
+    write_csv(summary_path, SUMMARY_FIELDS, summary)
+    print(f"sessions written to {sessions_path}\nsummary written to {summary_path}")
+    for failure in failures:
+        print(f"  SKIPPED {failure}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Soak test: drive a game for hours from synthetic input and watch memory and frame time.
+
+The game script runs inside this process with the synthetic camera of
+camera_sources (a hand silhouette circling over noise, with optional outages)
+or the source set in MOTION_CAMERA, and mouse moves and clicks are posted
+every few seconds. A sampler thread records resident memory, traced Python
+memory and the p50/p95 frame times at every interval. After the warm-up the run fails when resident
+memory grows by more than --max-growth-mb or the p95 frame time drifts above
+--max-drift times its first value; the report lists the allocation sites that
+grew the most since the warm-up.
+
+Usage: python soak.py pingpong.py [--minutes 240] [--interval 30] [--warmup 120]
+Results go to .cache/soak/<game>-<time>.json; the exit code is 1 on failure.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+import frame_timing
+from metrics_server import resident_memory_bytes
+from paths import cache_path
+from script_runner import run_script
+
+INPUT_TICK = 0.5   # seconds between driver wake-ups
+MB = 1024 * 1024
+
+
+class SoakDriver(threading.Thread):
+    """Posts input, samples memory and frame times, and ends the game at the deadline."""
+    def __init__(self, seconds, interval, warmup, click_every):
+        super().__init__(name="soak-driver", daemon=True)
+        self.seconds = seconds
+        self.interval = interval
+        self.warmup = warmup
+        self.click_every = click_every
+        self.samples = []
+        self.baseline = None   # tracemalloc snapshot at the end of the warm-up
+        self.final = None      # and at the deadline, while the game still holds its objects
+        self.done = threading.Event()
+        self._start = time.monotonic()
+
+    def finish(self):
+        """Last sample and snapshot; called at the deadline, or after the game ended early."""
+        if self.final is None:
+            self.sample()
+            self.final = tracemalloc.take_snapshot()
+
+    def sample(self):
+        elapsed = time.monotonic() - self._start
+        timer = frame_timing.latest()
+        frame = timer.frame.summary() if timer is not None else {"count": 0}
+        rss = resident_memory_bytes()
+        traced, _ = tracemalloc.get_traced_memory()
+        entry = {
+            "t": round(elapsed, 1),
+            "rss_mb": round(rss / MB, 2) if rss is not None else None,
+            "traced_mb": round(traced / MB, 2),
+            "frames": timer.frames if timer is not None else 0,
+            "p50_ms": frame.get("p50"),
+            "p95_ms": frame.get("p95"),
+        }
+        self.samples.append(entry)
+        if self.baseline is None and elapsed >= self.warmup:
+            self.baseline = tracemalloc.take_snapshot()
+        print(f"[soak] {entry}")
+
+    def _post_input(self, now, pygame):
+        surface = pygame.display.get_surface()
+        if surface is None:
+            return
+        width, height = surface.get_size()
+        pos = (random.randrange(width), random.randrange(height))
+        pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0)))
+        if now >= self._next_click:
+            self._next_click = now + self.click_every
+            for kind in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+                pygame.event.post(pygame.event.Event(kind, pos=pos, button=1))
+
+    def run(self):
+        import pygame
+
+        self._next_click = self._start + self.click_every
+        next_sample = self._start + self.interval
+        while not self.done.wait(INPUT_TICK):
+            now = time.monotonic()
+            if now >= next_sample:
+                next_sample += self.interval
+                self.sample()
+            if not pygame.display.get_init():
+                continue
+            if now - self._start >= self.seconds:
+                self.finish()
+                pygame.event.post(pygame.event.Event(pygame.QUIT))  # repeated until the loop exits
+            elif self.click_every:
+                self._post_input(now, pygame)
+
+
+def evaluate(samples, warmup, max_growth_mb, max_drift):
+    """Failures (empty when the run passed) and the measured growth and drift."""
+    steady = [s for s in samples if s["t"] >= warmup and s["rss_mb"] is not None]
+    if len(steady) < 2:
+        return ["not enough samples after the warm-up (run longer or sample more often)"], {}
+    hours = (steady[-1]["t"] - steady[0]["t"]) / 3600
+    growth = steady[-1]["rss_mb"] - steady[0]["rss_mb"]
+    result = {"rss_growth_mb": round(growth, 2),
+              "rss_growth_mb_per_hour": round(growth / hours, 2) if hours else 0.0,
+              "traced_growth_mb": round(steady[-1]["traced_mb"] - steady[0]["traced_mb"], 2)}
+    failures = []
+    if growth > max_growth_mb:
+        failures.append(f"resident memory grew {growth:.1f} MB after the warm-up (limit {max_growth_mb} MB)")
+    timed = [s for s in steady if s["p95_ms"]]
+    if len(timed) >= 2:
+        drift = timed[-1]["p95_ms"] / timed[0]["p95_ms"]
+        result["p95_drift"] = round(drift, 3)
+        if drift > max_drift:
+            failures.append(f"p95 frame time drifted {timed[0]['p95_ms']:.1f} -> {timed[-1]['p95_ms']:.1f} ms "
+                            f"(x{drift:.2f}, limit x{max_drift})")
+    return failures, result
+
+
+def top_allocations(baseline, final, limit):
+    """Allocation sites that grew the most between two snapshots."""
+    if baseline is None or final is None:
+        return []
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),
+              tracemalloc.Filter(False, __file__),
+              tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+    stats = final.filter_traces(ignore).compare_to(baseline.filter_traces(ignore), "lineno")
+    return [{"site": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1),
+             "count_diff": stat.count_diff}
+            for stat in stats[:limit] if stat.size_diff > 0]
+
+
+def run_game(script, outage_every, window):
+    """Run a game script in this process with the synthetic camera, unless MOTION_CAMERA names another source."""
+    os.environ.setdefault("MOTION_CAMERA", f"synthetic:hand,speed=max,outage_every={outage_every}")
+    run_script(script, window)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("game", help="game script, e.g. pingpong.py")
+    parser.add_argument("--minutes", type=float, default=240, help="how long to run the game")
+    parser.add_argument("--interval", type=float, default=30, help="seconds between samples")
+    parser.add_argument("--warmup", type=float, default=120, help="seconds before the baseline is taken")
+    parser.add_argument("--max-growth-mb", type=float, default=64, help="allowed RSS growth after the warm-up")
+    parser.add_argument("--max-drift", type=float, default=1.3, help="allowed ratio of last to first p95 frame time")
+    parser.add_argument("--click-every", type=float, default=3, help="seconds between synthetic clicks (0: none)")
+    parser.add_argument("--outage-every", type=float, default=0, help="simulate a camera outage this often (seconds)")
+    parser.add_argument("--top", type=int, default=10, help="allocation sites to report")
+    parser.add_argument("--traceback-depth", type=int, default=1, help="frames kept per traced allocation")
+    parser.add_argument("--window", action="store_true", help="show the game instead of rendering off-screen")
+    args = parser.parse_args()
+
+    os.environ["MOTION_FRAME_TIMING"] = "1"
+
+    tracemalloc.start(args.traceback_depth)
+    driver = SoakDriver(args.minutes * 60, args.interval, args.warmup, args.click_every)
+    driver.start()
+    try:
+        run_game(args.game, args.outage_every, args.window)
+    finally:
+        driver.done.set()
+        driver.join()
+    driver.finish()
+
+    failures, result = evaluate(driver.samples, args.warmup, args.max_growth_mb, args.max_drift)
+    report = {
+        "game": args.game,
+        "minutes": args.minutes,
+        "thresholds": {"max_growth_mb": args.max_growth_mb, "max_drift": args.max_drift},
+        "passed": not failures,
+        "failures": failures,
+        "result": result,
+        "top_allocations": top_allocations(driver.baseline, driver.final, args.top),
+        "samples": driver.samples,
+    }
+    tracemalloc.stop()
+    name = os.path.splitext(os.path.basename(args.game))[0]
+    path = cache_path("soak", f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"[soak] {args.game}: {'PASS' if not failures else 'FAIL'} {result}")
+    for failure in failures:
+        print(f"  - {failure}")
+    for site in report["top_allocations"]:
+        print(f"  {site['size_diff_kb']:+10.1f} KB {site['count_diff']:+7d}  {site['site']}")
+    print(f"[soak] report written to {path}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
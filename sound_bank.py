@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Shared sound bank: decode-once samples, reserved effect channels and a small mixer buffer.
+
+Each sound file is decoded once per process and shared by every name that
+refers to it. The decoded PCM is also kept in the cache directory, keyed by the
+file's size, modification time and the mixer format, so later launches load
+raw samples instead of decoding MP3s again. Missing files are reported once
+and play as silence.
+
+``init_mixer()`` must run before ``pygame.init()``, which would otherwise open
+the mixer with the default buffer. MOTION_AUDIO_BUFFER overrides the buffer
+size in samples. Run ``python sound_bank.py`` to pre-build the cache and
+measure play-to-output latency.
+"""
+import os
+import time
+
+import pygame
+
+import tracing
+from paths import cache_path
+
+FREQUENCY = 44100
+SAMPLE_SIZE = -16
+CHANNELS = 2
+DEFAULT_BUFFER = 256   # samples per mix callback, about 6 ms at 44.1 kHz
+MIXER_CHANNELS = 8
+EFFECT_CHANNELS = 4    # reserved for gameplay effects so nothing else can take them
+
+# Every sample the games play, for pre-building the cache
+GAME_SOUNDS = ["fire.mp3", "pingpong.mp3", "applause.mp3", "lose.wav"]
+
+_warned = set()
+
+
+def _warn_once(key, message):
+    if key not in _warned:
+        _warned.add(key)
+        print(message)
+
+
+def init_mixer(buffer=None):
+    """Open the mixer with a small buffer and reserve the effect channels; False without audio."""
+    buffer = buffer or int(os.environ.get("MOTION_AUDIO_BUFFER", DEFAULT_BUFFER))
+    pygame.mixer.pre_init(FREQUENCY, SAMPLE_SIZE, CHANNELS, buffer)
+    try:
+        pygame.mixer.init()
+    except pygame.error as e:
+        _warn_once("mixer", f"Warning: audio unavailable ({e}), sounds are disabled.")
+        return False
+    pygame.mixer.set_num_channels(MIXER_CHANNELS)
+    pygame.mixer.set_reserved(EFFECT_CHANNELS)
+    return True
+
+
+def mixer_buffer_ms(buffer=None):
+    """Duration of one mixer buffer, the time a mixed chunk waits in the device queue."""
+    buffer = buffer or int(os.environ.get("MOTION_AUDIO_BUFFER", DEFAULT_BUFFER))
+    init = pygame.mixer.get_init()
+    frequency = init[0] if init else FREQUENCY
+    return buffer / frequency * 1000
+
+
+class SoundBank:
+    """Named effects decoded once and played on the reserved channels."""
+    def __init__(self, disk_cache=True):
+        self.disk_cache = disk_cache
+        self._samples = {}  # file path -> Sound (or None when missing)
+        self._started = [0.0] * EFFECT_CHANNELS  # when each effect channel was last given a sound
+        self.disk_hits = 0   # samples loaded from the PCM cache
+        self.decodes = 0     # samples decoded from the original file
+
+    def _cache_file(self, path):
+        stat = os.stat(path)
+        frequency, fmt, channels = pygame.mixer.get_init()
+        name = os.path.basename(path)
+        return cache_path("sounds", f"{name}-{stat.st_size}-{int(stat.st_mtime)}-{frequency}-{fmt}-{channels}.pcm")
+
+    def _decode(self, path):
+        if not pygame.mixer.get_init():
+            return None
+        if not os.path.exists(path):
+            _warn_once(path, f"Warning: sound file {path} not found, it will be silent.")
+            return None
+        cached = self._cache_file(path) if self.disk_cache else None
+        if cached and os.path.exists(cached):
+            with open(cached, "rb") as f:
+                self.disk_hits += 1
+                return pygame.mixer.Sound(buffer=f.read())
+        try:
+            self.decodes += 1
+            sound = pygame.mixer.Sound(path)
+        except pygame.error as e:
+            _warn_once(path, f"Warning: could not decode {path} ({e}), it will be silent.")
+            return None
+        if cached:
+            try:
+                with open(cached, "wb") as f:
+                    f.write(sound.get_raw())
+            except OSError as e:
+                _warn_once("cache", f"Warning: could not write sound cache: {e}")
+        return sound
+
+    def get(self, path):
+        """The decoded Sound for a file, or None if it is missing or audio is off."""
+        if path not in self._samples:
+            self._samples[path] = self._decode(path)
+        return self._samples[path]
+
+    def preload(self, paths):
+        for path in paths:
+            with tracing.span("load sound", "asset", path=path):
+                self.get(path)
+
+    def play(self, path, volume=1.0):
+        """Play a sample on a reserved effect channel; returns the Channel or None."""
+        sound = self.get(path)
+        if sound is None:
+            return None
+        channel = self._effect_channel()
+        channel.set_volume(volume)
+        channel.play(sound)
+        return channel
+
+    def _effect_channel(self):
+        for index in range(EFFECT_CHANNELS):
+            if not pygame.mixer.Channel(index).get_busy():
+                break
+        else:
+            # All busy: cut the one that started longest ago
+            index = min(range(EFFECT_CHANNELS), key=self._started.__getitem__)
+        self._started[index] = time.monotonic()
+        return pygame.mixer.Channel(index)
+
+    def play_music(self, path, loops=-1, volume=None):
+        """Stream background music (not decoded into memory); False if it cannot play."""
+        if not pygame.mixer.get_init():
+            return False
+        if not os.path.exists(path):
+            _warn_once(path, f"Warning: music file {path} not found, playing without music.")
+            return False
+        try:
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.play(loops)
+        except pygame.error as e:
+            _warn_once(path, f"Warning: could not play {path} ({e}).")
+            return False
+        if volume is not None:
+            pygame.mixer.music.set_volume(volume)
+        return True
+
+
+def measure_latency(trials=20, buffer=None):
+    """Estimated milliseconds from play() to audio output: (median mix start delay, device buffer).
+
+    A short silent chunk is played and the channel polled until it finishes;
+    the time beyond the chunk's length is how long the mixer took to pick it
+    up. The device queue adds about one buffer on top, which pygame cannot
+    observe directly.
+    """
+    frequency, fmt, channels = pygame.mixer.get_init()
+    chunk_ms = 2.0
+    frames = int(frequency * chunk_ms / 1000)
+    silence = pygame.mixer.Sound(buffer=bytes(frames * channels * abs(fmt) // 8))
+    channel = pygame.mixer.Channel(0)
+    delays = []
+    for _ in range(trials):
+        start = time.perf_counter()
+        channel.play(silence)
+        while channel.get_busy():
+            time.sleep(0.0002)
+        delays.append((time.perf_counter() - start) * 1000 - chunk_ms)
+        time.sleep(0.01)
+    delays.sort()
+    return max(0.0, delays[len(delays) // 2]), mixer_buffer_ms(buffer)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-build the sound cache and measure play-to-output latency.")
+    parser.add_argument("--buffer", type=int, default=None, help="mixer buffer in samples")
+    args = parser.parse_args()
+    if init_mixer(args.buffer):
+        bank = SoundBank()
+        start = time.perf_counter()
+        bank.preload(GAME_SOUNDS)
+        print(f"Loaded {len(GAME_SOUNDS)} samples in {(time.perf_counter() - start) * 1000:.1f} ms")
+        mix_ms, device_ms = measure_latency(buffer=args.buffer)
+        print(f"play() -> output: ~{mix_ms + device_ms:.1f} ms (mixer pick-up {mix_ms:.1f} ms + device buffer {device_ms:.1f} ms)")
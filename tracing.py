@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""Opt-in Chrome trace export of game-loop spans across threads and processes.
+
+Set MOTION_TRACE=1 to record. Spans (capture, convert, inference, logic,
+render, present, asset loads, camera reopen...) are appended to a bounded
+in-memory buffer as plain tuples; a background thread turns them into Chrome
+trace JSON and writes them to .cache/traces/<process>-<pid>.json, so the game
+loop never formats or writes anything itself. When the writer falls behind,
+new events are dropped and counted rather than blocking the loop.
+
+Each process writes its own file. Open one in https://ui.perfetto.dev, or
+merge several (e.g. GAME.py and the game it launched) with:
+
+    python tracing.py merge out.json .cache/traces/*.json
+
+While tracing is off every call returns immediately.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from paths import cache_path
+
+BUFFER_EVENTS = 100000
+FLUSH_INTERVAL = 0.25  # seconds between writer drains
+
+_tracer = None
+
+
+def _now_us():
+    # perf_counter is CLOCK_MONOTONIC / QPC, shared by every process on the machine
+    return time.perf_counter_ns() / 1000.0
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.start, _now_us(), self.cat, self.args)
+        return False
+
+
+class Tracer:
+    """Bounded event buffer drained to a Chrome trace file by a writer thread."""
+    def __init__(self, process_name, path=None, capacity=BUFFER_EVENTS):
+        self.pid = os.getpid()
+        self.process_name = process_name
+        self.path = path or cache_path("traces", f"{process_name}-{self.pid}.json")
+        self.capacity = capacity
+        self.frame = 0
+        self.dropped = 0
+        self._events = deque()
+        self._seen_threads = set()
+        self._new_threads = deque()  # (tid, name) not yet written as metadata
+        self._scene = None
+        self._stop = threading.Event()
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._first = True
+        self._emit_metadata("process_name", 0, {"name": process_name})
+        self._writer = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._writer.start()
+        print(f"[trace] recording to {self.path}")
+
+    # --- Recording (any thread) ---
+    def _tid(self):
+        tid = threading.get_native_id()
+        if tid not in self._seen_threads:
+            self._seen_threads.add(tid)
+            self._new_threads.append((tid, threading.current_thread().name))
+        return tid
+
+    def _push(self, event):
+        if len(self._events) >= self.capacity:
+            self.dropped += 1
+            return
+        self._events.append(event)
+
+    def complete(self, name, start_us, end_us, cat="frame", args=None):
+        """A finished span; times in microseconds from _now_us()."""
+        self._push(("X", name, cat, start_us, end_us - start_us, self._tid(), self.frame, args))
+
+    def span(self, name, cat="frame", **args):
+        return _Span(self, name, cat, args or None)
+
+    def instant(self, name, cat="scene", **args):
+        self._push(("i", name, cat, _now_us(), 0, self._tid(), self.frame, args or None))
+
+    def next_frame(self):
+        self.frame += 1
+
+    def scene(self, name):
+        """Record an instant event when the current scene/state changes."""
+        if name != self._scene:
+            self._scene = name
+            self.instant("scene", state=str(name))
+
+    # --- Writing (writer thread) ---
+    def _write(self, event):
+        self._file.write(("" if self._first else ",\n") + json.dumps(event, ensure_ascii=False))
+        self._first = False
+
+    def _emit_metadata(self, kind, tid, args):
+        self._write({"ph": "M", "name": kind, "pid": self.pid, "tid": tid, "args": args})
+
+    def _drain(self):
+        while self._new_threads:
+            tid, name = self._new_threads.popleft()
+            self._emit_metadata("thread_name", tid, {"name": name})
+        events = self._events
+        while events:
+            ph, name, cat, ts, dur, tid, frame, args = events.popleft()
+            event = {"ph": ph, "name": name, "cat": cat, "ts": ts, "pid": self.pid, "tid": tid,
+                     "args": dict(args or {}, frame=frame)}
+            if ph == "X":
+                event["dur"] = dur
+            else:
+                event["s"] = "t"
+            self._write(event)
+        self._file.flush()
+
+    def _run(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            self._drain()
+
+    def close(self):
+        self._stop.set()
+        self._writer.join()
+        self._drain()
+        if self.dropped:
+            self._write({"ph": "i", "name": "dropped events", "s": "p", "ts": _now_us(), "pid": self.pid,
+                         "tid": 0, "args": {"dropped": self.dropped}})
+        self._file.write("\n]\n")
+        self._file.close()
+        print(f"[trace] wrote {self.path}" + (f" ({self.dropped} events dropped)" if self.dropped else ""))
+
+
+# --- Module-level API used by the games ---
+def start(process_name, path=None):
+    """Start tracing for this process if MOTION_TRACE=1 (or forced with a path); returns the Tracer or None."""
+    global _tracer
+    if _tracer is None and (path or os.environ.get("MOTION_TRACE", "0") == "1"):
+        _tracer = Tracer(process_name, path)
+    return _tracer
+
+
+def tracer():
+    return _tracer
+
+
+def span(name, cat="frame", **args):
+    """Context manager timing a block; a shared no-op while tracing is off."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, cat, args or None)
+
+
+def now_us():
+    """Timestamp for complete(), when a block is too large to wrap in span()."""
+    return _now_us() if _tracer is not None else 0.0
+
+
+def complete(name, start_us, cat="frame", **args):
+    """Record a span that started at start_us (from now_us()) and ends now."""
+    if _tracer is not None:
+        _tracer.complete(name, start_us, _now_us(), cat, args or None)
+
+
+def instant(name, cat="scene", **args):
+    if _tracer is not None:
+        _tracer.instant(name, cat, **args)
+
+
+def scene(name):
+    if _tracer is not None:
+        _tracer.scene(name)
+
+
+def stop():
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def merge(out_path, paths):
+    """Combine per-process trace files into one for Perfetto."""
+    events = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read().rstrip().rstrip(",")
+        if not text.endswith("]"):
+            text += "]"  # a process that did not exit cleanly
+        events.extend(json.loads(text))
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(events, f, ensure_ascii=False)
+    print(f"Merged {len(paths)} traces ({len(events)} events) into {out_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chrome trace utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    merge_parser = sub.add_parser("merge", help="merge per-process trace files")
+    merge_parser.add_argument("out")
+    merge_parser.add_argument("traces", nargs="+")
+    args = parser.parse_args()
+    merge(args.out, args.traces)
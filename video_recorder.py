@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""Opt-in gameplay clips, encoded off the game loop.
+
+Set MOTION_VIDEO=1 and each game writes .cache/videos/<game>-<time>.mp4 at
+VIDEO_FPS and at most VIDEO_WIDTH pixels wide (the composed frame, camera
+preview thumbnail included). On the game loop, capture() returns at once until
+the next video frame is due; then it copies the canvas's raw pixel bytes into
+a free slot of a shared-memory ring (one memcpy, about 1 ms at 1280x800;
+scaling or converting there would cost several). An encoder process, this
+module run as ``python video_recorder.py encode``, is sent the slot number
+over a pipe, frees the slot once it has scaled the frame down, and encodes it
+with OpenCV. It runs at idle CPU priority, so it only uses time the game
+leaves over, and is started with subprocess rather than multiprocessing
+because the game scripts have no __main__ guard for a spawned child to skip.
+
+When every slot is still waiting for the encoder, the frame is dropped rather
+than waited for, and the next frame sent is repeated in its place so the clip
+keeps real time; frames still owed when recording stops repeat the last one
+sent. stop() waits for the encoder and prints the frames written,
+the frames dropped and the capture cost per frame.
+"""
+import math
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+import pygame
+
+from paths import cache_path
+
+VIDEO_FPS = 15
+VIDEO_WIDTH = 640
+SLOTS = 4              # full-size frames in flight between the game and the encoder
+FOURCC = "mp4v"
+ENCODER_TIMEOUT = 30   # seconds stop() waits for the encoder to finish
+REPEAT_LAST = 255      # slot number meaning "write the previous frame again"
+
+_recorder = None
+
+
+def _attach(name):
+    """Open the game's shared memory without this process's resource tracker unlinking it on exit."""
+    try:
+        return shared_memory.SharedMemory(name, track=False)  # Python 3.13+
+    except TypeError:
+        memory = shared_memory.SharedMemory(name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
+
+
+def _layout(memory, pitch, height, slots):
+    """(busy flags, frames) views of the ring; each frame is a 32-bit surface's rows, pitch bytes apart."""
+    busy = np.ndarray((slots,), np.uint8, memory.buf, 0)
+    frames = np.ndarray((slots, height, pitch // 4, 4), np.uint8, memory.buf, 64)
+    return busy, frames
+
+
+def _lower_priority():
+    """Run the encoder only when the game leaves the CPU idle (where the OS allows it)."""
+    if hasattr(os, "sched_setscheduler") and hasattr(os, "SCHED_IDLE"):
+        try:
+            os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+            return
+        except OSError:
+            pass
+    if hasattr(os, "nice"):
+        os.nice(19)
+
+
+class VideoRecorder:
+    """Screen capture into a shared-memory ring read by an encoder process."""
+    def __init__(self, game, canvas, path=None, fps=VIDEO_FPS, width=VIDEO_WIDTH, slots=SLOTS, metrics=None):
+        canvas_size = canvas.get_size()
+        scale = min(1.0, width / canvas_size[0])
+        # Even dimensions: most encoders need them
+        self.size = (int(canvas_size[0] * scale) // 2 * 2, int(canvas_size[1] * scale) // 2 * 2)
+        self.path = path or cache_path("videos", f"{game}-{time.strftime('%Y%m%d-%H%M%S')}.mp4")
+        self.interval = 1 / fps
+        self.slots = slots
+        self.captured = 0
+        self.dropped = 0
+        self.capture_time = 0.0
+        self.capture_max = 0.0
+        self._next = None
+        self._slot = 0
+        self._owed = 0           # dropped frames the next sent frame stands in for
+        self._pitch = canvas_size[0] * 4
+        self._staging = None     # 32-bit copy of canvases with another pixel size or padded rows
+        if canvas.get_bytesize() != 4 or canvas.get_pitch() != self._pitch:
+            self._staging = pygame.Surface(canvas_size, 0, 32)
+        self._memory = shared_memory.SharedMemory(create=True, size=64 + slots * self._pitch * canvas_size[1])
+        self._busy, self._frames = _layout(self._memory, self._pitch, canvas_size[1], slots)
+        self._busy[:] = 0
+        self._frames[:] = 0  # touch every page now rather than on the first captures
+        # Byte offsets of blue, green and red within a pixel, from the channel shifts
+        shifts = (canvas if self._staging is None else self._staging).get_shifts()
+        channels = ",".join(str(shift // 8) for shift in (shifts[2], shifts[1], shifts[0]))
+        command = [sys.executable, os.path.abspath(__file__), "encode", self._memory.name,
+                   f"{canvas_size[0]}x{canvas_size[1]}", f"{self.size[0]}x{self.size[1]}", channels,
+                   str(slots), str(fps), self.path]
+        self._encoder = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                         env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1"),
+                                         creationflags=getattr(subprocess, "IDLE_PRIORITY_CLASS", 0))
+        self._latency = None
+        if metrics is not None:
+            self._latency = metrics.histogram("motion_video_capture_seconds",
+                                              "Game-loop time spent copying a frame for the video.")
+            metrics.gauge("motion_video_frames_total", "Frames handed to the video encoder.",
+                          lambda: self.captured, kind="counter")
+            metrics.gauge("motion_video_dropped_total", "Video frames dropped because the encoder was behind.",
+                          lambda: self.dropped, kind="counter")
+        print(f"[video] recording {self.size[0]}x{self.size[1]} at {fps} fps to {self.path}")
+
+    # --- Game loop ---
+    def capture(self, surface):
+        """Copy the composed frame when a video frame is due; never waits for the encoder."""
+        now = time.perf_counter()
+        if self._next is not None and now < self._next:
+            return
+        if self._next is None:
+            self._next = now
+        # Frames the game was too slow to offer are made up by repeating this one
+        late = int((now - self._next) / self.interval)
+        self._next += (late + 1) * self.interval
+        self._owed += late
+        slot = self._slot
+        if self._encoder is None or self._busy[slot]:
+            self.dropped += 1
+            self._owed += 1
+            return
+
+        if self._staging is not None:
+            self._staging.blit(surface, (0, 0))
+            surface = self._staging
+        self._frames[slot].reshape(-1)[:] = np.frombuffer(surface.get_view("1"), np.uint8)
+        self._busy[slot] = 1
+        try:
+            self._encoder.stdin.write(bytes((slot, min(self._owed, 255))))
+            self._write_repeats(self._owed - 255)  # a stall of more than 255 frames
+            self._encoder.stdin.flush()
+        except OSError as e:
+            print(f"Warning: the video encoder stopped ({e}); recording is off.")
+            self._encoder = None
+            return
+        self._owed = 0
+        self._slot = (slot + 1) % self.slots
+        self.captured += 1
+        elapsed = time.perf_counter() - now
+        self.capture_time += elapsed
+        self.capture_max = max(self.capture_max, elapsed)
+        if self._latency is not None:
+            self._latency.observe(elapsed)
+
+    def _write_repeats(self, count):
+        """Have the encoder write the frame it was sent last count more times (255 per message)."""
+        while count > 0:
+            self._encoder.stdin.write(bytes((REPEAT_LAST, min(count, 255))))
+            count -= 255
+
+    def _send_owed(self):
+        """Fill the clip up to now with the last frame sent (frames dropped or due since, at the end)."""
+        if not self.captured:
+            return
+        # Frames due since the last one sent; floor, so none while the next is not due yet
+        due = math.floor((time.perf_counter() - self._next) / self.interval) + 1
+        self._write_repeats(self._owed + max(0, due))
+        self._owed = 0
+
+    def close(self):
+        if self._encoder is not None:
+            try:
+                self._send_owed()
+                self._encoder.stdin.close()  # end of input: the encoder drains the ring and exits
+                self._encoder.wait(ENCODER_TIMEOUT)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                print(f"Warning: the video encoder did not finish ({e!r}).")
+                self._encoder.kill()
+        del self._busy, self._frames
+        self._memory.close()
+        self._memory.unlink()
+        mean = self.capture_time / self.captured * 1000 if self.captured else 0.0
+        size = os.path.getsize(self.path) / 1024 / 1024 if os.path.exists(self.path) else 0.0
+        print(f"[video] {self.captured} frames ({size:.1f} MB) to {self.path}, {self.dropped} dropped; "
+              f"capture {mean:.2f} ms per frame (max {self.capture_max * 1000:.2f} ms)")
+
+
+def encode(name, canvas_size, size, channels, slots, fps, path):
+    """Encoder process: scale down and write each slot the game sends (repeated for dropped frames)."""
+    _lower_priority()
+    width, height = canvas_size
+    memory = _attach(name)
+    busy, frames = _layout(memory, width * 4, height, slots)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*FOURCC), fps, size)
+    if not writer.isOpened():
+        print(f"Warning: OpenCV cannot write {FOURCC} video to {path}.")
+        return 1
+    stdin = sys.stdin.buffer
+    frame = None
+    while True:
+        message = stdin.read(2)
+        if len(message) < 2:
+            break
+        slot, repeat = message
+        if slot != REPEAT_LAST:
+            frame = cv2.resize(frames[slot], size, interpolation=cv2.INTER_AREA)
+            busy[slot] = 0
+            frame = np.ascontiguousarray(frame[:, :, channels])
+            repeat += 1
+        if frame is not None:
+            for _ in range(repeat):
+                writer.write(frame)
+    writer.release()
+    del busy, frames
+    memory.close()
+    return 0
+
+
+# --- Module-level API used by the games ---
+def start(game, canvas, metrics=None):
+    """Start recording if MOTION_VIDEO=1; returns the VideoRecorder or None."""
+    global _recorder
+    if _recorder is None and os.environ.get("MOTION_VIDEO", "0") == "1":
+        _recorder = VideoRecorder(game, canvas, metrics=metrics)
+    return _recorder
+
+
+def capture(surface):
+    """Offer the composed frame; does nothing while recording is off."""
+    if _recorder is not None:
+        _recorder.capture(surface)
+
+
+def stop():
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gameplay video recording.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    encode_parser = sub.add_parser("encode", help="encoder process (started by VideoRecorder)")
+    encode_parser.add_argument("memory")
+    encode_parser.add_argument("canvas_size", type=lambda value: tuple(int(n) for n in value.split("x")))
+    encode_parser.add_argument("size", type=lambda value: tuple(int(n) for n in value.split("x")))
+    encode_parser.add_argument("channels", type=lambda value: tuple(int(n) for n in value.split(",")))
+    encode_parser.add_argument("slots", type=int)
+    encode_parser.add_argument("fps", type=float)
+    encode_parser.add_argument("path")
+    args = parser.parse_args()
+    sys.exit(encode(args.memory, args.canvas_size, args.size, args.channels, args.slots, args.fps, args.path))